@@ -0,0 +1,177 @@
+"""
+Benchmark upload với mock YouTube server local (không cần credentials / mạng)
+    
+    python benchmark_upload.py                                   # 10 video x 20MB, 2 song song
+    python benchmark_upload.py --count 20 --size-mb 50 --concurrency 4 --bandwidth 100
+    python benchmark_upload.py --error-rate 0.05 --drop-rate 0.02  # thử retry / resume
+    python benchmark_upload.py --url http://127.0.0.1:8765       # dùng mock server đang chạy
+    python benchmark_upload.py --sync --size-mb 500 [--no-mmap]  # uploader đồng bộ, so sánh mmap / MediaFileUpload
+"""
+import argparse
+import asyncio
+import resource
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from loguru import logger
+
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.http_pool import HttpPool
+from src.tools.mock_youtube import MockAuth, MockYouTubeServer
+from src.tools.quota import QuotaLedger
+from src.tools.telemetry import UploadTelemetry
+from src.tools.upload_sessions import UploadSessionStore
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.retry import Retrier
+
+
+def make_videos(folder: Path, count: int, size_mb: float) -> list[Path]:
+    """Tạo file video giả (toàn byte 0, mock server không kiểm tra nội dung)"""
+    block = b"\0" * (1024 * 1024)
+    videos = []
+    for i in range(count):
+        path = folder / f"bench_{i:03d}.mp4"
+        with open(path, 'wb') as f:
+            for _ in range(int(size_mb)):
+                f.write(block)
+            f.write(b"\0" * int((size_mb % 1) * 1024 * 1024))
+        videos.append(path)
+    return videos
+
+
+async def run_benchmark(args, base_url: str, workdir: Path):
+    videos = make_videos(workdir, args.count, args.size_mb)
+    telemetry = UploadTelemetry(metrics_file=args.metrics_file)
+    uploader = AsyncYouTubeUploader(
+        auth=MockAuth(),
+        chunk_size=int(args.chunk_mb * 1024 * 1024),
+        sessions=UploadSessionStore(workdir / "sessions"),
+        retrier=Retrier(max_attempts=args.retries, base_delay=0.2, max_delay=5),
+        quota=QuotaLedger(workdir / "quota.db", daily_limit=10**9),
+        pool=HttpPool(max_connections=args.concurrency * 2),
+        adaptive_chunks=not args.fixed_chunks,
+        base_url=base_url,
+        telemetry=telemetry
+    )
+    semaphore = asyncio.Semaphore(args.concurrency)
+    
+    async def upload(video: Path):
+        async with semaphore:
+            started = time.monotonic()
+            result = await uploader.upload_video(video, video.stem, "benchmark", ["bench"])
+            return result, time.monotonic() - started
+    
+    started, cpu_started = time.monotonic(), time.process_time()
+    results = await asyncio.gather(*(upload(video) for video in videos))
+    elapsed, cpu = time.monotonic() - started, time.process_time() - cpu_started
+    stats = uploader.pool.stats()['async']
+    retries = uploader.retrier.stats().get('youtube.upload', {}).get('retries', 0)
+    await uploader.aclose()
+    report(args, results, elapsed, cpu, retries, stats, telemetry)
+
+
+def run_sync_benchmark(args, base_url: str, workdir: Path):
+    """Uploader đồng bộ (googleapiclient), mỗi upload một thread; --no-mmap để so với MediaFileUpload"""
+    videos = make_videos(workdir, args.count, args.size_mb)
+    telemetry = UploadTelemetry(metrics_file=args.metrics_file)
+    uploader = YouTubeUploader(
+        "mock", "mock",
+        chunk_size_mb=args.chunk_mb,
+        session_dir=workdir / "sessions",
+        retrier=Retrier(max_attempts=args.retries, base_delay=0.2, max_delay=5),
+        quota=QuotaLedger(workdir / "quota.db", daily_limit=10**9),
+        auth=MockAuth(),
+        base_url=base_url,
+        telemetry=telemetry,
+        use_mmap=not args.no_mmap
+    )
+    
+    def upload(video: Path):
+        started = time.monotonic()
+        result = uploader.upload_video(video, video.stem, "benchmark", ["bench"])
+        return result, time.monotonic() - started
+    
+    started, cpu_started = time.monotonic(), time.process_time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(upload, videos))
+    elapsed, cpu = time.monotonic() - started, time.process_time() - cpu_started
+    retries = uploader.retrier.stats().get('youtube.upload', {}).get('retries', 0)
+    report(args, results, elapsed, cpu, retries, uploader.pool.stats()['sync'], telemetry)
+
+
+def report(args, results, elapsed: float, cpu: float, retries: int, stats: dict, telemetry: UploadTelemetry):
+    succeeded = [duration for result, duration in results if result]
+    total_mb = len(succeeded) * args.size_mb
+    print("=" * 60)
+    print(f"Uploads:        {len(succeeded)}/{len(results)} in {elapsed:.1f}s")
+    print(f"Throughput:     {total_mb / elapsed:.1f} MB/s ({total_mb * 8 / elapsed:.0f} Mbps)")
+    print(f"Uploads/hour:   {len(succeeded) * 3600 / elapsed:.0f}")
+    if succeeded:
+        print(f"Per upload:     avg {sum(succeeded) / len(succeeded):.2f}s, max {max(succeeded):.2f}s")
+    if total_mb:
+        print(f"CPU:            {cpu:.2f}s ({cpu * 1024 / total_mb:.2f}s per GB, includes mock server)")
+    print(f"Peak RSS:       {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    print(f"Retries:        {retries}")
+    print(f"Connections:    {stats['connections']} for {stats['requests']} requests ({stats['reuse_ratio']:.0%} reused)")
+    phases = telemetry.disk_seconds_total + telemetry.network_seconds_total + telemetry.limiter_seconds_total
+    if phases > 0:
+        print(
+            f"Chunk time:     disk {telemetry.disk_seconds_total / phases:.0%}, "
+            f"network {telemetry.network_seconds_total / phases:.0%}, "
+            f"rate limit {telemetry.limiter_seconds_total / phases:.0%} "
+            f"({telemetry.chunks_total} chunks)"
+        )
+    print("=" * 60)
+    telemetry.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload với mock YouTube server")
+    parser.add_argument("--url", help="Mock server đang chạy (mặc định: tự khởi động)")
+    parser.add_argument("--count", type=int, default=10, help="Số video")
+    parser.add_argument("--size-mb", type=float, default=20, help="Kích thước mỗi video (MB)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Số upload song song")
+    parser.add_argument("--chunk-mb", type=float, default=8, help="Chunk size khởi đầu (MB)")
+    parser.add_argument("--fixed-chunks", action="store_true", help="Tắt adaptive chunk size")
+    parser.add_argument("--retries", type=int, default=5, help="Số lần thử tối đa mỗi request")
+    parser.add_argument("--latency", type=float, default=0.02, help="Độ trễ mỗi request (giây)")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Băng thông server (Mbps, 0 = không giới hạn)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Tỉ lệ chunk lỗi 503")
+    parser.add_argument("--drop-rate", type=float, default=0, help="Tỉ lệ chunk mất kết nối")
+    parser.add_argument("--sync", action="store_true", help="Dùng uploader đồng bộ (googleapiclient)")
+    parser.add_argument("--no-mmap", action="store_true", help="Uploader đồng bộ đọc file bằng MediaFileUpload")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--metrics-file", type=Path, help="Ghi metrics Prometheus ra file này")
+    args = parser.parse_args()
+    
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    
+    server = None
+    if not args.url:
+        server = MockYouTubeServer(
+            latency=args.latency,
+            bandwidth_mbps=args.bandwidth,
+            error_rate=args.error_rate,
+            drop_rate=args.drop_rate,
+            seed=args.seed
+        ).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            if args.sync:
+                run_sync_benchmark(args, args.url or server.url, Path(workdir))
+            else:
+                asyncio.run(run_benchmark(args, args.url or server.url, Path(workdir)))
+    finally:
+        if server:
+            print(f"Server:         {server.stats()}")
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Tạo trước mô tả cho các video đang chờ upload (batch LLM song song)
+    
+    python generate_descriptions.py                    # cả hàng đợi của kênh đầu tiên
+    python generate_descriptions.py --limit 50         # 50 video đầu hàng đợi
+    python generate_descriptions.py --concurrency 10   # 10 request LLM cùng lúc
+    python generate_descriptions.py --force            # tạo lại cả video đã có mô tả
+    python generate_descriptions.py --channel NAME
+
+Kết quả được lưu vào description.store_db; lúc upload workflow chỉ đọc ra.
+"""
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.workflows.upload_workflow import YouTubeUploadWorkflow
+from src.workflows.channels import ChannelRegistry
+from src.utils.config import Settings
+from loguru import logger
+
+
+async def generate_descriptions(
+    limit: int = None,
+    concurrency: int = None,
+    force: bool = False,
+    channel: str = None
+):
+    workflow = None
+    try:
+        settings = Settings()
+        registry = ChannelRegistry.from_settings(settings)
+        workflow = YouTubeUploadWorkflow(settings, channel=registry.get(channel or registry.names()[0]))
+        counts = await workflow.pregenerate_descriptions(limit=limit, max_concurrency=concurrency, force=force)
+        if counts["failed"]:
+            logger.warning(f"⚠️ {counts['failed']} video lỗi, chạy lại để thử tiếp")
+    
+    except Exception as e:
+        logger.error(f"❌ Lỗi: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+    finally:
+        if workflow:
+            await workflow.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tạo trước mô tả cho hàng đợi upload")
+    parser.add_argument("--limit", type=int, help="Số video tối đa")
+    parser.add_argument("--concurrency", type=int, help="Số request LLM cùng lúc")
+    parser.add_argument("--force", action="store_true", help="Tạo lại cả video đã có mô tả")
+    parser.add_argument("--channel", help="Tên kênh (mặc định: kênh đầu tiên)")
+    args = parser.parse_args()
+    asyncio.run(generate_descriptions(
+        limit=args.limit, concurrency=args.concurrency, force=args.force, channel=args.channel
+    ))
@@ -2,44 +2,35 @@
 Script để list tất cả các kênh YouTube của bạn
 Dùng để lấy Channel ID khi có nhiều kênh
 """
-import pickle
 from pathlib import Path
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+import sys
 
-SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.tools.http_pool import HttpPool
+from src.tools.youtube_auth import YouTubeAuth, build_youtube_service
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.config import Settings
 
 
 def get_authenticated_service():
-    """Xác thực với YouTube API"""
-    credentials = None
-    token_file = Path('token.pickle')
-    
-    # Load credentials
-    if token_file.exists():
-        with open(token_file, 'rb') as token:
-            credentials = pickle.load(token)
+    """Xác thực với YouTube API (dùng chung token.json với uploader)"""
+    settings = Settings()
+    client_secrets_file = Path('credentials.json')
     
-    # Refresh hoặc tạo mới
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        else:
-            if not Path('credentials.json').exists():
-                print("❌ Không tìm thấy credentials.json")
-                print("Hãy tạo OAuth credentials từ Google Cloud Console")
-                return None
-            
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            credentials = flow.run_local_server(port=0)
-        
-        # Save credentials
-        with open(token_file, 'wb') as token:
-            pickle.dump(credentials, token)
+    if not settings.YOUTUBE_CLIENT_ID and not client_secrets_file.exists():
+        print("❌ Không tìm thấy YOUTUBE_CLIENT_ID trong .env hoặc credentials.json")
+        print("Hãy tạo OAuth credentials từ Google Cloud Console")
+        return None
     
-    return build('youtube', 'v3', credentials=credentials)
+    auth = YouTubeAuth(
+        settings.YOUTUBE_CLIENT_ID,
+        settings.YOUTUBE_CLIENT_SECRET,
+        YouTubeUploader.SCOPES,
+        client_secrets_file=client_secrets_file
+    )
+    pool = HttpPool.from_settings(settings)
+    return build_youtube_service(http=pool.authorized_http(auth.get_credentials()))
 
 
 def list_channels():
@@ -95,7 +86,7 @@ def list_channels():
         print("        channel_id: \"UCxxx...\"  # Paste Channel ID")
         print()
         print("   Nếu để trống, video sẽ upload lên kênh mặc định")
-        
+    
     except Exception as e:
         print(f"❌ Lỗi: {e}")
         print("\nĐảm bảo bạn đã:")
@@ -6,7 +6,7 @@ from pathlib import Path
 from loguru import logger
 
 from src.utils.config import Settings
-from src.workflows.upload_workflow import YouTubeUploadWorkflow
+from src.workflows.multi_channel import MultiChannelScheduler
 
 
 def setup_logging(settings: Settings):
@@ -27,18 +27,19 @@ async def main():
     
     logger.info("🚀 Starting YouTube Auto Upload AI Agent")
     
-    # Initialize workflow
-    workflow = YouTubeUploadWorkflow(settings)
+    # Initialize workflows (một workflow cho mỗi kênh trong channels:)
+    scheduler = MultiChannelScheduler(settings)
     
     # Run the workflow
     try:
-        await workflow.run()
+        await scheduler.run()
     except KeyboardInterrupt:
         logger.info("⚠️ Application stopped by user")
     except Exception as e:
         logger.error(f"❌ Error occurred: {e}")
         raise
     finally:
+        await scheduler.aclose()
         logger.info("👋 Application shutdown")
 
 
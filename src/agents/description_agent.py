@@ -1,26 +1,42 @@
 """
 AI Agent for generating video descriptions using LLM
 """
+from contextlib import aclosing
 from pathlib import Path
-from typing import Dict, Any, Optional
-import yaml
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import hashlib
+from langchain_core.runnables import Runnable, RunnableLambda
 from loguru import logger
+import time
+
+from src.agents.llm_cache import LLMCache
+from src.agents.prompt_registry import CompiledPrompt, PromptRegistry
+from src.agents.provider_pool import HedgedLLM, create_chat_model, track_answering_provider
+from src.agents.stream_parser import INSTRUCTION_PATTERNS, OffFormatOutput, TitleStreamParser
+from src.utils.retry import Retrier
 
 
 class DescriptionAgent:
     """Agent tạo mô tả video bằng LLM"""
     
+    # Prompt mà LLM phải tự viết title ở đầu output
+    TITLE_PROMPT_TYPES = frozenset({"toeic_part_youtube"})
+    
     def __init__(
         self, 
         provider: str = "gemini",
         api_key: str = "",
         model: str = "gemini-pro", 
         temperature: float = 0.7,
-        prompts_config_path: Optional[Path] = None
+        prompts_config_path: Optional[Path] = None,
+        retrier: Optional[Retrier] = None,
+        cache: Optional[LLMCache] = None,
+        llm: Optional[Runnable] = None,
+        stream: bool = False,
+        title_within_tokens: int = 120,
+        stream_max_attempts: int = 2,
+        fallbacks: Optional[List[Dict[str, Any]]] = None,
+        hedge_options: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize Description Agent
@@ -31,106 +47,70 @@ class DescriptionAgent:
             model: Model name
             temperature: Temperature cho LLM
             prompts_config_path: Đường dẫn đến file prompts.yaml (optional)
+            retrier: Retry cho LLM call (nếu có thì tắt retry riêng của client LLM)
+            cache: Cache output LLM trên đĩa (None = luôn gọi LLM)
+            llm: Model đã tạo sẵn (bỏ qua việc tạo client theo provider, vd. trong test)
+            stream: Stream output (astream) cho prompt có title: title có ngay khi dòng đầu xong,
+                output không có title trong `title_within_tokens` token đầu bị bỏ và gọi lại
+            title_within_tokens: Số token (ước lượng) tối đa trước khi phải thấy title
+            stream_max_attempts: Số lần stream tối đa; lần cuối nhận output dù lệch format
+            fallbacks: Provider dự phòng (provider, model, api_key, temperature) để hedge khi
+                provider chính chậm; None = chỉ dùng provider chính
+            hedge_options: Tham số ngưỡng hedge của HedgedLLM (quantile, initial_delay, ...)
         """
         self.provider = provider.lower()
-        self.prompts_config = self._load_prompts_config(prompts_config_path)
+        self.model = model
+        self.temperature = temperature
+        self.cache = cache
+        self.retrier = retrier or Retrier(max_attempts=1)
+        self.stream = stream
+        self.title_within_tokens = title_within_tokens
+        self.stream_max_attempts = max(1, stream_max_attempts)
+        self.stream_stats = {"streams": 0, "aborted": 0, "wasted_tokens": 0}
+        # Tránh retry chồng retry: client LLM không tự retry khi đã có retrier
+        client_options = {"max_retries": 0} if retrier else {}
         
         # Initialize LLM based on provider
-        if self.provider == "openai":
-            self.llm = ChatOpenAI(
-                api_key=api_key,
-                model=model,
-                temperature=temperature
-            )
-            logger.info(f"✅ Initialized OpenAI LLM: {model}")
-        elif self.provider == "gemini":
-            self.llm = ChatGoogleGenerativeAI(
-                google_api_key=api_key,
-                model=model,
-                temperature=temperature
-            )
-            logger.info(f"✅ Initialized Gemini LLM: {model}")
+        if llm is not None:
+            self.llm = llm
         else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
+            self.llm = create_chat_model(self.provider, api_key, model, temperature, **client_options)
         
-        self.prompt_template = self._create_prompt_template()
-        self.chain = self.prompt_template | self.llm | StrOutputParser()
-    
-    def _load_prompts_config(self, config_path: Optional[Path] = None) -> Dict[str, Any]:
-        """Load prompts từ file YAML"""
-        if config_path is None:
-            # Default path
-            config_path = Path(__file__).parent.parent.parent / "config" / "prompts.yaml"
+        # Model có thể trả lời (provider chính trước): khóa cache theo model đã trả lời
+        self._cache_models: Dict[str, Tuple[str, str, float]] = {
+            f"{self.provider}:{model}": (self.provider, model, temperature)
+        }
         
-        if not config_path.exists():
-            logger.warning(f"⚠️ Prompts config not found at {config_path}, using default prompts")
-            return {}
+        # Provider dự phòng: gửi thêm request khi provider chính chậm hơn ngưỡng
+        if fallbacks:
+            providers = [(f"{self.provider}:{model}", self.llm)]
+            for entry in fallbacks:
+                self._cache_models[f"{entry['provider']}:{entry['model']}"] = (
+                    entry['provider'].lower(), entry['model'], entry.get('temperature', temperature)
+                )
+                providers.append((
+                    f"{entry['provider']}:{entry['model']}",
+                    create_chat_model(
+                        entry['provider'],
+                        entry.get('api_key', ''),
+                        entry['model'],
+                        entry.get('temperature', temperature),
+                        **client_options
+                    )
+                ))
+            self.llm = HedgedLLM(providers, **(hedge_options or {}))
+            logger.info(f"🛡️ Hedged LLM requests across {', '.join(name for name, _ in providers)}")
         
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            logger.info(f"✅ Loaded prompts config from {config_path}")
-            return config or {}
-        except Exception as e:
-            logger.error(f"❌ Error loading prompts config: {e}")
-            return {}
-    
-    def _create_prompt_template(self, prompt_type: str = "default") -> ChatPromptTemplate:
-        """
-        Tạo prompt template cho LLM
-        
-        Args:
-            prompt_type: Loại prompt (default, tech_tutorial, entertainment, educational, toeic_part_youtube)
-        """
-        # Load prompt từ config nếu có
-        custom_prompt_types = {"tech_tutorial", "entertainment", "educational", "toeic_part_youtube"}
-        
-        if self.prompts_config and prompt_type in custom_prompt_types:
-            custom_prompts = self.prompts_config.get("custom_prompts", {})
-            if prompt_type in custom_prompts:
-                base_prompt = custom_prompts[prompt_type]
-            else:
-                base_prompt = self.prompts_config.get("default_description_prompt", "")
-        else:
-            # Default prompt nếu không có config
-            base_prompt = self.prompts_config.get("default_description_prompt", "") if self.prompts_config else ""
-        
-        # Fallback to hardcoded prompt if no config
-        if not base_prompt:
-            base_prompt = """Bạn là một chuyên gia viết mô tả video cho YouTube. 
-Nhiệm vụ của bạn là tạo một mô tả hấp dẫn, SEO-friendly cho video dựa trên tên file."""
-        
-        # Special handling for toeic_part_youtube - prompt đã có format đầy đủ
-        if prompt_type == "toeic_part_youtube":
-            template = base_prompt  # Sử dụng trực tiếp prompt từ config
-        else:
-            # Build full template for other types
-            template = f"""{base_prompt}
-
-Tên video: {{video_name}}
-
-Yêu cầu:
-1. Mô tả phải hấp dẫn và thu hút người xem
-2. Tối ưu cho SEO với từ khóa liên quan
-3. Độ dài khoảng 200-500 từ
-4. Bao gồm:
-   - Giới thiệu ngắn gọn về video
-   - Nội dung chính
-   - Lợi ích người xem nhận được
-   - Call-to-action (like, share, subscribe)
-5. Sử dụng emoji phù hợp để tăng tính thu hút
-
-{{additional_context}}
-
-Hãy tạo mô tả video:"""
-        
-        return ChatPromptTemplate.from_template(template)
+        # Mỗi prompt type được compile thành chain một lần, prompts.yaml đổi thì tự load lại
+        self.prompts = PromptRegistry(self.llm, prompts_config_path)
     
     async def generate_description(
         self, 
         video_path: Path, 
         additional_context: str = "",
-        prompt_type: str = "default"
+        prompt_type: str = "default",
+        use_cache: bool = True,
+        on_title: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
         Tạo mô tả cho video
@@ -139,6 +119,8 @@ Hãy tạo mô tả video:"""
             video_path: Đường dẫn đến video file
             additional_context: Thông tin bổ sung về video
             prompt_type: Loại prompt (default, tech_tutorial, entertainment, educational)
+            use_cache: False để bỏ qua output đã cache và gọi lại LLM
+            on_title: Gọi ngay khi stream có title (trước khi LLM viết xong mô tả)
         
         Returns:
             Dict chứa description và metadata
@@ -148,40 +130,199 @@ Hãy tạo mô tả video:"""
             
             logger.info(f"Generating description for: {video_name} (prompt: {prompt_type})")
             
-            # Recreate chain with specified prompt type
-            if prompt_type != "default":
-                self.prompt_template = self._create_prompt_template(prompt_type)
-                self.chain = self.prompt_template | self.llm | StrOutputParser()
+            # Chain đã compile sẵn, không tạo lại và không sửa state dùng chung
+            prompt = self.prompts.get(prompt_type)
             
-            # Generate description using LLM
-            description = await self.chain.ainvoke({
+            inputs = {
                 "video_name": video_name,
                 "additional_context": additional_context or ""
-            })
+            }
             
-            # Parse title and description for TOEIC prompts
-            if prompt_type == "toeic_part_youtube":
-                title, description = self._parse_toeic_output(description.strip(), video_name)
+            # Cùng provider/model/prompt/video thì dùng lại output đã cache
+            started = time.monotonic()
+            description = self._cached(prompt, inputs) if use_cache else None
+            if description is not None:
+                logger.info(f"⚡ LLM cache hit for {video_name} ({(time.monotonic() - started) * 1000:.1f} ms)")
             else:
-                # Extract potential title and tags from video name for other types
-                title = self._generate_title(video_name)
+                # Generate description using LLM
+                description, answered_by = await self._answer(prompt, inputs, on_title)
+                if self.cache:
+                    self.cache.set(self._cache_key(prompt, inputs, answered_by), description)
             
-            tags = self._extract_tags(video_name)
-            
-            result = {
-                "title": title,
-                "description": description.strip(),
-                "tags": tags,
-                "video_path": str(video_path)
-            }
+            result = self._build_result(video_path, description, prompt.prompt_type)
             
             logger.success(f"✅ Generated description for {video_name}")
             return result
-            
+        
         except Exception as e:
             logger.error(f"❌ Error generating description: {e}")
             raise
     
+    async def generate_descriptions(
+        self,
+        video_paths: Iterable[Path],
+        prompt_type: str = "default",
+        contexts: Optional[Dict[Path, str]] = None,
+        max_concurrency: int = 5,
+        use_cache: bool = True
+    ) -> AsyncIterator[Tuple[Path, Union[Dict[str, Any], Exception]]]:
+        """
+        Tạo mô tả cho nhiều video, trả về từng kết quả ngay khi xong
+        
+        Video đã có trong cache được trả về trước; phần còn lại chạy qua
+        `abatch_as_completed` của chain với tối đa `max_concurrency` request
+        LLM cùng lúc (mỗi request vẫn đi qua retrier). Video lỗi được trả về
+        dạng (path, exception) để batch tiếp tục với các video khác.
+        
+        Args:
+            video_paths: Danh sách video
+            prompt_type: Loại prompt
+            contexts: Thông tin bổ sung theo từng video (optional)
+            max_concurrency: Số request LLM tối đa cùng lúc
+            use_cache: False để bỏ qua output đã cache
+        
+        Yields:
+            (video_path, dict kết quả) hoặc (video_path, exception)
+        """
+        prompt = self.prompts.get(prompt_type)
+        contexts = contexts or {}
+        pending: List[Tuple[Path, Dict[str, str]]] = []
+        for video_path in map(Path, video_paths):
+            inputs = {
+                "video_name": video_path.stem,
+                "additional_context": contexts.get(video_path) or ""
+            }
+            description = self._cached(prompt, inputs) if use_cache else None
+            if description is not None:
+                yield video_path, self._build_result(video_path, description, prompt.prompt_type)
+            else:
+                pending.append((video_path, inputs))
+        
+        if not pending:
+            return
+        logger.info(f"✍️ Generating {len(pending)} descriptions (prompt: {prompt.prompt_type}, concurrency: {max_concurrency})")
+        
+        async def invoke(inputs: Dict[str, str]) -> Tuple[str, Optional[str]]:
+            return await self._answer(prompt, inputs)
+        
+        batch = RunnableLambda(invoke).abatch_as_completed(
+            [inputs for _, inputs in pending],
+            config={"max_concurrency": max(1, max_concurrency)},
+            return_exceptions=True
+        )
+        async for index, output in batch:
+            video_path, inputs = pending[index]
+            if isinstance(output, Exception):
+                logger.error(f"❌ Error generating description for {video_path.name}: {output}")
+                yield video_path, output
+                continue
+            description, answered_by = output
+            if self.cache:
+                self.cache.set(self._cache_key(prompt, inputs, answered_by), description)
+            yield video_path, self._build_result(video_path, description, prompt.prompt_type)
+    
+    async def _answer(
+        self,
+        prompt: CompiledPrompt,
+        inputs: Dict[str, str],
+        on_title: Optional[Callable[[str], None]] = None
+    ) -> Tuple[str, Optional[str]]:
+        """Output của LLM và tên model đã trả lời ("provider:model"; None nếu không hedge)"""
+        with track_answering_provider() as answered:
+            description = await self._complete(prompt, inputs, on_title)
+        return description, answered.get("name")
+    
+    async def _complete(
+        self,
+        prompt: CompiledPrompt,
+        inputs: Dict[str, str],
+        on_title: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Output đầy đủ của LLM (qua retrier; stream nếu prompt có title và bật stream)"""
+        target = f"llm.{self.provider}"
+        if not (self.stream and prompt.prompt_type in self.TITLE_PROMPT_TYPES):
+            return await self.retrier.acall(target, prompt.chain.ainvoke, inputs)
+        
+        for attempt in range(1, self.stream_max_attempts + 1):
+            # Lần cuối không bỏ giữa chừng: output lệch format vẫn dùng được với title tạo từ tên video
+            limit = self.title_within_tokens if attempt < self.stream_max_attempts else None
+            try:
+                return await self.retrier.acall(target, self._stream, prompt, inputs, limit, on_title)
+            except OffFormatOutput as e:
+                self.stream_stats["aborted"] += 1
+                self.stream_stats["wasted_tokens"] += e.tokens
+                logger.warning(
+                    f"⚠️ Off-format LLM output for {inputs['video_name']} ({e}), "
+                    f"retrying ({attempt}/{self.stream_max_attempts})"
+                )
+    
+    async def _stream(
+        self,
+        prompt: CompiledPrompt,
+        inputs: Dict[str, str],
+        title_within_tokens: Optional[int],
+        on_title: Optional[Callable[[str], None]]
+    ) -> str:
+        """Một lần stream; OffFormatOutput đóng stream ngay (không trả tiền cho phần còn lại)"""
+        started = time.monotonic()
+        
+        def title_found(title: str):
+            logger.info(f"📌 Title after {time.monotonic() - started:.1f}s: {title[:50]}...")
+            if on_title:
+                on_title(title)
+        
+        self.stream_stats["streams"] += 1
+        parser = TitleStreamParser(title_within_tokens, on_title=title_found)
+        chunks: List[str] = []
+        async with aclosing(prompt.chain.astream(inputs)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                parser.feed(chunk)
+        return "".join(chunks)
+    
+    def _build_result(self, video_path: Path, description: str, prompt_type: str) -> Dict[str, Any]:
+        """Tách title/tags từ output LLM"""
+        video_name = Path(video_path).stem
+        # Parse title and description for TOEIC prompts
+        if prompt_type in self.TITLE_PROMPT_TYPES:
+            title, description = self._parse_toeic_output(description.strip(), video_name)
+        else:
+            # Extract potential title and tags from video name for other types
+            title = self._generate_title(video_name)
+        
+        return {
+            "title": title,
+            "description": description.strip(),
+            "tags": self._extract_tags(video_name),
+            "video_path": str(video_path)
+        }
+    
+    def prompt_version(self, prompt_type: str) -> str:
+        """Phiên bản prompt hiện tại của prompt type (đổi khi prompts.yaml được sửa)"""
+        return self.prompts.get(prompt_type).version
+    
+    def _cached(self, prompt: CompiledPrompt, inputs: Dict[str, str]) -> Optional[str]:
+        """Output đã cache của bất kỳ model nào trong pool (ưu tiên provider chính)"""
+        if not self.cache:
+            return None
+        return self.cache.get(*(self._cache_key(prompt, inputs, name) for name in self._cache_models))
+    
+    def _cache_key(self, prompt: CompiledPrompt, inputs: Dict[str, str], answered_by: Optional[str] = None) -> str:
+        """
+        Khóa cache theo model đã trả lời (mặc định provider chính), temperature,
+        prompt_type, prompt đã render và tên video
+        """
+        provider, model, temperature = self._cache_models.get(answered_by) or (self.provider, self.model, self.temperature)
+        rendered = prompt.template.format(**inputs)
+        return LLMCache.make_key(
+            provider=provider,
+            model=model,
+            temperature=temperature,
+            prompt_type=prompt.prompt_type,
+            prompt_sha256=hashlib.sha256(rendered.encode('utf-8')).hexdigest(),
+            video_name=inputs["video_name"]
+        )
+    
     def _parse_toeic_output(self, llm_output: str, video_name: str) -> tuple[str, str]:
         """
         Parse output từ LLM cho prompt TOEIC để extract title
@@ -190,45 +331,30 @@ Hãy tạo mô tả video:"""
         Args:
             llm_output: Full output từ LLM
             video_name: Tên video gốc (fallback)
-            
+        
         Returns:
             Tuple of (title, description)
         """
-        import re
+        # Cùng parser với khi stream: tách dòng title 🔥 [TOEIC PART 3] ..., bỏ dòng hướng dẫn
+        parser = TitleStreamParser()
+        parser.feed(llm_output)
+        title, description = parser.finish()
         
-        # Try to find title pattern: 🔥 [TOEIC PART 3] ...
-        title_pattern = r'(?:^|\n)([🔥✨]\s*\[TOEIC[^\]]*\][^\n]+)'
-        match = re.search(title_pattern, llm_output, re.IGNORECASE)
-        
-        if match:
-            title = match.group(1).strip()
-            # Remove title from description
-            description = llm_output.replace(match.group(0), '').strip()
+        if title:
             logger.info(f"📌 Extracted title: {title[:50]}...")
         else:
             # Fallback: Generate title from video_name
             title = self._generate_toeic_title(video_name)
-            description = llm_output
             logger.warning(f"⚠️ Could not extract title from LLM output, using generated: {title[:50]}...")
         
-        # Clean up instruction text from description
-        description = self._clean_instruction_text(description)
-        
         return title[:100], description  # YouTube title limit
     
     def _clean_instruction_text(self, text: str) -> str:
         """Remove instruction patterns like BƯỚC 1, BƯỚC 2 from description"""
         import re
         
-        # Patterns to remove
-        patterns = [
-            r'BƯỚC\s+\d+\s*[-–]\s*[^\n]+\n*',  # BƯỚC 1 - ...
-            r'^\s*BƯỚC\s+\d+[^\n]*\n*',         # BƯỚC 1 at start of line
-            r'Step\s+\d+\s*[-–]\s*[^\n]+\n*',   # Step 1 - ...
-        ]
-        
         cleaned = text
-        for pattern in patterns:
+        for pattern in INSTRUCTION_PATTERNS:
             cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE | re.MULTILINE)
         
         # Remove multiple blank lines
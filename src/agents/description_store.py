@@ -0,0 +1,116 @@
+"""
+Persistent store of generated descriptions (pre-generated for the upload queue)
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+import sqlite3
+import threading
+
+
+class DescriptionStore:
+    """
+    Lưu title/description/tags đã tạo cho từng video (SQLite, WAL)
+    
+    Batch tạo mô tả trước cho cả hàng đợi ghi kết quả vào đây; lúc upload
+    workflow chỉ đọc ra, không gọi LLM. Khóa là đường dẫn video + prompt
+    type, đổi prompt type thì mô tả được tạo lại. Giống LLMCache, mô tả quá
+    `ttl` giây hoặc tạo bằng phiên bản prompt khác bị xóa khi đọc tới.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS descriptions (
+            video TEXT NOT NULL,
+            prompt_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            tags TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            prompt_version TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (video, prompt_type)
+        );
+    """
+    
+    def __init__(self, db_file: Path, ttl: Optional[float] = None):
+        self.db_file = Path(db_file)
+        self.ttl = ttl
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        # DB tạo trước khi có cột prompt_version: mô tả cũ coi như khác phiên bản
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(descriptions)")}
+        if 'prompt_version' not in columns:
+            self._conn.execute("ALTER TABLE descriptions ADD COLUMN prompt_version TEXT NOT NULL DEFAULT ''")
+    
+    @classmethod
+    def from_settings(cls, settings) -> "DescriptionStore":
+        return cls(settings.DESCRIPTION_STORE_DB, ttl=settings.LLM_CACHE_TTL_HOURS * 3600)
+    
+    @staticmethod
+    def _key(video_path: Path) -> str:
+        return str(Path(video_path).resolve())
+    
+    def get(self, video_path: Path, prompt_type: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Mô tả đã lưu của video
+        
+        Returns:
+            None nếu chưa có, đã hết hạn hoặc tạo bằng phiên bản prompt khác `version` (entry cũ bị xóa)
+        """
+        key = self._key(video_path)
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT title, description, tags, created_at, prompt_version
+                FROM descriptions WHERE video = ? AND prompt_type = ?
+                """,
+                (key, prompt_type)
+            ).fetchone()
+            if row and self._is_stale(row[3], row[4], version):
+                self._conn.execute("DELETE FROM descriptions WHERE video = ? AND prompt_type = ?", (key, prompt_type))
+                row = None
+        if not row:
+            return None
+        return {
+            "title": row[0],
+            "description": row[1],
+            "tags": json.loads(row[2]),
+            "video_path": str(video_path)
+        }
+    
+    def _is_stale(self, created_at: str, stored_version: str, version: Optional[str]) -> bool:
+        if version is not None and stored_version != version:
+            return True
+        return self.ttl is not None and datetime.now() - datetime.fromisoformat(created_at) > timedelta(seconds=self.ttl)
+    
+    def save(self, video_path: Path, prompt_type: str, result: Dict[str, Any], version: str = ""):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO descriptions
+                    (video, prompt_type, title, description, tags, created_at, prompt_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    self._key(video_path), prompt_type, result["title"], result["description"],
+                    json.dumps(result.get("tags") or [], ensure_ascii=False), datetime.now().isoformat(), version
+                )
+            )
+    
+    def has(self, video_path: Path, prompt_type: str, version: Optional[str] = None) -> bool:
+        return self.get(video_path, prompt_type, version) is not None
+    
+    def delete(self, video_path: Path):
+        with self._lock:
+            self._conn.execute("DELETE FROM descriptions WHERE video = ?", (self._key(video_path),))
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+    
+    def close(self):
+        self._conn.close()
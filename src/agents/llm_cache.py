@@ -0,0 +1,155 @@
+"""
+Persistent LLM response cache (SQLite) with TTL and LRU eviction
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+
+class LLMCache:
+    """
+    Cache output của LLM trên đĩa
+    
+    Khóa là hash của provider, model, temperature, prompt_type, prompt đã
+    render và tên video nên chạy lại sau khi upload lỗi, dry run hay test
+    không gọi lại LLM. Entry quá `ttl` bị coi như không có; khi vượt
+    `max_entries` hoặc `max_bytes`, entry lâu không dùng nhất bị xóa trước.
+    `bypass` bỏ qua việc đọc cache (kết quả mới vẫn được ghi lại).
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at);
+    """
+    
+    def __init__(
+        self,
+        db_file: Path,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        max_bytes: int = 50 * 1024 * 1024,
+        bypass: bool = False
+    ):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    @classmethod
+    def from_settings(cls, settings) -> "LLMCache":
+        return cls(
+            settings.LLM_CACHE_DB,
+            ttl=settings.LLM_CACHE_TTL_HOURS * 3600,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            max_bytes=int(settings.LLM_CACHE_MAX_MB * 1024 * 1024),
+            bypass=settings.LLM_CACHE_BYPASS
+        )
+    
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Khóa cache từ các thành phần (thứ tự tham số không ảnh hưởng)"""
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str, *alternatives: str) -> Optional[str]:
+        """
+        Output đã cache (None nếu không có, hết hạn hoặc đang bypass)
+        
+        `alternatives` là các khóa thử tiếp theo thứ tự (vd. output của model
+        dự phòng); cả lần tra chỉ tính một hit hoặc một miss.
+        """
+        if self.bypass:
+            return None
+        now = time.time()
+        with self._lock:
+            for candidate in (key, *alternatives):
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (candidate,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, candidate))
+                    self.hits += 1
+                    return row[0]
+                if row:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (candidate,))
+            self.misses += 1
+        return None
+    
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    size = excluded.size,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (key, value, size, now, now)
+            )
+            self._evict(now)
+    
+    def _evict(self, now: float):
+        """Xóa entry hết hạn, rồi xóa theo LRU tới khi dưới giới hạn (gọi khi đang giữ lock)"""
+        expired = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+        self.evictions += expired
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall()
+        victims = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+        self.evictions += len(victims)
+        logger.debug(f"🧹 LLM cache evicted {len(victims)} entries")
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': total,
+        }
+    
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,178 @@
+"""
+Compile-once registry of prompt chains with hot reload of prompts.yaml
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+import hashlib
+import threading
+import time
+import yaml
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+
+DEFAULT_PROMPTS_PATH = Path(__file__).parent.parent.parent / "config" / "prompts.yaml"
+
+# Prompt mặc định khi không có prompts.yaml (hoặc file không khai báo)
+FALLBACK_PROMPT = """Bạn là một chuyên gia viết mô tả video cho YouTube.
+Nhiệm vụ của bạn là tạo một mô tả hấp dẫn, SEO-friendly cho video dựa trên tên file."""
+
+# Phần yêu cầu được nối sau prompt (trừ các prompt đã có format đầy đủ)
+DESCRIPTION_TEMPLATE = """{base_prompt}
+
+Tên video: {{video_name}}
+
+Yêu cầu:
+1. Mô tả phải hấp dẫn và thu hút người xem
+2. Tối ưu cho SEO với từ khóa liên quan
+3. Độ dài khoảng 200-500 từ
+4. Bao gồm:
+   - Giới thiệu ngắn gọn về video
+   - Nội dung chính
+   - Lợi ích người xem nhận được
+   - Call-to-action (like, share, subscribe)
+5. Sử dụng emoji phù hợp để tăng tính thu hút
+
+{{additional_context}}
+
+Hãy tạo mô tả video:"""
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    """Prompt đã compile: template và chain `template | llm | parser` dùng lại cho mọi lần gọi"""
+    prompt_type: str
+    template: ChatPromptTemplate
+    chain: Runnable
+    # Hash nội dung prompt: sửa prompts.yaml thì mô tả đã lưu theo bản cũ bị bỏ
+    version: str = ""
+
+
+@dataclass(frozen=True)
+class PromptSet:
+    """Một phiên bản prompts.yaml đã compile (không đổi sau khi tạo)"""
+    mtime: Optional[float]
+    config: Mapping[str, Any]
+    prompts: Mapping[str, CompiledPrompt]
+
+
+class PromptRegistry:
+    """
+    Registry prompt → chain, compile một lần
+    
+    Mỗi prompt type trong prompts.yaml được compile thành chain và kiểm tra
+    biến template ngay khi load. Khi mtime của file đổi, bộ prompt mới được
+    compile xong rồi mới thay cả bộ (lời gọi đang chạy vẫn dùng bộ cũ); nếu
+    file mới lỗi thì giữ nguyên bộ cũ.
+    """
+    
+    # Biến mà generate_description truyền vào template
+    ALLOWED_VARIABLES = frozenset({"video_name", "additional_context"})
+    REQUIRED_VARIABLES = frozenset({"video_name"})
+    # Prompt đã có format đầy đủ, dùng trực tiếp không nối DESCRIPTION_TEMPLATE
+    RAW_PROMPT_TYPES = frozenset({"toeic_part_youtube"})
+    
+    def __init__(self, llm: Runnable, config_path: Optional[Path] = None, check_interval: float = 2.0):
+        self.llm = llm
+        self.config_path = Path(config_path) if config_path else DEFAULT_PROMPTS_PATH
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._current = self._load()
+    
+    @property
+    def current(self) -> PromptSet:
+        return self._current
+    
+    @property
+    def config(self) -> Mapping[str, Any]:
+        """Nội dung prompts.yaml đang dùng"""
+        return self._current.config
+    
+    def prompt_types(self) -> list[str]:
+        return sorted(self._current.prompts)
+    
+    def get(self, prompt_type: str = "default") -> CompiledPrompt:
+        """Chain của prompt type (type không khai báo dùng prompt default)"""
+        self._maybe_reload()
+        prompts = self._current.prompts
+        return prompts.get(prompt_type) or prompts["default"]
+    
+    def _mtime(self) -> Optional[float]:
+        try:
+            return self.config_path.stat().st_mtime
+        except OSError:
+            return None
+    
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        if self._mtime() != self._current.mtime:
+            self.reload()
+    
+    def reload(self) -> bool:
+        """Compile lại prompts.yaml; True nếu bộ prompt mới đã được dùng"""
+        with self._lock:
+            try:
+                prompt_set = self._load()
+            except Exception as e:
+                logger.error(f"❌ Invalid prompts config, keeping previous prompts: {e}")
+                # Không thử lại file lỗi này cho tới khi nó được sửa (mtime đổi)
+                self._current = PromptSet(self._mtime(), self._current.config, self._current.prompts)
+                return False
+            self._current = prompt_set
+        logger.info(f"🔄 Reloaded prompts from {self.config_path} ({', '.join(self.prompt_types())})")
+        return True
+    
+    def _load(self) -> PromptSet:
+        """Đọc và compile toàn bộ prompt; lỗi cú pháp/biến template raise ValueError"""
+        mtime = self._mtime()
+        config: dict = {}
+        if mtime is None:
+            logger.warning(f"⚠️ Prompts config not found at {self.config_path}, using default prompts")
+        else:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+            if not isinstance(config, dict):
+                raise ValueError(f"{self.config_path} must contain a mapping")
+        
+        default_prompt = config.get("default_description_prompt") or FALLBACK_PROMPT
+        sources = {"default": default_prompt}
+        for prompt_type, prompt in (config.get("custom_prompts") or {}).items():
+            sources[prompt_type] = prompt or default_prompt
+        
+        prompts = {
+            prompt_type: self._compile(prompt_type, prompt)
+            for prompt_type, prompt in sources.items()
+        }
+        return PromptSet(mtime, MappingProxyType(config), MappingProxyType(prompts))
+    
+    def _compile(self, prompt_type: str, prompt: str) -> CompiledPrompt:
+        if prompt_type in self.RAW_PROMPT_TYPES:
+            template_text = prompt
+        else:
+            template_text = DESCRIPTION_TEMPLATE.format(base_prompt=prompt)
+        try:
+            template = ChatPromptTemplate.from_template(template_text)
+        except Exception as e:
+            raise ValueError(f"Prompt '{prompt_type}' is not a valid template: {e}") from e
+        
+        variables = set(template.input_variables)
+        unknown = variables - self.ALLOWED_VARIABLES
+        if unknown:
+            raise ValueError(
+                f"Prompt '{prompt_type}' uses unknown variables {sorted(unknown)} "
+                f"(allowed: {sorted(self.ALLOWED_VARIABLES)}; escape literal braces as {{{{ }}}})"
+            )
+        missing = self.REQUIRED_VARIABLES - variables
+        if missing:
+            raise ValueError(f"Prompt '{prompt_type}' must use {sorted(missing)}")
+        
+        version = hashlib.sha256(template_text.encode('utf-8')).hexdigest()[:16]
+        return CompiledPrompt(prompt_type, template, template | self.llm | StrOutputParser(), version)
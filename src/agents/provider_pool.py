@@ -0,0 +1,291 @@
+"""
+Hedged LLM requests across providers/models with adaptive per-provider latency thresholds
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import time
+from langchain_core.runnables import Runnable, RunnableConfig
+from loguru import logger
+
+
+def create_chat_model(provider: str, api_key: str, model: str, temperature: float, **client_options: Any) -> Runnable:
+    """Chat model của provider ("openai" hoặc "gemini")"""
+    provider = provider.lower()
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(api_key=api_key, model=model, temperature=temperature, **client_options)
+        logger.info(f"✅ Initialized OpenAI LLM: {model}")
+    elif provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(google_api_key=api_key, model=model, temperature=temperature, **client_options)
+        logger.info(f"✅ Initialized Gemini LLM: {model}")
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    return llm
+
+
+# Provider trả lời lời gọi hiện tại; dict dùng chung nên vẫn thấy được từ các task con của chain
+_answered_by: ContextVar[Optional[Dict[str, str]]] = ContextVar("hedged_llm_answered_by", default=None)
+
+
+@contextmanager
+def track_answering_provider() -> Iterator[Dict[str, str]]:
+    """
+    Ghi lại provider đã trả lời các lời gọi HedgedLLM bên trong block
+    
+    Sau block, `answered["name"]` là tên provider ("provider:model") thắng
+    lần gọi cuối (không có key nếu không đi qua HedgedLLM).
+    """
+    answered: Dict[str, str] = {}
+    token = _answered_by.set(answered)
+    try:
+        yield answered
+    finally:
+        _answered_by.reset(token)
+
+
+class LatencyHistogram:
+    """
+    Latency của `window` lần gọi gần nhất
+    
+    Chỉ giữ cửa sổ gần đây nên quantile tự đổi theo tình trạng hiện tại
+    của provider (vd. Gemini chậm trong vài phút). Request bị hủy khi thua
+    hedge được ghi là mẫu bị chặn (`censored`: latency thật lớn hơn giá trị
+    ghi); quantile tính theo Kaplan-Meier nên không lệch về phía request nhanh.
+    """
+    
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=max(1, window))
+        self.count = 0
+    
+    def observe(self, seconds: float, censored: bool = False):
+        self._samples.append((seconds, censored))
+        self.count += 1
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def censored_fraction(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, censored in self._samples if censored) / len(self._samples)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        # Cùng thời điểm thì mẫu đầy đủ (False) đứng trước mẫu bị chặn
+        ordered = sorted(self._samples)
+        at_risk = len(ordered)
+        survival = 1.0
+        for seconds, censored in ordered:
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if 1 - survival > q + 1e-9:
+                    return seconds
+            at_risk -= 1
+        # Phần đuôi chỉ còn mẫu bị chặn: latency lớn nhất đã biết là cận dưới
+        return ordered[-1][0]
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'samples': len(self._samples),
+            'censored': sum(1 for _, censored in self._samples if censored),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+        }
+
+
+@dataclass
+class PoolMember:
+    """Một provider/model trong pool và thống kê của nó"""
+    name: str
+    llm: Runnable
+    latency: LatencyHistogram
+    first_chunk: LatencyHistogram
+    calls: int = 0
+    wins: int = 0
+    errors: int = 0
+
+
+class HedgedLLM(Runnable):
+    """
+    LLM gửi request tới provider chính, hedge sang provider dự phòng khi chậm
+    
+    Request đi tới provider đầu tiên; nếu sau ngưỡng trễ (quantile `quantile`
+    của latency gần đây của provider đang chạy, trong [min_delay, max_delay];
+    chưa đủ `min_samples` mẫu thì dùng `initial_delay`) vẫn chưa có kết quả
+    thì gửi thêm một request tới provider tiếp theo. Khi phần lớn mẫu trong
+    cửa sổ bị chặn (`max_censored`), quantile chỉ còn là latency lớn nhất đã
+    chờ nên ngưỡng bị giới hạn ở `initial_delay`, tránh việc hedge tự tắt.
+    Kết quả hợp lệ đầu tiên được dùng, request còn lại bị hủy. Provider lỗi
+    thì chuyển ngay sang provider tiếp theo. Khi stream, "kết quả" là chunk
+    đầu tiên; stream thua bị đóng.
+    
+    Dùng như chat model bình thường (`prompt | hedged_llm | parser`).
+    """
+    
+    def __init__(
+        self,
+        providers: List[Tuple[str, Runnable]],
+        quantile: float = 0.95,
+        initial_delay: float = 8.0,
+        min_delay: float = 1.0,
+        max_delay: float = 30.0,
+        min_samples: int = 20,
+        window: int = 200,
+        max_censored: float = 0.5
+    ):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.members = [
+            PoolMember(name, llm, LatencyHistogram(window), LatencyHistogram(window))
+            for name, llm in providers
+        ]
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_censored = max_censored
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.calls = 0
+    
+    def hedge_delay(self, member: PoolMember, histogram: str = "latency") -> float:
+        """Thời gian chờ `member` trước khi gửi request dự phòng"""
+        samples: LatencyHistogram = getattr(member, histogram)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        delay = samples.quantile(self.quantile)
+        if samples.censored_fraction() > self.max_censored:
+            # Đuôi phân phối chưa biết: không để ngưỡng leo theo thời gian chờ lớn nhất
+            delay = min(delay, self.initial_delay)
+        return min(self.max_delay, max(self.min_delay, delay))
+    
+    async def _race(
+        self,
+        call: Callable[[PoolMember], Awaitable[Any]],
+        histogram: str,
+        is_valid: Callable[[Any], bool],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None
+    ) -> Any:
+        """Chạy `call` trên provider chính, hedge theo ngưỡng, trả kết quả hợp lệ đầu tiên"""
+        self.calls += 1
+        queue = list(self.members)
+        # Task -> (provider, thời điểm gửi, lý do gửi: "primary" / "hedge" / "failover")
+        running: Dict[asyncio.Task, Tuple[PoolMember, float, str]] = {}
+        errors: List[BaseException] = []
+        
+        def launch(reason: str):
+            member = queue.pop(0)
+            member.calls += 1
+            running[asyncio.create_task(call(member))] = (member, time.monotonic(), reason)
+            return member
+        
+        last = launch("primary")
+        try:
+            while running:
+                timeout = self.hedge_delay(last, histogram) if queue else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    slow = last
+                    last = launch("hedge")
+                    logger.info(f"🐢 {slow.name} slower than {timeout:.1f}s, hedging with {last.name}")
+                    continue
+                
+                for task in done:
+                    member, started, reason = running.pop(task)
+                    error = task.exception()
+                    if error is None and is_valid(task.result()):
+                        getattr(member, histogram).observe(time.monotonic() - started)
+                        member.wins += 1
+                        answered = _answered_by.get()
+                        if answered is not None:
+                            answered["name"] = member.name
+                        if reason == "hedge":
+                            self.hedge_wins += 1
+                        elif reason == "failover":
+                            self.failovers += 1
+                        return task.result()
+                    member.errors += 1
+                    errors.append(error or ValueError(f"Empty response from {member.name}"))
+                    logger.warning(f"⚠️ LLM {member.name} failed: {errors[-1]}")
+                
+                # Provider lỗi: gửi ngay provider tiếp theo, không chờ ngưỡng
+                if not running and queue:
+                    last = launch("failover")
+            raise errors[0]
+        finally:
+            # Hủy request thua (kể cả khi lời gọi bị hủy từ bên ngoài); thời gian đã chờ là cận dưới latency
+            now = time.monotonic()
+            for task, (member, started, _) in running.items():
+                task.cancel()
+                getattr(member, histogram).observe(now - started, censored=True)
+            for result in await asyncio.gather(*running, return_exceptions=True):
+                if discard and not isinstance(result, BaseException):
+                    await discard(result)
+    
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Bản đồng bộ: không hedge, lần lượt thử từng provider khi lỗi"""
+        errors = []
+        for member in self.members:
+            member.calls += 1
+            try:
+                return member.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                member.errors += 1
+                errors.append(e)
+                logger.warning(f"⚠️ LLM {member.name} failed: {e}")
+        raise errors[0]
+    
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self._race(
+            lambda member: member.llm.ainvoke(input, config, **kwargs),
+            "latency",
+            is_valid=lambda message: bool(getattr(message, 'content', message))
+        )
+    
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        async def first_chunk(member: PoolMember):
+            stream = member.llm.astream(input, config, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+        
+        async def close(result):
+            await result[0].aclose()
+        
+        stream, chunk = await self._race(first_chunk, "first_chunk", is_valid=lambda _: True, discard=close)
+        try:
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+            'providers': {
+                member.name: {
+                    'calls': member.calls,
+                    'wins': member.wins,
+                    'errors': member.errors,
+                    'hedge_delay': self.hedge_delay(member),
+                    **member.latency.as_dict(),
+                    'first_chunk_p95': member.first_chunk.quantile(0.95),
+                }
+                for member in self.members
+            },
+        }
@@ -0,0 +1,111 @@
+"""
+Incremental parser for streamed LLM output (title sớm, làm sạch từng dòng, phát hiện lệch format)
+"""
+from typing import Callable, List, Optional, Tuple
+import re
+
+
+# Title dạng: 🔥 [TOEIC PART 3] ...
+TITLE_PATTERN = re.compile(r'([🔥✨]\s*\[TOEIC[^\]]*\][^\n]+)', re.IGNORECASE)
+TITLE_START_PATTERN = re.compile(r'\s*[🔥✨]')
+
+# Dòng hướng dẫn LLM chép lại từ prompt (BƯỚC 1 - ..., Step 1 - ...)
+INSTRUCTION_PATTERNS = [
+    r'BƯỚC\s+\d+\s*[-–]\s*[^\n]+\n*',  # BƯỚC 1 - ...
+    r'^\s*BƯỚC\s+\d+[^\n]*\n*',         # BƯỚC 1 at start of line
+    r'Step\s+\d+\s*[-–]\s*[^\n]+\n*',   # Step 1 - ...
+]
+
+# Ước lượng số token từ số ký tự (~4 ký tự/token)
+CHARS_PER_TOKEN = 4
+
+YOUTUBE_TITLE_LIMIT = 100
+
+
+def clean_instruction_line(line: str) -> str:
+    """Bỏ phần hướng dẫn trong một dòng"""
+    for pattern in INSTRUCTION_PATTERNS:
+        line = re.sub(pattern, '', line, flags=re.IGNORECASE | re.MULTILINE)
+    return line
+
+
+class OffFormatOutput(Exception):
+    """Output đang stream không theo format yêu cầu (bỏ giữa chừng để gọi lại)"""
+    
+    def __init__(self, message: str, tokens: int):
+        super().__init__(message)
+        self.tokens = tokens
+
+
+class TitleStreamParser:
+    """
+    Parse output LLM theo từng chunk
+    
+    Mỗi dòng hoàn chỉnh được xử lý ngay: dòng title đầu tiên được tách ra
+    (gọi `on_title` luôn, không chờ hết output), dòng hướng dẫn bị bỏ cùng
+    các dòng trống ngay sau nó. Nếu đặt `title_within_tokens` mà chừng ấy
+    token đầu chưa có title thì raise OffFormatOutput.
+    """
+    
+    def __init__(
+        self,
+        title_within_tokens: Optional[int] = None,
+        on_title: Optional[Callable[[str], None]] = None
+    ):
+        self.title_within_tokens = title_within_tokens
+        self.on_title = on_title
+        self.title: Optional[str] = None
+        self.chars = 0
+        self._buffer = ""
+        self._lines: List[str] = []
+        self._skip_blank = False
+    
+    @property
+    def tokens(self) -> int:
+        return self.chars // CHARS_PER_TOKEN
+    
+    @property
+    def description(self) -> str:
+        """Phần mô tả đã làm sạch tới dòng hoàn chỉnh gần nhất"""
+        return re.sub(r'\n{3,}', '\n\n', "\n".join(self._lines)).strip()
+    
+    def feed(self, chunk: str):
+        self.chars += len(chunk)
+        *lines, self._buffer = (self._buffer + chunk).split("\n")
+        for line in lines:
+            self._add_line(line)
+        
+        if (
+            self.title is None
+            and self.title_within_tokens
+            and self.tokens > self.title_within_tokens
+            and not TITLE_START_PATTERN.match(self._buffer)  # Dòng title đang stream dở
+        ):
+            raise OffFormatOutput(f"no title within the first {self.title_within_tokens} tokens", self.tokens)
+    
+    def finish(self) -> Tuple[Optional[str], str]:
+        """Xử lý nốt dòng cuối, trả về (title hoặc None, description)"""
+        if self._buffer:
+            self._add_line(self._buffer)
+            self._buffer = ""
+        return self.title, self.description
+    
+    def _add_line(self, line: str):
+        if self.title is None:
+            match = TITLE_PATTERN.match(line.strip())
+            if match:
+                self.title = match.group(1).strip()[:YOUTUBE_TITLE_LIMIT]
+                if self.on_title:
+                    self.on_title(self.title)
+                return
+        
+        cleaned = clean_instruction_line(line)
+        if cleaned != line:
+            self._skip_blank = True
+            if not cleaned.strip():
+                return
+        elif not line.strip() and self._skip_blank:
+            return
+        else:
+            self._skip_blank = False
+        self._lines.append(cleaned)
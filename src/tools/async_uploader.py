@@ -0,0 +1,456 @@
+"""
+Native asyncio YouTube resumable upload (httpx), không block event loop
+"""
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, Union
+import asyncio
+import inspect
+import mimetypes
+import time
+from loguru import logger
+import httpx
+
+from src.tools.chunk_sizer import AdaptiveChunkSizer
+from src.tools.http_pool import HttpPool
+from src.tools.quota import QuotaLedger
+from src.tools.rate_limiter import BandwidthLimiter
+from src.tools.telemetry import UploadTelemetry, UploadTrace
+from src.tools.upload_sessions import UploadSessionStore
+from src.tools.youtube_auth import YouTubeAuth
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.retry import Retrier
+
+
+# progress_callback(bytes_sent, total_bytes), có thể là hàm thường hoặc coroutine
+ProgressCallback = Callable[[int, int], Union[None, Awaitable[None]]]
+
+
+class AsyncYouTubeUploader:
+    """
+    Upload video/thumbnail lên YouTube bằng httpx.AsyncClient
+    
+    Cùng giao thức resumable và cùng UploadSessionStore với YouTubeUploader
+    (session của bản đồng bộ dùng tiếp được ở đây và ngược lại). Mỗi chunk
+    được stream từ file theo block nhỏ, đọc file trong thread nên event
+    loop không bao giờ bị block, nhiều upload và LLM call chạy xen kẽ được.
+    
+    Với `adaptive_chunks`, kích thước chunk được điều chỉnh sau mỗi chunk
+    theo throughput và RTT đo được (AdaptiveChunkSizer). Lỗi tạm thời được
+    retry theo `retrier`; chunk lỗi được gửi lại từ byte server đã xác nhận.
+    """
+    
+    API_BASE_URL = "https://www.googleapis.com"
+    UPLOAD_PATH = "/upload/youtube/v3/videos"
+    THUMBNAIL_PATH = "/upload/youtube/v3/thumbnails/set"
+    
+    # Mỗi chunk được gửi thành nhiều block nhỏ (giới hạn bộ nhớ và làm mượt rate limit)
+    STREAM_BLOCK_SIZE = 256 * 1024
+    
+    def __init__(
+        self,
+        auth: Optional[YouTubeAuth] = None,
+        chunk_size: int = 8 * 1024 * 1024,
+        sessions: Optional[UploadSessionStore] = None,
+        rate_limiter: Optional[BandwidthLimiter] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 60.0,
+        adaptive_chunks: bool = False,
+        max_chunk_size: int = 64 * 1024 * 1024,
+        target_chunk_seconds: float = 5.0,
+        retrier: Optional[Retrier] = None,
+        quota: Optional[QuotaLedger] = None,
+        pool: Optional[HttpPool] = None,
+        base_url: Optional[str] = None,
+        telemetry: Optional[UploadTelemetry] = None
+    ):
+        self.auth = auth
+        self.chunk_size = chunk_size
+        self.sessions = sessions or UploadSessionStore(Path('data/upload_sessions'))
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.adaptive_chunks = adaptive_chunks
+        self.max_chunk_size = max_chunk_size
+        self.target_chunk_seconds = target_chunk_seconds
+        self.retrier = retrier or Retrier(max_attempts=1)
+        self.quota = quota
+        self.pool = pool
+        self.telemetry = telemetry or UploadTelemetry()
+        # base_url khác (vd. mock server local) thay cho https://www.googleapis.com
+        base_url = (base_url or self.API_BASE_URL).rstrip('/')
+        self.upload_url = base_url + self.UPLOAD_PATH
+        self.thumbnail_url = base_url + self.THUMBNAIL_PATH
+        self._client = client
+    
+    @classmethod
+    def from_uploader(cls, uploader: YouTubeUploader, **kwargs: Any) -> "AsyncYouTubeUploader":
+        """Dùng chung credentials, chunk size (kể cả adaptive), session store và rate limiter với uploader đồng bộ"""
+        options = dict(
+            auth=uploader.auth,
+            chunk_size=uploader.chunk_size,
+            sessions=uploader.sessions,
+            rate_limiter=uploader.rate_limiter,
+            retrier=uploader.retrier,
+            quota=uploader.quota,
+            pool=uploader.pool,
+            base_url=uploader.base_url,
+            telemetry=uploader.telemetry,
+            adaptive_chunks=uploader.adaptive_chunks,
+            max_chunk_size=uploader.max_chunk_size,
+            target_chunk_seconds=uploader.target_chunk_seconds
+        )
+        options.update(kwargs)
+        return cls(**options)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client của pool dùng chung (kết nối keep-alive), hoặc client riêng nếu không có pool"""
+        if self._client is not None:
+            return self._client
+        if self.pool is not None:
+            return self.pool.async_client()
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.pool is not None:
+            self.pool.log_stats()
+            await self.pool.aclose()
+    
+    async def _headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Header kèm access token (token thường đã được refresh sẵn trong background)"""
+        headers = dict(extra or {})
+        if self.auth is not None:
+            credentials = self.auth.peek()
+            if credentials is None:
+                # Load lần đầu hoặc refresh đồng bộ: chạy trong thread để không block event loop
+                credentials = await asyncio.to_thread(self.auth.get_credentials)
+            credentials.apply(headers)
+        return headers
+    
+    async def upload_video(
+        self,
+        video_path: Path,
+        title: str,
+        description: str,
+        tags: list[str],
+        category_id: str = "22",
+        privacy_status: str = "public",
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Upload video lên YouTube
+        
+        Args:
+            video_path: Đường dẫn video
+            title: Tiêu đề video
+            description: Mô tả video
+            tags: Danh sách tags
+            category_id: ID category YouTube
+            privacy_status: public/private/unlisted
+            progress_callback: Gọi (và await nếu là coroutine) sau mỗi chunk với (bytes_sent, total_bytes)
+        
+        Returns:
+            Dict chứa thông tin video đã upload
+        """
+        trace = None
+        try:
+            logger.info(f"📤 Uploading video: {video_path.name}")
+            
+            body = {
+                'snippet': {
+                    'title': title,
+                    'description': description,
+                    'tags': tags,
+                    'categoryId': category_id
+                },
+                'status': {
+                    'privacyStatus': privacy_status
+                }
+            }
+            size = video_path.stat().st_size
+            sizer = self._new_sizer()
+            
+            started = time.monotonic()
+            session_uri, offset, response = await self.retrier.acall(
+                'youtube.upload', self._resume_session, video_path, size
+            )
+            if session_uri is None and response is None:
+                if self.quota:
+                    self.quota.charge('videos.insert')
+                started = time.monotonic()
+                session_uri = await self.retrier.acall(
+                    'youtube.upload', self._start_session, video_path, body, size
+                )
+                offset = 0
+            sizer.observe_rtt(time.monotonic() - started)
+            trace = self.telemetry.start_upload(video_path.name, size, offset)
+            
+            while response is None:
+                attempts = 0
+                
+                async def next_chunk() -> Tuple[Optional[Dict[str, Any]], int]:
+                    # Lần thử lại phải hỏi server đã nhận tới byte nào rồi mới gửi tiếp
+                    nonlocal attempts
+                    attempts += 1
+                    start = offset
+                    if attempts > 1:
+                        trace.record_retry()
+                        done, start = await self._sync_offset(session_uri, size)
+                        if done is not None:
+                            return done, size
+                    return await self._upload_chunk(session_uri, video_path, start, size, sizer, trace)
+                
+                response, offset = await self.retrier.acall('youtube.upload', next_chunk)
+                if response is None:
+                    self.sessions.save(video_path, session_uri, offset, title=title)
+                logger.info(trace.progress_message())
+                if progress_callback:
+                    result = progress_callback(offset, size)
+                    if inspect.isawaitable(result):
+                        await result
+            
+            self.sessions.delete(video_path)
+            video_id = response['id']
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            trace.finish('success', video_id=video_id)
+            
+            logger.success(f"✅ Video uploaded successfully: {video_url}")
+            
+            return {
+                'video_id': video_id,
+                'video_url': video_url,
+                'title': title,
+                'status': 'success'
+            }
+        
+        except Exception as e:
+            logger.error(f"❌ Error uploading video: {e}")
+            if trace is not None:
+                trace.finish('error', error=str(e))
+            return None
+    
+    async def _upload_chunk(
+        self,
+        session_uri: str,
+        video_path: Path,
+        start: int,
+        size: int,
+        sizer: AdaptiveChunkSizer,
+        trace: Optional[UploadTrace] = None
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Gửi chunk tiếp theo bắt đầu từ `start`, cập nhật sizer và telemetry theo thời gian đo được"""
+        end = min(start + sizer.chunk_size, size)
+        timing = {'disk': 0.0, 'limiter': 0.0}
+        started = time.monotonic()
+        response, confirmed = await self._send_chunk(session_uri, video_path, start, end, size, timing)
+        if trace is not None and confirmed > start:
+            trace.record_chunk(
+                confirmed, confirmed - start, time.monotonic() - started,
+                disk_seconds=timing['disk'], limiter_seconds=timing['limiter'], chunk_size=end - start
+            )
+        if self.adaptive_chunks and confirmed > start:
+            sizer.observe_chunk(confirmed - start, time.monotonic() - started)
+        return response, confirmed
+    
+    def _new_sizer(self) -> AdaptiveChunkSizer:
+        """Sizer riêng cho mỗi upload (chunk cố định nếu không bật adaptive)"""
+        return AdaptiveChunkSizer.for_upload(
+            self.chunk_size, self.adaptive_chunks, self.max_chunk_size, self.target_chunk_seconds
+        )
+    
+    async def _start_session(self, video_path: Path, body: Dict[str, Any], size: int) -> str:
+        """Khởi tạo resumable session, trả về session URI"""
+        mimetype = mimetypes.guess_type(video_path.name)[0] or 'application/octet-stream'
+        headers = await self._headers({
+            'X-Upload-Content-Length': str(size),
+            'X-Upload-Content-Type': mimetype,
+        })
+        resp = await self.client.post(
+            self.upload_url,
+            params={'uploadType': 'resumable', 'part': 'snippet,status'},
+            json=body,
+            headers=headers
+        )
+        resp.raise_for_status()
+        return resp.headers['location']
+    
+    async def _send_chunk(
+        self,
+        session_uri: str,
+        video_path: Path,
+        start: int,
+        end: int,
+        size: int,
+        timing: Optional[Dict[str, float]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Gửi byte [start, end) của file
+        
+        `timing` (nếu có) được cộng thêm thời gian đọc đĩa và chờ rate limiter.
+        
+        Returns:
+            (response của video nếu đã xong, số byte server đã xác nhận)
+        """
+        headers = await self._headers({
+            'Content-Length': str(end - start),
+            'Content-Range': f'bytes {start}-{end - 1}/{size}',
+        })
+        resp = await self.client.put(
+            session_uri,
+            content=self._read_range(video_path, start, end, timing),
+            headers=headers
+        )
+        if resp.status_code in (200, 201):
+            return resp.json(), size
+        if resp.status_code == 308:
+            return None, self._confirmed_bytes(resp)
+        resp.raise_for_status()
+        raise httpx.HTTPStatusError(
+            f"Unexpected status {resp.status_code} for upload chunk",
+            request=resp.request,
+            response=resp
+        )
+    
+    async def _read_range(
+        self,
+        video_path: Path,
+        start: int,
+        end: int,
+        timing: Optional[Dict[str, float]] = None
+    ) -> AsyncIterator[bytes]:
+        """Đọc file theo block trong thread, chờ rate limiter (không block) trước mỗi block"""
+        timing = timing if timing is not None else {'disk': 0.0, 'limiter': 0.0}
+        with open(video_path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                read_started = time.monotonic()
+                block = await asyncio.to_thread(f.read, min(self.STREAM_BLOCK_SIZE, remaining))
+                timing['disk'] += time.monotonic() - read_started
+                if not block:
+                    raise OSError(f"{video_path.name} shrank during upload")
+                if self.rate_limiter:
+                    wait = self.rate_limiter.reserve(len(block))
+                    if wait > 0:
+                        timing['limiter'] += wait
+                        await asyncio.sleep(wait)
+                remaining -= len(block)
+                yield block
+    
+    @staticmethod
+    def _confirmed_bytes(resp: httpx.Response) -> int:
+        """Số byte server đã nhận theo header Range (bytes=0-N)"""
+        range_header = resp.headers.get('range')
+        return int(range_header.split('-')[1]) + 1 if range_header else 0
+    
+    async def _session_status(self, session_uri: str, size: int) -> httpx.Response:
+        """Hỏi server số byte đã nhận (PUT rỗng với Content-Range: bytes */size)"""
+        headers = await self._headers({'Content-Range': f'bytes */{size}', 'Content-Length': '0'})
+        return await self.client.put(session_uri, headers=headers)
+    
+    async def _sync_offset(self, session_uri: str, size: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Đồng bộ lại vị trí sau khi một chunk bị lỗi
+        
+        Returns:
+            (response của video nếu server đã nhận đủ, số byte server đã xác nhận)
+        """
+        resp = await self._session_status(session_uri, size)
+        if resp.status_code in (200, 201):
+            return resp.json(), size
+        if resp.status_code == 308:
+            return None, self._confirmed_bytes(resp)
+        resp.raise_for_status()
+        raise httpx.HTTPStatusError(
+            f"Unexpected status {resp.status_code} for session status",
+            request=resp.request,
+            response=resp
+        )
+    
+    async def _resume_session(
+        self,
+        video_path: Path,
+        size: int
+    ) -> Tuple[Optional[str], int, Optional[Dict[str, Any]]]:
+        """
+        Tiếp tục session upload đã lưu (nếu có)
+        
+        Returns:
+            (session URI, byte bắt đầu, response nếu upload đã hoàn tất);
+            session URI là None khi cần tạo session mới
+        """
+        session = self.sessions.load(video_path)
+        if not session:
+            return None, 0, None
+        
+        session_uri = session['resumable_uri']
+        resp = await self._session_status(session_uri, size)
+        
+        if resp.status_code in (200, 201):
+            logger.info(f"♻️ Upload of {video_path.name} had already completed")
+            self.sessions.delete(video_path)
+            return session_uri, size, resp.json()
+        
+        if resp.status_code == 308:
+            progress = self._confirmed_bytes(resp)
+            logger.info(
+                f"♻️ Resuming upload of {video_path.name} from byte {progress:,}/{size:,} "
+                f"({progress * 100 // max(size, 1)}%)"
+            )
+            return resp.headers.get('location', session_uri), progress, None
+        
+        if resp.status_code in (404, 410):
+            logger.warning(f"⚠️ Upload session for {video_path.name} is no longer valid, starting over")
+            self.sessions.delete(video_path)
+            return None, 0, None
+        
+        resp.raise_for_status()
+        raise httpx.HTTPStatusError(
+            f"Unexpected status {resp.status_code} for session status",
+            request=resp.request,
+            response=resp
+        )
+    
+    async def upload_thumbnail(self, video_id: str, thumbnail_path: Path) -> bool:
+        """
+        Upload thumbnail cho video
+        
+        Args:
+            video_id: ID của video trên YouTube
+            thumbnail_path: Đường dẫn đến thumbnail image
+        
+        Returns:
+            True nếu thành công, False nếu thất bại
+        """
+        try:
+            if not thumbnail_path.exists():
+                logger.error(f"❌ Thumbnail not found: {thumbnail_path}")
+                return False
+            
+            logger.info(f"📷 Uploading thumbnail for video {video_id}...")
+            
+            content = await asyncio.to_thread(thumbnail_path.read_bytes)
+            mimetype = mimetypes.guess_type(thumbnail_path.name)[0] or 'image/jpeg'
+            await self.retrier.acall('youtube.thumbnail', self._post_thumbnail, video_id, content, mimetype)
+            
+            logger.success(f"✅ Thumbnail uploaded successfully")
+            return True
+        
+        except Exception as e:
+            logger.error(f"❌ Error uploading thumbnail: {e}")
+            return False
+    
+    async def _post_thumbnail(self, video_id: str, content: bytes, mimetype: str):
+        resp = await self.client.post(
+            self.thumbnail_url,
+            params={'videoId': video_id, 'uploadType': 'media'},
+            content=content,
+            headers=await self._headers({'Content-Type': mimetype})
+        )
+        # Server đã nhận request: tính quota cả khi trả lỗi (lỗi kết nối thì không)
+        if self.quota:
+            self.quota.charge('thumbnails.set')
+        resp.raise_for_status()
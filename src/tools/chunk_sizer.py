@@ -0,0 +1,90 @@
+"""
+Adaptive chunk sizing for resumable uploads (throughput + RTT based)
+"""
+from typing import Optional
+from loguru import logger
+
+
+# Chunk phải là bội số của 256 KiB theo giao thức resumable upload
+CHUNK_ALIGNMENT = 256 * 1024
+
+
+def align_chunk_size(nbytes: float) -> int:
+    """Làm tròn xuống bội số của 256 KiB (tối thiểu 256 KiB)"""
+    return max(CHUNK_ALIGNMENT, int(nbytes) // CHUNK_ALIGNMENT * CHUNK_ALIGNMENT)
+
+
+class AdaptiveChunkSizer:
+    """
+    Chọn kích thước chunk tiếp theo từ throughput và RTT đo được
+    
+    Mỗi chunk là một request riêng nên mất ít nhất một RTT chờ server xác
+    nhận. Chunk được chọn sao cho thời gian truyền xấp xỉ
+    max(target_seconds, rtt_factor * RTT): đủ lớn để RTT không đáng kể
+    (giữ đường truyền luôn đầy), đủ nhỏ để mất kết nối chỉ phải gửi lại ít.
+    Khi bị rate limit, throughput đo được giảm nên chunk cũng nhỏ lại.
+    """
+    
+    def __init__(
+        self,
+        initial_size: int,
+        min_size: int = CHUNK_ALIGNMENT,
+        max_size: int = 64 * 1024 * 1024,
+        target_seconds: float = 5.0,
+        rtt_factor: float = 10.0,
+        smoothing: float = 0.3
+    ):
+        self.min_size = align_chunk_size(min_size)
+        self.max_size = max(self.min_size, align_chunk_size(max_size))
+        self.chunk_size = self._clamp(initial_size)
+        self.target_seconds = target_seconds
+        self.rtt_factor = rtt_factor
+        self.smoothing = smoothing
+        self.throughput: Optional[float] = None
+        self.rtt: Optional[float] = None
+    
+    @classmethod
+    def for_upload(
+        cls,
+        chunk_size: int,
+        adaptive: bool,
+        max_chunk_size: int,
+        target_seconds: float
+    ) -> "AdaptiveChunkSizer":
+        """Sizer riêng cho mỗi lượt upload (chunk cố định `chunk_size` nếu không bật adaptive)"""
+        max_size = max_chunk_size if adaptive else chunk_size
+        return cls(chunk_size, max_size=max(max_size, chunk_size), target_seconds=target_seconds)
+    
+    def _clamp(self, nbytes: float) -> int:
+        return align_chunk_size(min(self.max_size, max(self.min_size, nbytes)))
+    
+    def observe_rtt(self, seconds: float):
+        """Ghi nhận thời gian của một request nhỏ (giữ giá trị nhỏ nhất)"""
+        if seconds > 0:
+            self.rtt = seconds if self.rtt is None else min(self.rtt, seconds)
+    
+    def observe_chunk(self, nbytes: int, seconds: float) -> int:
+        """
+        Ghi nhận một chunk đã gửi xong và trả về kích thước chunk tiếp theo
+        
+        Args:
+            nbytes: Số byte của chunk
+            seconds: Thời gian từ lúc gửi tới lúc server xác nhận
+        """
+        transfer = max(seconds - (self.rtt or 0), 1e-3)
+        sample = nbytes / transfer
+        if self.throughput is None:
+            self.throughput = sample
+        else:
+            self.throughput = self.smoothing * sample + (1 - self.smoothing) * self.throughput
+        
+        target = max(self.target_seconds, self.rtt_factor * (self.rtt or 0))
+        # Tăng tối đa gấp đôi mỗi bước để không nhảy vọt vì một mẫu đo nhiễu
+        desired = min(self.throughput * target, self.chunk_size * 2)
+        previous, self.chunk_size = self.chunk_size, self._clamp(desired)
+        if self.chunk_size != previous:
+            logger.debug(
+                f"Chunk size {previous // 1024} -> {self.chunk_size // 1024} KiB "
+                f"({self.throughput * 8 / 1_000_000:.1f} Mbps, RTT {self.rtt or 0:.3f}s)"
+            )
+        return self.chunk_size
@@ -0,0 +1,159 @@
+"""
+Shared keep-alive HTTP connection pool for YouTube API calls (sync httplib2 + async httpx)
+"""
+from typing import Any, Dict, Optional
+import importlib.util
+import threading
+from loguru import logger
+import google_auth_httplib2
+import httplib2
+import httpx
+
+
+class ConnectionStats:
+    """Đếm số request và số kết nối mới (phần còn lại là kết nối được dùng lại)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+    
+    def record(self, new_connection: bool):
+        with self._lock:
+            self.requests += 1
+            if new_connection:
+                self.connections += 1
+    
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'reused': reused,
+                'reuse_ratio': round(reused / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+class PooledHttp(httplib2.Http):
+    """
+    httplib2.Http ghi nhận request nào mở kết nối mới
+    
+    httplib2 giữ kết nối theo host và dùng lại nếu server không đóng,
+    nên một instance dùng lâu dài chỉ bắt tay TLS một lần cho mỗi host.
+    """
+    
+    def __init__(self, stats: ConnectionStats, timeout: Optional[float] = None):
+        super().__init__(timeout=timeout)
+        self.stats = stats
+        # 308 của resumable upload không phải redirect (giống googleapiclient.http.build_http)
+        self.redirect_codes = self.redirect_codes - {308}
+    
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        self.stats.record(conn.sock is None)
+        return super()._conn_request(conn, request_uri, method, body, headers)
+
+
+class HttpPool:
+    """
+    Tầng HTTP dùng chung cho mọi YouTube API call của một uploader
+    
+    - Async: một httpx.AsyncClient với giới hạn kết nối, keep-alive và
+      timeout cấu hình được (HTTP/2 nếu bật và đã cài `h2`).
+    - Sync: mỗi thread một AuthorizedHttp sống lâu (httplib2 không
+      thread-safe) thay vì client mới cho từng request.
+    
+    Upload, thumbnail, metadata và status call sau đó đi qua cùng kết nối
+    đã "ấm". Số kết nối mới / dùng lại được đếm riêng cho sync và async.
+    """
+    
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        http2: bool = False
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.http2 = http2 and self._http2_available()
+        self.sync_stats = ConnectionStats()
+        self.async_stats = ConnectionStats()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._local = threading.local()
+    
+    @classmethod
+    def from_settings(cls, settings) -> "HttpPool":
+        return cls(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.HTTP_READ_TIMEOUT,
+            http2=settings.HTTP_HTTP2
+        )
+    
+    @staticmethod
+    def _http2_available() -> bool:
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("⚠️ HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+            return False
+        return True
+    
+    def authorized_http(self, credentials) -> google_auth_httplib2.AuthorizedHttp:
+        """AuthorizedHttp của thread hiện tại (tạo một lần, dùng lại cho mọi request sau)"""
+        http = getattr(self._local, 'http', None)
+        if http is None or http.credentials is not credentials:
+            http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=PooledHttp(self.sync_stats, timeout=self.read_timeout)
+            )
+            self._local.http = http
+        return http
+    
+    def async_client(self) -> httpx.AsyncClient:
+        """httpx.AsyncClient dùng chung (tạo lần đầu khi cần)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                http2=self.http2,
+                event_hooks={'request': [self._trace_request]}
+            )
+        return self._client
+    
+    async def _trace_request(self, request: httpx.Request):
+        """Gắn trace của httpcore để biết request có phải mở kết nối mới không"""
+        opened = []
+        
+        async def trace(event: str, info: Dict[str, Any]):
+            if event == "connection.connect_tcp.complete":
+                opened.append(True)
+            elif event.endswith("send_request_headers.started"):
+                self.async_stats.record(bool(opened))
+        
+        request.extensions["trace"] = trace
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {'sync': self.sync_stats.as_dict(), 'async': self.async_stats.as_dict()}
+    
+    def log_stats(self):
+        for name, stats in self.stats().items():
+            if stats['requests']:
+                logger.info(
+                    f"🔌 HTTP pool ({name}): {stats['requests']} requests over "
+                    f"{stats['connections']} connections ({stats['reuse_ratio']:.0%} reused)"
+                )
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
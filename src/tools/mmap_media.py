@@ -0,0 +1,132 @@
+"""
+mmap-backed media source for resumable uploads (chunk là memoryview, không copy)
+"""
+from pathlib import Path
+from typing import Optional, Union
+import mimetypes
+import mmap
+from googleapiclient.http import MediaUpload
+from loguru import logger
+
+
+class MmapMediaUpload(MediaUpload):
+    """
+    Media upload đọc video qua mmap
+    
+    MediaFileUpload đọc file bằng buffered read, mỗi chunk bị copy nhiều lần
+    trước khi tới socket. Ở đây mỗi chunk là một memoryview trỏ thẳng vào
+    vùng mmap của file, page cache được gửi thẳng đi. Kernel được báo là đọc
+    tuần tự (MADV_SEQUENTIAL), `readahead` byte phía trước chunk hiện tại được
+    đọc trước (MADV_WILLNEED) và các trang đã gửi xong được trả lại
+    (MADV_DONTNEED) nên RSS không tăng theo kích thước file.
+    """
+    
+    def __init__(
+        self,
+        filename: Union[str, Path],
+        mimetype: Optional[str] = None,
+        chunksize: int = 8 * 1024 * 1024,
+        resumable: bool = True,
+        readahead: int = 32 * 1024 * 1024
+    ):
+        self._filename = str(filename)
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(self._filename)[0] or 'application/octet-stream'
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._resumable = resumable
+        self._readahead = max(0, readahead)
+        self._view: Optional[memoryview] = None
+        self._mmap: Optional[mmap.mmap] = None
+        with open(self._filename, 'rb') as f:
+            self._size = Path(self._filename).stat().st_size
+            # mmap không map được file rỗng
+            if self._size:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap is not None:
+            self._advise('MADV_SEQUENTIAL')
+    
+    def _advise(self, name: str, start: int = 0, length: Optional[int] = None):
+        """madvise nếu hệ điều hành hỗ trợ (Linux/macOS), bỏ qua nếu không"""
+        option = getattr(mmap, name, None)
+        if option is None or not hasattr(self._mmap, 'madvise'):
+            return
+        # madvise yêu cầu địa chỉ bắt đầu căn theo page
+        aligned = start - start % mmap.PAGESIZE
+        length = (self._size - start if length is None else length) + (start - aligned)
+        length = min(length, self._size - aligned)
+        if length <= 0:
+            return
+        try:
+            self._mmap.madvise(option, aligned, length)
+        except OSError as e:
+            logger.debug(f"madvise({name}) failed: {e}")
+    
+    def chunksize(self) -> int:
+        return self._chunksize
+    
+    def mimetype(self) -> str:
+        return self._mimetype
+    
+    def size(self) -> int:
+        return self._size
+    
+    def resumable(self) -> bool:
+        return self._resumable
+    
+    def has_stream(self) -> bool:
+        # False để googleapiclient lấy chunk qua getbytes() thay vì đọc stream
+        return False
+    
+    def _touch_pages(self, begin: int, end: int):
+        """
+        Đọc một byte ở mỗi trang của [begin, end)
+        
+        memoryview trả ra là lazy: nếu không chạm trước, page fault (đọc đĩa)
+        xảy ra lúc socket gửi chunk và bị tính là thời gian mạng. Đọc từng byte
+        (mmap[i] trả về int) không copy chunk, vẫn giữ được zero-copy.
+        """
+        mapped = self._mmap
+        for offset in range(begin - begin % mmap.PAGESIZE, end, mmap.PAGESIZE):
+            _ = mapped[max(offset, begin)]  # Chỉ cần page fault, giá trị bỏ đi
+    
+    def getbytes(self, begin: int, length: int) -> Union[memoryview, bytes]:
+        """Chunk [begin, begin + length) dưới dạng memoryview của vùng mmap"""
+        if self._mmap is None:
+            return b''
+        end = min(begin + length, self._size)
+        if self._view is not None:
+            self._view.release()
+        # Trang trước chunk này đã được server xác nhận, trả lại cho kernel
+        if begin >= mmap.PAGESIZE:
+            self._advise('MADV_DONTNEED', 0, begin - begin % mmap.PAGESIZE)
+        if self._readahead:
+            self._advise('MADV_WILLNEED', begin, end - begin + self._readahead)
+        self._touch_pages(begin, end)
+        self._view = memoryview(self._mmap)[begin:end]
+        return self._view
+    
+    def close(self):
+        """Giải phóng vùng mmap (memoryview đã trả ra không còn dùng được)"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Còn memoryview khác đang giữ buffer, GC sẽ đóng sau
+                pass
+            self._mmap = None
+    
+    def __enter__(self) -> "MmapMediaUpload":
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+    
+    def to_json(self) -> str:
+        return self._to_json(strip=['_mmap', '_view'])
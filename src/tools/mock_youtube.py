@@ -0,0 +1,359 @@
+"""
+Local stand-in for the YouTube Data API upload endpoints (benchmarks và test end-to-end)
+    
+    python -m src.tools.mock_youtube --port 8765 --latency 0.05 --bandwidth 50 --error-rate 0.02
+
+Rồi đặt `youtube.api_base_url: http://127.0.0.1:8765` trong settings.yaml.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from google.oauth2.credentials import Credentials
+from loguru import logger
+
+
+class MockAuth:
+    """Credentials giả (token cố định) thay cho YouTubeAuth khi chạy với mock server"""
+    
+    def __init__(self, token: str = "mock-token"):
+        self._credentials = Credentials(token=token)
+    
+    def peek(self) -> Credentials:
+        return self._credentials
+    
+    def get_credentials(self) -> Credentials:
+        return self._credentials
+    
+    def close(self):
+        pass
+
+
+def mock_auth_factory(default: Callable[[Any], Optional[Any]]) -> Callable[[Any], Any]:
+    """
+    Auth factory cho UploaderPool khi chạy với mock server
+    
+    Kênh có OAuth client vẫn dùng `default`; kênh chưa có thì dùng token giả
+    (mock server không kiểm tra token).
+    """
+    def factory(channel):
+        return default(channel) or MockAuth()
+    return factory
+
+
+class MockYouTubeServer:
+    """
+    HTTP server giả lập YouTube Data API v3 cho upload
+    
+    Hỗ trợ:
+    - Resumable upload: POST khởi tạo session, PUT từng chunk (trả 308 +
+      Range), PUT rỗng `bytes */size` để hỏi vị trí đã nhận
+    - thumbnails.set (uploadType=media), videos.list (id=a,b,...)
+    
+    Mô phỏng mạng và lỗi: `latency` (giây mỗi request), `bandwidth_mbps`
+    (giới hạn tốc độ nhận body), `error_rate` (503 cho chunk), `drop_rate`
+    (đóng kết nối không trả response), `quota_error_rate` (403
+    quotaExceeded khi khởi tạo upload). `fail_next` chèn lỗi xác định
+    trước cho test. Random dùng `seed` để chạy lại được.
+    """
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bandwidth_mbps: float = 0.0,
+        error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        quota_error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.bandwidth_mbps = bandwidth_mbps
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.quota_error_rate = quota_error_rate
+        self.random = random.Random(seed)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.videos: Dict[str, Dict[str, Any]] = {}
+        self.thumbnails: Dict[str, int] = {}
+        self.counters = {'requests': 0, 'bytes_received': 0, 'uploads': 0, 'errors': 0, 'drops': 0, 'quota_errors': 0}
+        self._scripted: List[str] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+    
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "MockYouTubeServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-youtube", daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Mock YouTube API listening on {self.url}")
+        return self
+    
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    
+    def __enter__(self) -> "MockYouTubeServer":
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def fail_next(self, *faults: str):
+        """
+        Lỗi cho các request upload tiếp theo, theo thứ tự
+        
+        "error" (503) / "drop" / "ok" (không lỗi) áp dụng cho các PUT chunk,
+        "quota" cho lần khởi tạo upload tiếp theo.
+        """
+        with self._lock:
+            self._scripted.extend(faults)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_sessions = sum(1 for session in self.sessions.values() if 'video' not in session)
+            return dict(self.counters, videos=len(self.videos), open_sessions=open_sessions)
+    
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counters[key] += amount
+    
+    def _next_fault(self, kinds: List[str]) -> Optional[str]:
+        """Lỗi cần mô phỏng cho request này (ưu tiên lỗi đã đặt bằng fail_next)"""
+        with self._lock:
+            if self._scripted and self._scripted[0] in kinds + ['ok']:
+                if self._scripted[0] != 'ok' or 'error' in kinds:
+                    fault = self._scripted.pop(0)
+                    return None if fault == 'ok' else fault
+            rates = {'error': self.error_rate, 'drop': self.drop_rate, 'quota': self.quota_error_rate}
+            for kind in kinds:
+                if rates[kind] and self.random.random() < rates[kind]:
+                    return kind
+        return None
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                server._handle(self, 'POST')
+            
+            def do_PUT(self):
+                server._handle(self, 'PUT')
+            
+            def do_GET(self):
+                server._handle(self, 'GET')
+        
+        return Handler
+    
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        self._count('requests')
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(handler.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path
+        
+        if method == 'POST' and path.endswith('/upload/youtube/v3/videos'):
+            self._initiate(handler, query)
+        elif method == 'PUT' and path.endswith('/upload/youtube/v3/videos'):
+            self._put_chunk(handler, query)
+        elif method == 'POST' and path.endswith('/upload/youtube/v3/thumbnails/set'):
+            self._set_thumbnail(handler, query)
+        elif method == 'GET' and path.endswith('/youtube/v3/videos'):
+            self._list_videos(handler, query)
+        else:
+            self._read_body(handler)
+            self._send_json(handler, 404, {'error': {'code': 404, 'message': f'{method} {path} not found'}})
+    
+    def _read_body(self, handler: BaseHTTPRequestHandler) -> bytes:
+        """Đọc body, giới hạn tốc độ theo bandwidth_mbps"""
+        length = int(handler.headers.get('Content-Length') or 0)
+        chunks = []
+        block = 64 * 1024
+        bytes_per_second = self.bandwidth_mbps * 1_000_000 / 8
+        while length > 0:
+            started = time.monotonic()
+            data = handler.rfile.read(min(block, length))
+            if not data:
+                break
+            chunks.append(data)
+            length -= len(data)
+            if bytes_per_second:
+                delay = len(data) / bytes_per_second - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        body = b"".join(chunks)
+        self._count('bytes_received', len(body))
+        return body
+    
+    def _send_json(self, handler, status: int, payload: Optional[Dict[str, Any]] = None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        handler.send_response(status)
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        if payload is not None:
+            handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+    
+    def _fault_response(self, handler, fault: str):
+        if fault == 'drop':
+            self._count('drops')
+            handler.close_connection = True
+            return
+        if fault == 'quota':
+            self._count('quota_errors')
+            self._send_json(handler, 403, {'error': {
+                'code': 403, 'message': 'quota exceeded',
+                'errors': [{'reason': 'quotaExceeded', 'domain': 'youtube.quota'}]
+            }})
+            return
+        self._count('errors')
+        self._send_json(handler, 503, {'error': {'code': 503, 'message': 'backend error'}})
+    
+    def _initiate(self, handler, query: Dict[str, str]):
+        body = self._read_body(handler)
+        fault = self._next_fault(['quota'])
+        if fault:
+            return self._fault_response(handler, fault)
+        
+        upload_id = f"upload{next(self._ids)}"
+        total = handler.headers.get('X-Upload-Content-Length')
+        with self._lock:
+            self.sessions[upload_id] = {
+                'metadata': json.loads(body or b'{}'),
+                'total': int(total) if total else None,
+                'received': 0,
+            }
+        host = handler.headers.get('Host') or "{}:{}".format(*self._httpd.server_address[:2])
+        location = f"http://{host}/upload/youtube/v3/videos?uploadType=resumable&upload_id={upload_id}"
+        self._send_json(handler, 200, headers={'Location': location})
+    
+    def _put_chunk(self, handler, query: Dict[str, str]):
+        session = self.sessions.get(query.get('upload_id', ''))
+        if session is None:
+            self._read_body(handler)
+            return self._send_json(handler, 404, {'error': {'code': 404, 'message': 'upload session not found'}})
+        
+        content_range = handler.headers.get('Content-Range', '')
+        query_match = re.match(r'bytes \*/(\d+|\*)', content_range)
+        fault = None
+        if not query_match:
+            fault = self._next_fault(['drop', 'error'])
+            if fault == 'drop':
+                # Nhận một phần body rồi mất kết nối
+                handler.rfile.read(min(int(handler.headers.get('Content-Length') or 0), 64 * 1024))
+                return self._fault_response(handler, fault)
+        body = self._read_body(handler)
+        
+        if query_match:
+            if query_match.group(1) != '*':
+                session['total'] = int(query_match.group(1))
+        else:
+            if fault:
+                return self._fault_response(handler, fault)
+            match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', content_range)
+            if not match:
+                return self._send_json(handler, 400, {'error': {'code': 400, 'message': 'bad Content-Range'}})
+            start, total = int(match.group(1)), match.group(3)
+            if total != '*':
+                session['total'] = int(total)
+            if start > session['received']:
+                return self._send_json(handler, 400, {'error': {'code': 400, 'message': 'gap in upload'}})
+            # Phần trùng với byte đã nhận (gửi lại sau lỗi) được bỏ qua
+            session['received'] = max(session['received'], start + len(body))
+        
+        if session['total'] is not None and session['received'] >= session['total']:
+            return self._send_json(handler, 200, self._complete(query['upload_id'], session))
+        headers = {'Range': f"bytes=0-{session['received'] - 1}"} if session['received'] else {}
+        self._send_json(handler, 308, headers=headers)
+    
+    def _complete(self, upload_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if 'video' not in session:
+                video_id = f"mock{next(self._ids):08d}"
+                metadata = session['metadata']
+                session['video'] = {
+                    'kind': 'youtube#video',
+                    'id': video_id,
+                    'snippet': metadata.get('snippet', {}),
+                    'status': {'uploadStatus': 'uploaded', **metadata.get('status', {})},
+                    'processingDetails': {'processingStatus': 'succeeded'},
+                    'fileDetails': {'fileSize': str(session['received'])},
+                }
+                self.videos[video_id] = session['video']
+                self.counters['uploads'] += 1
+            return session['video']
+    
+    def _set_thumbnail(self, handler, query: Dict[str, str]):
+        body = self._read_body(handler)
+        video_id = query.get('videoId', '')
+        if video_id not in self.videos:
+            return self._send_json(handler, 404, {'error': {'code': 404, 'message': 'video not found'}})
+        with self._lock:
+            self.thumbnails[video_id] = len(body)
+        self._send_json(handler, 200, {
+            'kind': 'youtube#thumbnailSetResponse',
+            'items': [{'default': {'url': f"{self.url}/vi/{video_id}/default.jpg"}}]
+        })
+    
+    def _list_videos(self, handler, query: Dict[str, str]):
+        ids = [video_id for video_id in query.get('id', '').split(',') if video_id]
+        items = [self.videos[video_id] for video_id in ids if video_id in self.videos]
+        self._send_json(handler, 200, {'kind': 'youtube#videoListResponse', 'items': items})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock YouTube Data API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Giây trễ mỗi request")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Giới hạn Mbps khi nhận (0 = không giới hạn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ chunk trả 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Tỉ lệ chunk bị đóng kết nối")
+    parser.add_argument("--quota-error-rate", type=float, default=0.0, help="Tỉ lệ upload bị 403 quotaExceeded")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    server = MockYouTubeServer(
+        args.host, args.port,
+        latency=args.latency,
+        bandwidth_mbps=args.bandwidth,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        quota_error_rate=args.quota_error_rate,
+        seed=args.seed
+    ).start()
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"📊 {server.stats()}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
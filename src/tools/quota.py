@@ -0,0 +1,199 @@
+"""
+YouTube Data API quota accounting (per Pacific-time quota day)
+"""
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+import sqlite3
+import threading
+from loguru import logger
+
+
+# Quota của YouTube Data API reset lúc nửa đêm giờ Pacific
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# Chi phí (units) của từng method theo tài liệu YouTube Data API v3
+QUOTA_COSTS = {
+    'videos.insert': 1600,
+    'videos.list': 1,
+    'videos.update': 50,
+    'thumbnails.set': 50,
+    'playlistItems.list': 1,
+    'channels.list': 1,
+}
+
+# Một lượt upload đầy đủ: video + thumbnail
+UPLOAD_COST = QUOTA_COSTS['videos.insert'] + QUOTA_COSTS['thumbnails.set']
+
+
+@dataclass
+class _Reservation:
+    """Phần quota một job đang giữ chỗ (trong context của job đó)"""
+    ledger: "QuotaLedger"
+    remaining: int
+    previous: Optional["_Reservation"] = None
+
+
+# Job hiện tại (asyncio task / thread từ to_thread đều copy context) giữ chỗ bao nhiêu
+_current_reservation: ContextVar[Optional[_Reservation]] = ContextVar("quota_reservation", default=None)
+
+
+def quota_day(now: Optional[datetime] = None) -> date:
+    """Ngày quota (giờ Pacific) của thời điểm `now`"""
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    if now.tzinfo is None:
+        now = now.astimezone()
+    return now.astimezone(QUOTA_TIMEZONE).date()
+
+
+def next_reset(now: Optional[datetime] = None) -> datetime:
+    """Thời điểm quota reset tiếp theo (giờ local)"""
+    day = quota_day(now) + timedelta(days=1)
+    return datetime.combine(day, dt_time.min, tzinfo=QUOTA_TIMEZONE).astimezone().replace(tzinfo=None)
+
+
+class QuotaLedger:
+    """
+    Sổ quota YouTube API lưu trong SQLite
+    
+    Mỗi API call được trừ đúng số unit của method, lưu theo ngày quota
+    (giờ Pacific) nên scheduler và các lần chạy thủ công (khác process)
+    cùng nhìn thấy mức đã dùng. Các job đang chạy trong process giữ chỗ
+    (`reserve`) trước để nhiều worker song song không cùng vượt quota;
+    `charge` trong context của job trừ vào phần giữ chỗ của chính job đó
+    nên unit không bị tính hai lần khi job đang chạy.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS quota_usage (
+            day TEXT NOT NULL,
+            method TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            calls INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, method)
+        );
+    """
+    
+    def __init__(self, db_file: Path, daily_limit: int = 10000):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.daily_limit = daily_limit
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    @classmethod
+    def from_settings(cls, settings) -> "QuotaLedger":
+        return cls(settings.YOUTUBE_QUOTA_DB, daily_limit=settings.YOUTUBE_DAILY_QUOTA)
+    
+    def charge(self, method: str, units: Optional[int] = None, calls: int = 1) -> int:
+        """
+        Ghi nhận API call
+        
+        Args:
+            method: Tên method (vd. videos.insert)
+            units: Số unit (mặc định theo QUOTA_COSTS)
+            calls: Số call (vd. một batch nhiều request)
+        
+        Returns:
+            Số unit đã trừ
+        """
+        if units is None:
+            units = QUOTA_COSTS.get(method, 1) * calls
+        reservation = _current_reservation.get()
+        with self._lock:
+            if reservation is not None and reservation.ledger is self:
+                drawn = min(reservation.remaining, units)
+                reservation.remaining -= drawn
+                self._reserved -= drawn
+            self._conn.execute(
+                """
+                INSERT INTO quota_usage (day, method, units, calls) VALUES (?, ?, ?, ?)
+                ON CONFLICT(day, method) DO UPDATE SET
+                    units = units + excluded.units,
+                    calls = calls + excluded.calls
+                """,
+                (quota_day().isoformat(), method, units, calls)
+            )
+        return units
+    
+    def used(self, day: Optional[date] = None) -> int:
+        """Số unit đã dùng trong ngày quota"""
+        day = day or quota_day()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(units), 0) FROM quota_usage WHERE day = ?", (day.isoformat(),)
+            ).fetchone()
+        return row[0]
+    
+    def usage_by_method(self, day: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+        day = day or quota_day()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method, units, calls FROM quota_usage WHERE day = ?", (day.isoformat(),)
+            ).fetchall()
+        return {method: {'units': units, 'calls': calls} for method, units, calls in rows}
+    
+    def remaining(self) -> int:
+        """Số unit còn lại hôm nay (đã trừ phần đang giữ chỗ)"""
+        return max(0, self.daily_limit - self.used() - self._reserved)
+    
+    def reserve(self, units: int = UPLOAD_COST) -> bool:
+        """Giữ chỗ quota cho một job; False nếu không đủ (job nên hoãn)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(units), 0) FROM quota_usage WHERE day = ?", (quota_day().isoformat(),)
+            ).fetchone()
+            if self.daily_limit - row[0] - self._reserved < units:
+                return False
+            self._reserved += units
+        _current_reservation.set(_Reservation(self, units, _current_reservation.get()))
+        return True
+    
+    def release(self, units: int = UPLOAD_COST):
+        """
+        Trả lại phần giữ chỗ còn lại khi job kết thúc
+        
+        Phần đã `charge` trong job đã được trừ khỏi chỗ giữ; `units` chỉ dùng
+        khi gọi ngoài context của job đã `reserve`.
+        """
+        reservation = _current_reservation.get()
+        with self._lock:
+            if reservation is not None and reservation.ledger is self:
+                units = reservation.remaining
+                reservation.remaining = 0
+            self._reserved = max(0, self._reserved - units)
+        if reservation is not None and reservation.ledger is self:
+            _current_reservation.set(reservation.previous)
+    
+    def capacity(self) -> Dict[str, Any]:
+        """Dự báo khả năng còn lại của ngày quota hiện tại"""
+        used = self.used()
+        remaining = self.remaining()
+        return {
+            'quota_day': quota_day().isoformat(),
+            'limit': self.daily_limit,
+            'used': used,
+            'reserved': self._reserved,
+            'remaining': remaining,
+            'uploads_remaining': remaining // UPLOAD_COST,
+            'resets_at': next_reset(),
+        }
+    
+    def log_capacity(self):
+        capacity = self.capacity()
+        logger.info(
+            f"📈 YouTube quota: {capacity['used']}/{capacity['limit']} units used, "
+            f"{capacity['uploads_remaining']} uploads left today "
+            f"(resets {capacity['resets_at'].strftime('%Y-%m-%d %H:%M')})"
+        )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
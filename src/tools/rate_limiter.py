@@ -0,0 +1,144 @@
+"""
+Process-wide bandwidth limiter shared by all concurrent uploads
+"""
+from datetime import datetime, time as dt_time
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from loguru import logger
+
+
+# (bắt đầu, kết thúc, Mbps) - Mbps 0 = không giới hạn
+BandwidthProfile = Tuple[dt_time, dt_time, float]
+
+
+def parse_profiles(profiles: Optional[List[Dict[str, Any]]]) -> List[BandwidthProfile]:
+    """
+    Đọc profile băng thông theo giờ từ config
+    
+    Mỗi profile dạng {start: "09:00", end: "18:00", mbps: 20}. Khoảng giờ
+    qua nửa đêm (vd. 22:00 -> 06:00) được hỗ trợ.
+    """
+    parsed = []
+    for profile in profiles or []:
+        start = dt_time.fromisoformat(str(profile['start']))
+        end = dt_time.fromisoformat(str(profile['end']))
+        parsed.append((start, end, float(profile.get('mbps') or 0)))
+    return parsed
+
+
+class BandwidthLimiter:
+    """
+    Token bucket giới hạn tổng băng thông upload (bytes/giây)
+    
+    Dùng chung cho mọi upload đang chạy song song trong process: mỗi chunk
+    phải `acquire` đủ số byte trước khi gửi. Thread-safe vì các upload đồng
+    bộ chạy trong thread pool. Giới hạn có thể đổi theo giờ trong ngày
+    (`profiles`), ngoài các khung giờ đó dùng `rate_mbps`.
+    """
+    
+    # Khoảng thời gian (giây) giữa hai lần kiểm tra profile theo giờ
+    SCHEDULE_CHECK_INTERVAL = 30.0
+    
+    def __init__(
+        self,
+        rate_mbps: Optional[float] = None,
+        burst_seconds: float = 1.0,
+        profiles: Optional[List[BandwidthProfile]] = None
+    ):
+        self._lock = threading.Lock()
+        self.burst_seconds = burst_seconds
+        self.default_mbps = rate_mbps or 0
+        self.profiles = profiles or []
+        self.active_mbps = 0.0
+        self.rate = 0.0
+        self.capacity = 0.0
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self._schedule_checked = 0.0
+        with self._lock:
+            self._apply_rate(self.rate_for(datetime.now()))
+        self.tokens = self.capacity
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or any(mbps > 0 for _, _, mbps in self.profiles)
+    
+    def rate_for(self, now: datetime) -> float:
+        """Giới hạn (Mbps) áp dụng tại thời điểm `now`"""
+        current = now.time()
+        for start, end, mbps in self.profiles:
+            if start <= end:
+                matched = start <= current < end
+            else:
+                matched = current >= start or current < end
+            if matched:
+                return mbps
+        return self.default_mbps
+    
+    def set_rate(self, rate_mbps: Optional[float]):
+        """Đổi giới hạn mặc định (Mbps, None/0 = không giới hạn)"""
+        with self._lock:
+            self.default_mbps = rate_mbps or 0
+            self._apply_rate(self.rate_for(datetime.now()))
+    
+    def _apply_rate(self, rate_mbps: float):
+        self._refill()
+        self.active_mbps = rate_mbps
+        self.rate = rate_mbps * 1_000_000 / 8
+        self.capacity = self.rate * self.burst_seconds
+        self.tokens = min(self.tokens, self.capacity)
+        self._schedule_checked = time.monotonic()
+    
+    def _check_schedule(self):
+        """Chuyển sang profile mới khi tới giờ (gọi khi đang giữ lock)"""
+        if not self.profiles or time.monotonic() - self._schedule_checked < self.SCHEDULE_CHECK_INTERVAL:
+            return
+        rate_mbps = self.rate_for(datetime.now())
+        self._schedule_checked = time.monotonic()
+        if rate_mbps != self.active_mbps:
+            logger.info(f"🚦 Upload bandwidth limit: {rate_mbps or 'unlimited'} Mbps")
+            self._apply_rate(rate_mbps)
+    
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def reserve(self, nbytes: int) -> float:
+        """
+        Trừ `nbytes` khỏi bucket (cho phép nợ) và trả về số giây phải chờ
+        
+        Chunk lớn hơn capacity vẫn được gửi, chỉ là người gọi phải chờ lâu hơn,
+        nên tổng tốc độ trung bình luôn bám theo `rate`.
+        """
+        with self._lock:
+            self._check_schedule()
+            if self.rate <= 0:
+                return 0.0
+            self._refill()
+            self.tokens -= nbytes
+            return max(0.0, -self.tokens / self.rate)
+    
+    def acquire(self, nbytes: int):
+        """Chờ (blocking) cho tới khi được phép gửi `nbytes`"""
+        wait = self.reserve(nbytes)
+        if wait > 0:
+            time.sleep(wait)
+
+
+_shared_limiter: Optional[BandwidthLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter(
+    rate_mbps: Optional[float] = None,
+    profiles: Optional[List[Dict[str, Any]]] = None
+) -> BandwidthLimiter:
+    """Limiter dùng chung trong process (tạo lần đầu với `rate_mbps` và `profiles`)"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = BandwidthLimiter(rate_mbps, profiles=parse_profiles(profiles))
+        return _shared_limiter
@@ -0,0 +1,370 @@
+"""
+Upload transfer telemetry: per-chunk throughput, disk vs network time, retries, ETA, Prometheus metrics
+"""
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import json
+import os
+import threading
+import time
+from loguru import logger
+
+
+# Bucket (giây) cho histogram thời gian truyền mỗi chunk
+CHUNK_SECONDS_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120)
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """vd. 95 -> '1m35s'"""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class _TimedStream:
+    """File object với read() đã được đo thời gian, các method khác chuyển thẳng cho stream gốc"""
+    
+    def __init__(self, stream: Any, read: Callable[..., bytes]):
+        self._stream = stream
+        self.read = read
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class UploadTrace:
+    """
+    Số liệu của một lượt upload
+    
+    Mỗi chunk ghi lại số byte, tổng thời gian, thời gian đọc đĩa, thời gian
+    chờ rate limiter và phần còn lại là thời gian chờ mạng/Google. ETA
+    tính theo throughput trung bình trượt (EWMA) của các chunk.
+    """
+    
+    def __init__(self, telemetry: "UploadTelemetry", video: str, size: int, offset: int = 0, smoothing: float = 0.3):
+        self.telemetry = telemetry
+        self.video = video
+        self.size = size
+        self.resumed_from = offset
+        self.offset = offset
+        self.smoothing = smoothing
+        self.started_at = datetime.now()
+        self.started = time.monotonic()
+        self.chunks: List[Dict[str, Any]] = []
+        self.retries = 0
+        self.throughput: Optional[float] = None
+        self.disk_seconds = 0.0
+        self.network_seconds = 0.0
+        self.limiter_seconds = 0.0
+        self.status = "uploading"
+        self.video_id: Optional[str] = None
+        self.error: Optional[str] = None
+        self._pending_disk = 0.0
+    
+    def timed_read(self, read: Callable[..., bytes]) -> Callable[..., bytes]:
+        """Bọc hàm đọc file để cộng thời gian đọc đĩa vào chunk hiện tại"""
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return read(*args, **kwargs)
+            finally:
+                self._pending_disk += time.monotonic() - started
+        return wrapper
+    
+    def timed_stream(self, stream: Any) -> Any:
+        """Bọc file object (stream của MediaUpload) để read() được tính là thời gian đọc đĩa"""
+        return _TimedStream(stream, self.timed_read(stream.read))
+    
+    def take_pending_disk(self) -> float:
+        """Thời gian đọc đĩa (qua timed_read) từ lần gọi trước"""
+        seconds, self._pending_disk = self._pending_disk, 0.0
+        return seconds
+    
+    def record_chunk(
+        self,
+        offset: int,
+        nbytes: int,
+        seconds: float,
+        disk_seconds: float = 0.0,
+        limiter_seconds: float = 0.0,
+        chunk_size: Optional[int] = None
+    ):
+        """Ghi nhận một chunk đã được server xác nhận (`offset` là vị trí mới)"""
+        network_seconds = max(0.0, seconds - disk_seconds - limiter_seconds)
+        rate = nbytes / seconds if seconds > 0 else None
+        if rate is not None:
+            self.throughput = rate if self.throughput is None else (
+                self.smoothing * rate + (1 - self.smoothing) * self.throughput
+            )
+        self.offset = offset
+        self.disk_seconds += disk_seconds
+        self.network_seconds += network_seconds
+        self.limiter_seconds += limiter_seconds
+        self.chunks.append({
+            'offset': offset,
+            'bytes': nbytes,
+            'chunk_size': chunk_size,
+            'seconds': round(seconds, 4),
+            'disk_seconds': round(disk_seconds, 4),
+            'network_seconds': round(network_seconds, 4),
+            'limiter_seconds': round(limiter_seconds, 4),
+            'bytes_per_second': round(rate) if rate else None,
+        })
+        self.telemetry._on_chunk(self, nbytes, seconds, disk_seconds, network_seconds, limiter_seconds)
+    
+    def record_retry(self):
+        self.retries += 1
+        self.telemetry._on_retry()
+    
+    def eta(self) -> Optional[float]:
+        """Số giây ước tính còn lại"""
+        if not self.throughput:
+            return None
+        return (self.size - self.offset) / self.throughput
+    
+    def progress_message(self) -> str:
+        mbps = f"{self.throughput * 8 / 1_000_000:.1f} Mbps" if self.throughput else "? Mbps"
+        return (
+            f"Upload progress: {self.offset * 100 // max(self.size, 1)}% "
+            f"({mbps}, ETA {format_duration(self.eta())})"
+        )
+    
+    def finish(self, status: str, video_id: Optional[str] = None, error: Optional[str] = None):
+        """Kết thúc lượt upload: cập nhật metrics và ghi một dòng JSONL"""
+        self.status = status
+        self.video_id = video_id
+        self.error = error
+        self.telemetry._on_finish(self)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        sent = self.offset - self.resumed_from
+        return {
+            'video': self.video,
+            'video_id': self.video_id,
+            'status': self.status,
+            'error': self.error,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed, 3),
+            'size': self.size,
+            'resumed_from': self.resumed_from,
+            'bytes_sent': sent,
+            'average_bytes_per_second': round(sent / elapsed) if elapsed > 0 else None,
+            'disk_seconds': round(self.disk_seconds, 3),
+            'network_seconds': round(self.network_seconds, 3),
+            'limiter_seconds': round(self.limiter_seconds, 3),
+            'retries': self.retries,
+            'chunks': self.chunks,
+        }
+
+
+class UploadTelemetry:
+    """
+    Metrics upload dùng chung trong process
+    
+    - Prometheus text format: ghi định kỳ ra `metrics_file` (textfile
+      collector của node_exporter) và/hoặc phục vụ ở
+      http://0.0.0.0:`metrics_port`/metrics
+    - Mỗi lượt upload ghi một dòng JSON (kèm số liệu từng chunk) vào
+      `uploads_log` để phân tích sau
+    """
+    
+    def __init__(
+        self,
+        metrics_file: Optional[Path] = None,
+        uploads_log: Optional[Path] = None,
+        metrics_port: int = 0,
+        flush_interval: float = 15.0
+    ):
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.uploads_log = Path(uploads_log) if uploads_log else None
+        self.metrics_port = metrics_port
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._active: Dict[int, UploadTrace] = {}
+        self._last_flush = 0.0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.bytes_total = 0
+        self.chunks_total = 0
+        self.retries_total = 0
+        self.disk_seconds_total = 0.0
+        self.network_seconds_total = 0.0
+        self.limiter_seconds_total = 0.0
+        self.uploads_total: Dict[str, int] = {}
+        self.chunk_seconds_buckets = [0] * len(CHUNK_SECONDS_BUCKETS)
+        self.chunk_seconds_sum = 0.0
+        self.last_bytes_per_second = 0.0
+    
+    @classmethod
+    def from_settings(cls, settings) -> "UploadTelemetry":
+        return cls(
+            metrics_file=settings.TELEMETRY_METRICS_FILE,
+            uploads_log=settings.TELEMETRY_UPLOADS_LOG,
+            metrics_port=settings.TELEMETRY_METRICS_PORT,
+            flush_interval=settings.TELEMETRY_FLUSH_INTERVAL
+        )
+    
+    def start_upload(self, video: str, size: int, offset: int = 0) -> UploadTrace:
+        trace = UploadTrace(self, video, size, offset)
+        with self._lock:
+            self._active[id(trace)] = trace
+        return trace
+    
+    def _on_chunk(self, trace, nbytes, seconds, disk_seconds, network_seconds, limiter_seconds):
+        with self._lock:
+            self.bytes_total += nbytes
+            self.chunks_total += 1
+            self.disk_seconds_total += disk_seconds
+            self.network_seconds_total += network_seconds
+            self.limiter_seconds_total += limiter_seconds
+            self.chunk_seconds_sum += seconds
+            for i, bound in enumerate(CHUNK_SECONDS_BUCKETS):
+                if seconds <= bound:
+                    self.chunk_seconds_buckets[i] += 1
+            if seconds > 0:
+                self.last_bytes_per_second = nbytes / seconds
+        self.maybe_flush()
+    
+    def _on_retry(self):
+        with self._lock:
+            self.retries_total += 1
+    
+    def _on_finish(self, trace: UploadTrace):
+        with self._lock:
+            self._active.pop(id(trace), None)
+            self.uploads_total[trace.status] = self.uploads_total.get(trace.status, 0) + 1
+        if self.uploads_log:
+            try:
+                self.uploads_log.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.uploads_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace.as_dict(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write upload telemetry: {e}")
+        self.flush()
+    
+    def render(self) -> str:
+        """Metrics theo Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                "# HELP youtube_upload_bytes_total Bytes confirmed by the upload server",
+                "# TYPE youtube_upload_bytes_total counter",
+                f"youtube_upload_bytes_total {self.bytes_total}",
+                "# HELP youtube_upload_chunks_total Upload chunks confirmed by the server",
+                "# TYPE youtube_upload_chunks_total counter",
+                f"youtube_upload_chunks_total {self.chunks_total}",
+                "# HELP youtube_upload_retries_total Retried upload requests",
+                "# TYPE youtube_upload_retries_total counter",
+                f"youtube_upload_retries_total {self.retries_total}",
+                "# HELP youtube_upload_phase_seconds_total Time spent per phase while sending chunks",
+                "# TYPE youtube_upload_phase_seconds_total counter",
+                f'youtube_upload_phase_seconds_total{{phase="disk"}} {self.disk_seconds_total:.3f}',
+                f'youtube_upload_phase_seconds_total{{phase="network"}} {self.network_seconds_total:.3f}',
+                f'youtube_upload_phase_seconds_total{{phase="rate_limit"}} {self.limiter_seconds_total:.3f}',
+                "# HELP youtube_upload_chunk_seconds Time to send one chunk",
+                "# TYPE youtube_upload_chunk_seconds histogram",
+            ]
+            for bound, count in zip(CHUNK_SECONDS_BUCKETS, self.chunk_seconds_buckets):
+                lines.append(f'youtube_upload_chunk_seconds_bucket{{le="{bound}"}} {count}')
+            lines += [
+                f'youtube_upload_chunk_seconds_bucket{{le="+Inf"}} {self.chunks_total}',
+                f"youtube_upload_chunk_seconds_sum {self.chunk_seconds_sum:.3f}",
+                f"youtube_upload_chunk_seconds_count {self.chunks_total}",
+                "# HELP youtube_upload_last_chunk_bytes_per_second Throughput of the most recent chunk",
+                "# TYPE youtube_upload_last_chunk_bytes_per_second gauge",
+                f"youtube_upload_last_chunk_bytes_per_second {self.last_bytes_per_second:.0f}",
+                "# HELP youtube_uploads_total Finished uploads by status",
+                "# TYPE youtube_uploads_total counter",
+            ]
+            for status, count in sorted(self.uploads_total.items()):
+                lines.append(f'youtube_uploads_total{{status="{status}"}} {count}')
+            lines += [
+                "# HELP youtube_uploads_active Uploads in progress",
+                "# TYPE youtube_uploads_active gauge",
+                f"youtube_uploads_active {len(self._active)}",
+                "# HELP youtube_upload_progress_ratio Progress of each active upload",
+                "# TYPE youtube_upload_progress_ratio gauge",
+            ]
+            active = list(self._active.values())
+            for trace in active:
+                video = trace.video.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'youtube_upload_progress_ratio{{video="{video}"}} {trace.offset / max(trace.size, 1):.4f}')
+            lines += [
+                "# HELP youtube_upload_eta_seconds Estimated remaining time of each active upload",
+                "# TYPE youtube_upload_eta_seconds gauge",
+            ]
+            for trace in active:
+                eta = trace.eta()
+                if eta is not None:
+                    video = trace.video.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'youtube_upload_eta_seconds{{video="{video}"}} {eta:.1f}')
+        return "\n".join(lines) + "\n"
+    
+    def maybe_flush(self):
+        if self.metrics_file and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Ghi metrics ra file (ghi file tạm rồi rename để collector không đọc file dở)"""
+        if not self.metrics_file:
+            return
+        self._last_flush = time.monotonic()
+        try:
+            self.metrics_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.metrics_file.with_suffix('.tmp')
+            tmp_file.write_text(self.render(), encoding='utf-8')
+            os.replace(tmp_file, self.metrics_file)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write metrics file: {e}")
+    
+    def start_server(self):
+        """Phục vụ /metrics trong thread nền (nếu cấu hình metrics_port)"""
+        if not self.metrics_port or self._server is not None:
+            return
+        telemetry = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('0.0.0.0', self.metrics_port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="upload-metrics", daemon=True).start()
+        logger.info(f"📈 Upload metrics at http://0.0.0.0:{self.metrics_port}/metrics")
+    
+    def close(self):
+        self.flush()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_shared_telemetry: Optional[UploadTelemetry] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_telemetry(settings=None) -> UploadTelemetry:
+    """Telemetry dùng chung trong process (tạo lần đầu theo `settings`)"""
+    global _shared_telemetry
+    with _shared_lock:
+        if _shared_telemetry is None:
+            _shared_telemetry = UploadTelemetry.from_settings(settings) if settings else UploadTelemetry()
+        return _shared_telemetry
@@ -0,0 +1,80 @@
+"""
+Persistent resumable-upload sessions (survive process restarts)
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+import hashlib
+import json
+import os
+from loguru import logger
+
+
+class UploadSessionStore:
+    """
+    Lưu session URI và số byte đã được server xác nhận của từng upload
+    
+    Mỗi video một file JSON, được ghi lại sau mỗi chunk (ghi file tạm rồi
+    rename nên không bao giờ để lại file dở). Session của YouTube hết hạn
+    sau khoảng một tuần, session cũ hơn `max_age` bị bỏ qua.
+    """
+    
+    def __init__(self, session_dir: Path, max_age: timedelta = timedelta(days=6)):
+        self.session_dir = Path(session_dir)
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+    
+    @staticmethod
+    def session_key(video_path: Path) -> str:
+        """Khóa session theo đường dẫn + size + mtime (file đổi thì session cũ không dùng được)"""
+        video_path = Path(video_path)
+        st = video_path.stat()
+        raw = f"{video_path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    
+    def _session_file(self, video_path: Path) -> Path:
+        return self.session_dir / f"{self.session_key(video_path)}.json"
+    
+    def load(self, video_path: Path) -> Optional[Dict[str, Any]]:
+        """Lấy session đang dở của video (None nếu không có hoặc đã hết hạn)"""
+        session_file = self._session_file(video_path)
+        if not session_file.exists():
+            return None
+        try:
+            with open(session_file, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read upload session {session_file.name}: {e}")
+            return None
+        
+        created_at = datetime.fromisoformat(session.get('created_at', '1970-01-01T00:00:00'))
+        if datetime.now() - created_at > self.max_age:
+            logger.info(f"Upload session for {Path(video_path).name} expired, starting over")
+            self.delete(video_path)
+            return None
+        return session
+    
+    def save(self, video_path: Path, resumable_uri: str, progress: int, **extra: Any):
+        """Ghi session sau mỗi chunk được server xác nhận"""
+        session_file = self._session_file(video_path)
+        existing = self.load(video_path) or {}
+        session = {
+            'video': str(video_path),
+            'resumable_uri': resumable_uri,
+            'progress': progress,
+            'size': Path(video_path).stat().st_size,
+            'created_at': existing.get('created_at', datetime.now().isoformat()),
+            'updated_at': datetime.now().isoformat(),
+            **extra,
+        }
+        tmp_file = session_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(session, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, session_file)
+    
+    def delete(self, video_path: Path):
+        """Xóa session khi upload xong hoặc session không còn hợp lệ"""
+        try:
+            self._session_file(video_path).unlink()
+        except FileNotFoundError:
+            pass
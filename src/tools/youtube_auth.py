@@ -0,0 +1,229 @@
+"""
+Shared YouTube OAuth credentials (JSON token, background refresh) and cached API discovery
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import os
+import pickle
+import threading
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build_from_document
+from googleapiclient import discovery_cache
+from loguru import logger
+import httplib2
+
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+
+_discovery_docs: Dict[str, Dict[str, Any]] = {}
+_discovery_lock = threading.Lock()
+
+
+def load_discovery_document(
+    api: str = "youtube",
+    version: str = "v3",
+    cache_dir: Path = Path("data/discovery")
+) -> Dict[str, Any]:
+    """
+    Discovery document của API, parse một lần cho cả process
+    
+    Thứ tự: file cache trên đĩa (nếu có) -> bản đi kèm googleapiclient ->
+    tải qua mạng rồi lưu vào cache cho các lần sau.
+    """
+    key = f"{api}.{version}"
+    with _discovery_lock:
+        if key in _discovery_docs:
+            return _discovery_docs[key]
+        
+        cache_file = Path(cache_dir) / f"{key}.json"
+        content = None
+        if cache_file.exists():
+            content = cache_file.read_text(encoding='utf-8')
+        else:
+            content = discovery_cache.get_static_doc(api, version)
+        if content is None:
+            logger.info(f"Downloading {key} discovery document...")
+            resp, body = httplib2.Http(timeout=30).request(DISCOVERY_URL.format(api=api, version=version))
+            if resp.status != 200:
+                raise RuntimeError(f"Could not download discovery document for {key}: HTTP {resp.status}")
+            content = body.decode('utf-8')
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(content, encoding='utf-8')
+        
+        _discovery_docs[key] = json.loads(content)
+        return _discovery_docs[key]
+
+
+def build_youtube_service(
+    credentials: Optional[Credentials] = None,
+    http=None,
+    base_url: Optional[str] = None,
+    **kwargs: Any
+):
+    """
+    Build YouTube service từ discovery document đã cache (không gọi mạng)
+    
+    Truyền `http` (AuthorizedHttp dùng chung) để request đi qua kết nối
+    keep-alive của pool thay vì http client riêng của service. `base_url`
+    thay endpoint của Google (kể cả endpoint upload), vd. mock server local.
+    """
+    document = load_discovery_document()
+    if base_url:
+        root = base_url.rstrip('/') + '/'
+        document = dict(document, rootUrl=root, mtlsRootUrl=root, baseUrl=root + document['servicePath'])
+    if http is not None:
+        return build_from_document(document, http=http, **kwargs)
+    return build_from_document(document, credentials=credentials, **kwargs)
+
+
+class YouTubeAuth:
+    """
+    Credentials OAuth dùng chung cho uploader và các script
+    
+    Token lưu dạng JSON (`token.json`); `token.pickle` cũ được chuyển sang
+    JSON một lần rồi xóa. Credentials chỉ được load khi cần lần đầu, giữ
+    trong memory và được refresh trong background thread trước khi hết hạn
+    `refresh_margin`, nên API call không phải chờ refresh.
+    """
+    
+    def __init__(
+        self,
+        client_id: str = "",
+        client_secret: str = "",
+        scopes: Optional[List[str]] = None,
+        token_file: Path = Path("token.json"),
+        legacy_token_file: Path = Path("token.pickle"),
+        client_secrets_file: Optional[Path] = None,
+        refresh_margin: timedelta = timedelta(minutes=5)
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scopes = scopes or []
+        self.token_file = Path(token_file)
+        self.legacy_token_file = Path(legacy_token_file)
+        self.client_secrets_file = Path(client_secrets_file) if client_secrets_file else None
+        self.refresh_margin = refresh_margin
+        self._credentials: Optional[Credentials] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+    
+    @property
+    def loaded(self) -> bool:
+        return self._credentials is not None
+    
+    def peek(self) -> Optional[Credentials]:
+        """Credentials trong memory nếu còn dùng được ngay (không load, không refresh)"""
+        credentials = self._credentials
+        if credentials is None or self._needs_refresh(credentials):
+            return None
+        return credentials
+    
+    def get_credentials(self) -> Credentials:
+        """Credentials hợp lệ (load/refresh/đăng nhập nếu cần)"""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = self._load()
+                self._start_refresher()
+            if self._needs_refresh(self._credentials):
+                self._refresh()
+            return self._credentials
+    
+    def _needs_refresh(self, credentials: Credentials) -> bool:
+        if not credentials.valid:
+            return True
+        expiry = credentials.expiry
+        return expiry is not None and expiry - datetime.utcnow() < self.refresh_margin
+    
+    def _load(self) -> Credentials:
+        credentials = None
+        if self.token_file.exists():
+            credentials = Credentials.from_authorized_user_file(str(self.token_file), self.scopes or None)
+        elif self.legacy_token_file.exists():
+            credentials = self._migrate_legacy_token()
+        
+        if credentials and (credentials.valid or credentials.refresh_token):
+            return credentials
+        
+        credentials = self._run_flow()
+        self._save(credentials)
+        return credentials
+    
+    def _migrate_legacy_token(self) -> Optional[Credentials]:
+        """Chuyển token.pickle cũ sang token.json (chỉ chạy một lần)"""
+        try:
+            with open(self.legacy_token_file, 'rb') as token:
+                credentials = pickle.load(token)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read {self.legacy_token_file}: {e}")
+            return None
+        self._save(credentials)
+        self.legacy_token_file.unlink()
+        logger.info(f"♻️ Migrated {self.legacy_token_file} to {self.token_file}")
+        return credentials
+    
+    def _run_flow(self) -> Credentials:
+        """Đăng nhập OAuth qua trình duyệt"""
+        if self.client_secrets_file and self.client_secrets_file.exists():
+            flow = InstalledAppFlow.from_client_secrets_file(str(self.client_secrets_file), self.scopes)
+        else:
+            flow = InstalledAppFlow.from_client_config({
+                "installed": {
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "redirect_uris": ["http://localhost"],
+                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                    "token_uri": "https://oauth2.googleapis.com/token"
+                }
+            }, self.scopes)
+        return flow.run_local_server(port=0)
+    
+    def _save(self, credentials: Credentials):
+        """Ghi token.json (chỉ owner đọc được, ghi file tạm rồi rename)"""
+        self.token_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.token_file.with_suffix('.tmp')
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(credentials.to_json())
+        os.replace(tmp_file, self.token_file)
+    
+    def _refresh(self):
+        credentials = self._credentials
+        if not credentials.refresh_token:
+            credentials = self._run_flow()
+        else:
+            credentials.refresh(Request())
+        self._credentials = credentials
+        self._save(credentials)
+        logger.debug(f"🔑 YouTube token refreshed (expires {credentials.expiry})")
+    
+    def _start_refresher(self):
+        if self._refresher is None and self._credentials.refresh_token:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="youtube-token-refresh", daemon=True
+            )
+            self._refresher.start()
+    
+    def _refresh_loop(self):
+        """Refresh token trước khi hết hạn `refresh_margin`"""
+        while not self._stop.is_set():
+            expiry = self._credentials.expiry if self._credentials else None
+            wait = 60.0
+            if expiry is not None:
+                wait = max(1.0, (expiry - self.refresh_margin - datetime.utcnow()).total_seconds())
+            if self._stop.wait(wait):
+                return
+            try:
+                with self._lock:
+                    if self._needs_refresh(self._credentials):
+                        self._refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Background token refresh failed: {e}")
+                self._stop.wait(60)
+    
+    def close(self):
+        self._stop.set()
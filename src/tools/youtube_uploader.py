@@ -1,16 +1,24 @@
 """
 YouTube API integration for uploading videos
 """
-import os
 from pathlib import Path
-from typing import Dict, Any, Optional
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from typing import Dict, Any, Iterable, Iterator, Optional
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from loguru import logger
-import pickle
+import google_auth_httplib2
+import json
+import time
+
+from src.tools.chunk_sizer import CHUNK_ALIGNMENT, AdaptiveChunkSizer, align_chunk_size
+from src.tools.http_pool import HttpPool
+from src.tools.mmap_media import MmapMediaUpload
+from src.tools.quota import QUOTA_COSTS, QuotaLedger
+from src.tools.rate_limiter import BandwidthLimiter
+from src.tools.telemetry import UploadTelemetry
+from src.tools.upload_sessions import UploadSessionStore
+from src.tools.youtube_auth import YouTubeAuth, build_youtube_service
+from src.utils.retry import Retrier
 
 
 class YouTubeUploader:
@@ -21,57 +29,102 @@ class YouTubeUploader:
         'https://www.googleapis.com/auth/youtube'
     ]
     
-    def __init__(self, client_id: str, client_secret: str):
+    # Chunk phải là bội số của 256 KiB theo giao thức resumable upload
+    CHUNK_ALIGNMENT = CHUNK_ALIGNMENT
+    
+    # Tối đa 50 id cho mỗi videos.list / 50 request cho mỗi HTTP batch
+    MAX_BATCH_SIZE = 50
+    
+    # Các field snippet được gửi lại khi update (videos.update ghi đè toàn bộ snippet)
+    SNIPPET_FIELDS = ('title', 'description', 'tags', 'categoryId', 'defaultLanguage')
+    
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        chunk_size_mb: float = 8,
+        session_dir: Path = Path('data/upload_sessions'),
+        rate_limiter: Optional[BandwidthLimiter] = None,
+        retrier: Optional[Retrier] = None,
+        quota: Optional[QuotaLedger] = None,
+        auth: Optional[YouTubeAuth] = None,
+        pool: Optional[HttpPool] = None,
+        base_url: Optional[str] = None,
+        telemetry: Optional[UploadTelemetry] = None,
+        use_mmap: bool = True,
+        readahead_mb: float = 32,
+        adaptive_chunks: bool = False,
+        max_chunk_size: int = 64 * 1024 * 1024,
+        target_chunk_seconds: float = 5.0
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
+        # Không xác thực trong __init__: credentials và service được tạo ở lần gọi API đầu tiên
+        self.auth = auth or YouTubeAuth(client_id, client_secret, self.SCOPES)
         self.credentials = None
-        self.youtube = None
-        self._authenticate()
+        self._youtube = None
+        self.chunk_size = self._align_chunk_size(chunk_size_mb)
+        self.sessions = UploadSessionStore(session_dir)
+        self.rate_limiter = rate_limiter
+        self.retrier = retrier or Retrier(max_attempts=1)
+        # Sổ quota mặc định nằm cạnh thư mục session (data/quota.db)
+        self.quota = quota or QuotaLedger(Path(session_dir).parent / 'quota.db')
+        # Kết nối keep-alive dùng chung cho upload, thumbnail, metadata và status call
+        self.pool = pool or HttpPool()
+        # Endpoint API khác (vd. mock server local), None = Google
+        self.base_url = base_url
+        # Số liệu từng chunk / từng lượt upload (mặc định chỉ giữ trong bộ nhớ)
+        self.telemetry = telemetry or UploadTelemetry()
+        # Đọc video qua mmap: chunk gửi đi là memoryview, không copy qua buffer
+        self.use_mmap = use_mmap
+        self.readahead = int(readahead_mb * 1024 * 1024)
+        # Chunk size tự điều chỉnh theo throughput/RTT (chunk_size là giá trị khởi đầu), như AsyncYouTubeUploader
+        self.adaptive_chunks = adaptive_chunks
+        self.max_chunk_size = max_chunk_size
+        self.target_chunk_seconds = target_chunk_seconds
+    
+    def _media(self, video_path: Path):
+        """Media source cho resumable upload (mmap nếu bật, ngược lại MediaFileUpload)"""
+        if self.use_mmap:
+            return MmapMediaUpload(video_path, chunksize=self.chunk_size, readahead=self.readahead)
+        return MediaFileUpload(str(video_path), chunksize=self.chunk_size, resumable=True)
+    
+    def _http(self) -> Optional[google_auth_httplib2.AuthorizedHttp]:
+        """
+        HTTP client (keep-alive) của thread hiện tại, lấy từ pool
+        
+        httplib2.Http không thread-safe nên mỗi thread có client riêng,
+        nhưng client đó được dùng lại cho mọi request sau. Trả về None khi
+        chưa có credentials để request dùng http mặc định của service.
+        """
+        if self.credentials is None:
+            return None
+        return self.pool.authorized_http(self.credentials)
+    
+    @classmethod
+    def _align_chunk_size(cls, chunk_size_mb: float) -> int:
+        """Làm tròn chunk size về bội số của 256 KiB (tối thiểu 256 KiB)"""
+        return align_chunk_size(chunk_size_mb * 1024 * 1024)
+    
+    @property
+    def youtube(self):
+        """YouTube service, chỉ build (và xác thực) khi cần lần đầu"""
+        if self._youtube is None:
+            self._authenticate()
+        return self._youtube
+    
+    @youtube.setter
+    def youtube(self, service):
+        self._youtube = service
     
     def _authenticate(self):
         """Xác thực với YouTube API"""
-        token_file = Path('token.pickle')
-        
-        # Load credentials từ file nếu có
-        if token_file.exists():
-            with open(token_file, 'rb') as token:
-                self.credentials = pickle.load(token)
-        
-        # Nếu không có credentials hoặc đã hết hạn
-        if not self.credentials or not self.credentials.valid:
-            if self.credentials and self.credentials.expired and self.credentials.refresh_token:
-                self.credentials.refresh(Request())
-            else:
-                # Tạo credentials.json tạm thời
-                self._create_credentials_file()
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', self.SCOPES)
-                self.credentials = flow.run_local_server(port=0)
-            
-            # Lưu credentials
-            with open(token_file, 'wb') as token:
-                pickle.dump(self.credentials, token)
+        self.credentials = self.auth.get_credentials()
         
-        # Build YouTube service
-        self.youtube = build('youtube', 'v3', credentials=self.credentials)
+        # Build YouTube service từ discovery document đã cache, request đi qua pool
+        self._youtube = build_youtube_service(http=self._http(), base_url=self.base_url)
         logger.info("✅ YouTube API authenticated successfully")
     
-    def _create_credentials_file(self):
-        """Tạo file credentials.json từ env variables"""
-        credentials_content = {
-            "installed": {
-                "client_id": self.client_id,
-                "client_secret": self.client_secret,
-                "redirect_uris": ["http://localhost"],
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token"
-            }
-        }
-        
-        import json
-        with open('credentials.json', 'w') as f:
-            json.dump(credentials_content, f)
-    
     def upload_video(
         self,
         video_path: Path,
@@ -95,6 +148,8 @@ class YouTubeUploader:
         Returns:
             Dict chứa thông tin video đã upload
         """
+        trace = None
+        media = None
         try:
             logger.info(f"📤 Uploading video: {video_path.name}")
             
@@ -111,12 +166,8 @@ class YouTubeUploader:
                 }
             }
             
-            # Upload video
-            media = MediaFileUpload(
-                str(video_path),
-                chunksize=-1,
-                resumable=True
-            )
+            # Upload video theo từng chunk, session được lưu sau mỗi chunk
+            media = self._media(video_path)
             
             request = self.youtube.videos().insert(
                 part='snippet,status',
@@ -124,15 +175,66 @@ class YouTubeUploader:
                 media_body=media
             )
             
-            response = None
+            http = self._http()
+            sizer = AdaptiveChunkSizer.for_upload(
+                self.chunk_size, self.adaptive_chunks, self.max_chunk_size, self.target_chunk_seconds
+            )
+            # next_chunk đọc chunksize() ở mỗi lần gọi nên chunk tiếp theo theo kích thước của sizer
+            media.chunksize = lambda: sizer.chunk_size
+            started = time.monotonic()
+            response = self.retrier.call(
+                'youtube.upload', self._resume_session, request, video_path, media.size(), http
+            )
+            if request.resumable_uri is not None:
+                # PUT rỗng hỏi vị trí đã nhận: một request nhỏ, dùng làm RTT
+                sizer.observe_rtt(time.monotonic() - started)
+            if response is None and request.resumable_uri is None:
+                self.quota.charge('videos.insert')
+            size = media.size()
+            trace = self.telemetry.start_upload(video_path.name, size, request.resumable_progress)
+            # Thời gian đọc file nằm trong next_chunk, đo riêng để tách khỏi thời gian mạng.
+            # MediaFileUpload được đọc qua stream() (_StreamSlice), mmap qua getbytes()
+            if media.has_stream():
+                stream = trace.timed_stream(media.stream())
+                media.stream = lambda: stream
+            else:
+                media.getbytes = trace.timed_read(media.getbytes)
             while response is None:
-                status, response = request.next_chunk()
-                if status:
-                    progress = int(status.progress() * 100)
-                    logger.info(f"Upload progress: {progress}%")
+                start = request.resumable_progress
+                started = time.monotonic()
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(min(sizer.chunk_size, size - start))
+                limiter_seconds = time.monotonic() - started
+                attempts = 0
+                
+                def next_chunk():
+                    # Sau lỗi, next_chunk tự hỏi server vị trí đã nhận trước khi gửi lại
+                    nonlocal attempts
+                    attempts += 1
+                    if attempts > 1:
+                        trace.record_retry()
+                    return request.next_chunk(http=http)
+                
+                chunk_size = sizer.chunk_size
+                status, response = self.retrier.call('youtube.upload', next_chunk)
+                offset = size if response is not None else request.resumable_progress
+                if offset > start:
+                    elapsed = time.monotonic() - started
+                    trace.record_chunk(
+                        offset, offset - start, elapsed,
+                        disk_seconds=trace.take_pending_disk(), limiter_seconds=limiter_seconds,
+                        chunk_size=chunk_size
+                    )
+                    if self.adaptive_chunks:
+                        sizer.observe_chunk(offset - start, elapsed - limiter_seconds)
+                if response is None:
+                    self.sessions.save(video_path, request.resumable_uri, request.resumable_progress, title=title)
+                    logger.info(trace.progress_message())
             
+            self.sessions.delete(video_path)
             video_id = response['id']
             video_url = f"https://www.youtube.com/watch?v={video_id}"
+            trace.finish('success', video_id=video_id)
             
             logger.success(f"✅ Video uploaded successfully: {video_url}")
             
@@ -142,10 +244,58 @@ class YouTubeUploader:
                 'title': title,
                 'status': 'success'
             }
-            
+        
         except Exception as e:
             logger.error(f"❌ Error uploading video: {e}")
+            if trace is not None:
+                trace.finish('error', error=str(e))
+            return None
+        
+        finally:
+            if isinstance(media, MmapMediaUpload):
+                media.close()
+    
+    def _resume_session(self, request, video_path: Path, size: int, http=None) -> Optional[Dict[str, Any]]:
+        """
+        Tiếp tục session upload đã lưu (nếu có)
+        
+        Hỏi server số byte đã nhận (PUT rỗng với Content-Range: bytes */size)
+        rồi đặt lại vị trí của request để upload tiếp từ byte đó.
+        
+        Returns:
+            Response của video nếu server báo upload đã hoàn tất, None nếu cần upload tiếp
+        """
+        session = self.sessions.load(video_path)
+        if not session:
+            return None
+        
+        resp, content = (http or request.http).request(
+            session['resumable_uri'],
+            method='PUT',
+            headers={'Content-Range': f'bytes */{size}', 'Content-Length': '0'}
+        )
+        
+        if resp.status in (200, 201):
+            logger.info(f"♻️ Upload of {video_path.name} had already completed")
+            self.sessions.delete(video_path)
+            return json.loads(content)
+        
+        if resp.status == 308:
+            progress = int(resp['range'].split('-')[1]) + 1 if 'range' in resp else 0
+            request.resumable_uri = resp.get('location', session['resumable_uri'])
+            request.resumable_progress = progress
+            logger.info(
+                f"♻️ Resuming upload of {video_path.name} from byte {progress:,}/{size:,} "
+                f"({progress * 100 // max(size, 1)}%)"
+            )
             return None
+        
+        if resp.status in (404, 410):
+            logger.warning(f"⚠️ Upload session for {video_path.name} is no longer valid, starting over")
+            self.sessions.delete(video_path)
+            return None
+        
+        raise HttpError(resp, content, uri=session['resumable_uri'])
     
     def upload_thumbnail(self, video_id: str, thumbnail_path: Path) -> bool:
         """
@@ -171,11 +321,177 @@ class YouTubeUploader:
                 media_body=MediaFileUpload(str(thumbnail_path))
             )
             
-            response = request.execute()
+            response = self.retrier.call(
+                'youtube.thumbnail', self._execute_charged, request, 'thumbnails.set', http=self._http()
+            )
             
             logger.success(f"✅ Thumbnail uploaded successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"❌ Error uploading thumbnail: {e}")
             return False
+    
+    def _execute_charged(self, request, method: str, **kwargs) -> Any:
+        """execute() một lần; chỉ tính quota khi server đã nhận request (thành công hoặc HttpError)"""
+        try:
+            response = request.execute(**kwargs)
+        except HttpError:
+            self.quota.charge(method)
+            raise
+        self.quota.charge(method)
+        return response
+    
+    def get_videos(
+        self,
+        video_ids: Iterable[str],
+        part: str = 'snippet,status,processingDetails'
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Lấy thông tin nhiều video, mỗi videos.list tối đa 50 id (1 unit / call)
+        
+        Args:
+            video_ids: Danh sách ID video
+            part: Các part cần lấy
+        
+        Returns:
+            Dict video_id -> resource (video không tồn tại sẽ không có trong dict)
+        """
+        ids = list(dict.fromkeys(video_ids))
+        videos = {}
+        for start in range(0, len(ids), self.MAX_BATCH_SIZE):
+            chunk = ids[start:start + self.MAX_BATCH_SIZE]
+            request = self.youtube.videos().list(part=part, id=','.join(chunk))
+            self.quota.charge('videos.list')
+            response = self.retrier.call('youtube.api', request.execute, http=self._http())
+            for item in response.get('items', []):
+                videos[item['id']] = item
+        return videos
+    
+    def update_videos(self, updates: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Sửa snippet (title, description, tags...) của nhiều video
+        
+        Snippet hiện tại được lấy bằng `get_videos` rồi gộp với thay đổi;
+        các videos.update được gửi theo HTTP batch (tối đa 50 request mỗi
+        round trip). Video vượt quá quota còn lại hôm nay được đánh dấu
+        "deferred" và không gửi.
+        
+        Args:
+            updates: Dict video_id -> các field snippet cần đổi, vd. {'title': '...'}
+        
+        Returns:
+            Dict video_id -> {'status': success/error/deferred, 'error': ...}
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        current = self.get_videos(updates, part='snippet')
+        
+        pending = []
+        for video_id in updates:
+            if video_id in current:
+                pending.append(video_id)
+            else:
+                results[video_id] = {'status': 'error', 'error': 'Video not found'}
+        
+        affordable = self.quota.remaining() // QUOTA_COSTS['videos.update']
+        for video_id in pending[affordable:]:
+            results[video_id] = {'status': 'deferred', 'error': 'YouTube quota exhausted'}
+        pending = pending[:affordable]
+        
+        def on_response(video_id, response, exception):
+            if exception is not None:
+                results[video_id] = {'status': 'error', 'error': str(exception)}
+            else:
+                results[video_id] = {'status': 'success'}
+        
+        for start in range(0, len(pending), self.MAX_BATCH_SIZE):
+            chunk = pending[start:start + self.MAX_BATCH_SIZE]
+            batch = self.youtube.new_batch_http_request(callback=on_response)
+            for video_id in chunk:
+                snippet = {
+                    key: value for key, value in current[video_id]['snippet'].items()
+                    if key in self.SNIPPET_FIELDS
+                }
+                snippet.update(updates[video_id])
+                batch.add(
+                    self.youtube.videos().update(part='snippet', body={'id': video_id, 'snippet': snippet}),
+                    request_id=video_id
+                )
+            self.quota.charge('videos.update', calls=len(chunk))
+            self.retrier.call('youtube.batch', batch.execute, http=self._http())
+        
+        succeeded = sum(1 for result in results.values() if result['status'] == 'success')
+        logger.info(f"✏️ Updated {succeeded}/{len(updates)} videos")
+        return results
+    
+    def iter_uploads(self, channel_id: Optional[str] = None, page_size: int = 50) -> Iterator[Dict[str, Any]]:
+        """
+        Duyệt toàn bộ video đã upload của kênh (playlist "uploads"), mới nhất trước
+        
+        Args:
+            channel_id: Kênh cần duyệt (mặc định: kênh của tài khoản đã xác thực)
+            page_size: Số item mỗi trang (tối đa 50)
+        
+        Yields:
+            playlistItem resource (video ID ở contentDetails.videoId)
+        """
+        filters = {'id': channel_id} if channel_id else {'mine': True}
+        request = self.youtube.channels().list(part='contentDetails', **filters)
+        self.quota.charge('channels.list')
+        response = self.retrier.call('youtube.api', request.execute, http=self._http())
+        items = response.get('items', [])
+        if not items:
+            return
+        playlist_id = items[0]['contentDetails']['relatedPlaylists']['uploads']
+        
+        playlist_items = self.youtube.playlistItems()
+        request = playlist_items.list(
+            part='snippet,contentDetails',
+            playlistId=playlist_id,
+            maxResults=min(page_size, self.MAX_BATCH_SIZE)
+        )
+        while request is not None:
+            self.quota.charge('playlistItems.list')
+            response = self.retrier.call('youtube.api', request.execute, http=self._http())
+            yield from response.get('items', [])
+            request = playlist_items.list_next(request, response)
+    
+    def wait_for_processing(
+        self,
+        video_ids: Iterable[str],
+        interval: float = 30,
+        timeout: float = 1800
+    ) -> Dict[str, str]:
+        """
+        Poll trạng thái xử lý của nhiều video cùng lúc (một videos.list mỗi 50 video)
+        
+        Args:
+            video_ids: Danh sách ID video
+            interval: Số giây giữa các lần poll
+            timeout: Ngừng poll sau số giây này
+        
+        Returns:
+            Dict video_id -> processingStatus (succeeded/failed/terminated/processing/not_found)
+        """
+        statuses = {video_id: 'processing' for video_id in video_ids}
+        deadline = time.monotonic() + timeout
+        while True:
+            waiting = [video_id for video_id, status in statuses.items() if status == 'processing']
+            videos = self.get_videos(waiting, part='status,processingDetails')
+            for video_id in waiting:
+                video = videos.get(video_id)
+                if video is None:
+                    statuses[video_id] = 'not_found'
+                else:
+                    statuses[video_id] = video.get('processingDetails', {}).get('processingStatus', 'succeeded')
+            
+            waiting = [video_id for video_id, status in statuses.items() if status == 'processing']
+            if not waiting or time.monotonic() + interval > deadline:
+                break
+            logger.info(f"⏳ {len(waiting)} videos still processing, checking again in {interval:.0f}s")
+            time.sleep(interval)
+        return statuses
+    
+    def remaining_capacity(self) -> Dict[str, Any]:
+        """Quota còn lại hôm nay (units, số video upload được, thời điểm reset)"""
+        return self.quota.capacity()
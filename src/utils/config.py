@@ -2,7 +2,7 @@
 Configuration management using Pydantic Settings + YAML
 """
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
 import yaml
@@ -59,6 +59,83 @@ class Settings(BaseSettings):
     def MAX_DESCRIPTION_LENGTH(self) -> int:
         return self._config.get('llm', {}).get('max_description_length', 5000)
     
+    @property
+    def LLM_CACHE_ENABLED(self) -> bool:
+        return self._config.get('llm', {}).get('cache', {}).get('enabled', True)
+    
+    @property
+    def LLM_CACHE_DB(self) -> Path:
+        return Path(self._config.get('llm', {}).get('cache', {}).get('db', './data/llm_cache.db'))
+    
+    @property
+    def LLM_CACHE_TTL_HOURS(self) -> float:
+        """Output LLM cũ hơn số giờ này bị bỏ qua"""
+        return self._config.get('llm', {}).get('cache', {}).get('ttl_hours', 168)
+    
+    @property
+    def LLM_CACHE_MAX_ENTRIES(self) -> int:
+        return self._config.get('llm', {}).get('cache', {}).get('max_entries', 1000)
+    
+    @property
+    def LLM_CACHE_MAX_MB(self) -> float:
+        return self._config.get('llm', {}).get('cache', {}).get('max_mb', 50)
+    
+    @property
+    def LLM_CACHE_BYPASS(self) -> bool:
+        """Không đọc cache (vẫn ghi output mới), vd. khi muốn tạo lại mô tả"""
+        return self._config.get('llm', {}).get('cache', {}).get('bypass', False)
+    
+    @property
+    def LLM_STREAM_ENABLED(self) -> bool:
+        """Stream output cho prompt có title (title sớm, bỏ output lệch format giữa chừng)"""
+        return self._config.get('llm', {}).get('stream', {}).get('enabled', True)
+    
+    @property
+    def LLM_STREAM_TITLE_WITHIN_TOKENS(self) -> int:
+        return self._config.get('llm', {}).get('stream', {}).get('title_within_tokens', 120)
+    
+    @property
+    def LLM_STREAM_MAX_ATTEMPTS(self) -> int:
+        return self._config.get('llm', {}).get('stream', {}).get('max_attempts', 2)
+    
+    @property
+    def LLM_HEDGE_ENABLED(self) -> bool:
+        """Gửi thêm request tới provider dự phòng khi provider chính chậm"""
+        return self._config.get('llm', {}).get('hedge', {}).get('enabled', False)
+    
+    @property
+    def LLM_HEDGE_PROVIDERS(self) -> List[Dict[str, Any]]:
+        """Provider dự phòng theo thứ tự (api_key mặc định theo provider)"""
+        providers = []
+        for entry in self._config.get('llm', {}).get('hedge', {}).get('providers') or []:
+            entry = dict(entry)
+            if not entry.get('api_key'):
+                entry['api_key'] = self.GOOGLE_API_KEY if entry['provider'] == "gemini" else self.OPENAI_API_KEY
+            providers.append(entry)
+        return providers
+    
+    @property
+    def LLM_HEDGE_QUANTILE(self) -> float:
+        """Ngưỡng hedge = quantile này của latency gần đây của provider"""
+        return self._config.get('llm', {}).get('hedge', {}).get('quantile', 0.95)
+    
+    @property
+    def LLM_HEDGE_INITIAL_DELAY_SECONDS(self) -> float:
+        """Ngưỡng khi chưa đủ mẫu latency"""
+        return self._config.get('llm', {}).get('hedge', {}).get('initial_delay_seconds', 8)
+    
+    @property
+    def LLM_HEDGE_MIN_DELAY_SECONDS(self) -> float:
+        return self._config.get('llm', {}).get('hedge', {}).get('min_delay_seconds', 1)
+    
+    @property
+    def LLM_HEDGE_MAX_DELAY_SECONDS(self) -> float:
+        return self._config.get('llm', {}).get('hedge', {}).get('max_delay_seconds', 30)
+    
+    @property
+    def LLM_HEDGE_MIN_SAMPLES(self) -> int:
+        return self._config.get('llm', {}).get('hedge', {}).get('min_samples', 20)
+    
     # ============================================
     # Video Configuration
     # ============================================
@@ -71,6 +148,35 @@ class Settings(BaseSettings):
     def SUPPORTED_VIDEO_FORMATS(self) -> List[str]:
         return self._config.get('video', {}).get('supported_formats', ['mp4', 'avi', 'mov', 'mkv'])
     
+    @property
+    def VIDEO_LEDGER_BACKEND(self) -> str:
+        """Backend lưu trạng thái upload: sqlite hoặc json"""
+        return self._config.get('video', {}).get('ledger_backend', 'sqlite')
+    
+    @property
+    def VIDEO_QUEUE_ORDER(self) -> str:
+        """Thứ tự upload: name, mtime, size, priority"""
+        return self._config.get('video', {}).get('queue_order', 'name')
+    
+    @property
+    def VIDEO_DEDUP(self) -> bool:
+        """Bỏ qua video trùng nội dung với video đã upload (theo fingerprint)"""
+        return self._config.get('video', {}).get('dedup', True)
+    
+    @property
+    def VIDEO_FULL_HASH(self) -> bool:
+        """Tính thêm full BLAKE2 hash trong background"""
+        return self._config.get('video', {}).get('full_hash', False)
+    
+    @property
+    def VIDEO_MAX_FILE_SIZE_MB(self) -> float:
+        return self._config.get('video', {}).get('max_file_size_mb', 5000)
+    
+    @property
+    def VIDEO_INDEX_RESCAN_MINUTES(self) -> float:
+        """Quét lại toàn bộ folder video sau mỗi khoảng này, kể cả khi có inotify (NFS/SMB)"""
+        return self._config.get('video', {}).get('index_rescan_minutes', 5)
+    
     # ============================================
     # Upload Schedule
     # ============================================
@@ -97,6 +203,192 @@ class Settings(BaseSettings):
     def YOUTUBE_CHANNEL_ID(self) -> str:
         return self._config.get('youtube', {}).get('channel_id', '')
     
+    @property
+    def YOUTUBE_DAILY_QUOTA(self) -> int:
+        """Quota YouTube Data API mỗi ngày (units) của project"""
+        return self._config.get('youtube', {}).get('daily_quota', 10000)
+    
+    @property
+    def YOUTUBE_API_BASE_URL(self) -> str:
+        """Endpoint API thay thế, vd. mock server local (rỗng = Google)"""
+        return self._config.get('youtube', {}).get('api_base_url', '') or ''
+    
+    @property
+    def YOUTUBE_QUOTA_DB(self) -> Path:
+        return Path(self._config.get('youtube', {}).get('quota_db', './data/quota.db'))
+    
+    @property
+    def CHANNELS(self) -> List[Dict[str, Any]]:
+        """Danh sách kênh (mỗi kênh có token, folder, lịch, prompt, quota riêng); rỗng = một kênh"""
+        return self._config.get('channels') or []
+    
+    # ============================================
+    # Upload Transport
+    # ============================================
+    @property
+    def UPLOAD_CHUNK_SIZE_MB(self) -> float:
+        """Kích thước mỗi chunk resumable upload (làm tròn về bội số 256 KiB)"""
+        return self._config.get('upload', {}).get('chunk_size_mb', 8)
+    
+    @property
+    def UPLOAD_SESSION_DIR(self) -> Path:
+        return Path(self._config.get('upload', {}).get('session_dir', './data/upload_sessions'))
+    
+    @property
+    def UPLOAD_MAX_BANDWIDTH_MBPS(self) -> float:
+        """Tổng băng thông upload tối đa (Mbps, 0 = không giới hạn)"""
+        return self._config.get('upload', {}).get('max_bandwidth_mbps', 0)
+    
+    @property
+    def UPLOAD_BANDWIDTH_PROFILES(self) -> List[Dict[str, Any]]:
+        """Giới hạn băng thông theo giờ: [{start: "09:00", end: "18:00", mbps: 20}, ...]"""
+        return self._config.get('upload', {}).get('bandwidth_profiles') or []
+    
+    @property
+    def UPLOAD_ADAPTIVE_CHUNKS(self) -> bool:
+        return self._config.get('upload', {}).get('adaptive_chunks', True)
+    
+    @property
+    def UPLOAD_MAX_CHUNK_SIZE_MB(self) -> float:
+        return self._config.get('upload', {}).get('max_chunk_size_mb', 64)
+    
+    @property
+    def UPLOAD_TARGET_CHUNK_SECONDS(self) -> float:
+        """Thời gian truyền mong muốn cho mỗi chunk khi chunk size tự điều chỉnh"""
+        return self._config.get('upload', {}).get('target_chunk_seconds', 5)
+    
+    @property
+    def UPLOAD_USE_MMAP(self) -> bool:
+        """Đọc video qua mmap (chunk là memoryview, không copy) khi upload đồng bộ"""
+        return self._config.get('upload', {}).get('use_mmap', True)
+    
+    @property
+    def UPLOAD_READAHEAD_MB(self) -> float:
+        """Số MB kernel đọc trước phía sau chunk đang gửi (chỉ khi use_mmap)"""
+        return self._config.get('upload', {}).get('readahead_mb', 32)
+    
+    # ============================================
+    # HTTP Connection Pool
+    # ============================================
+    @property
+    def HTTP_MAX_CONNECTIONS(self) -> int:
+        return self._config.get('http', {}).get('max_connections', 10)
+    
+    @property
+    def HTTP_MAX_KEEPALIVE_CONNECTIONS(self) -> int:
+        return self._config.get('http', {}).get('max_keepalive_connections', 5)
+    
+    @property
+    def HTTP_KEEPALIVE_EXPIRY(self) -> float:
+        """Số giây giữ kết nối rảnh trước khi đóng"""
+        return self._config.get('http', {}).get('keepalive_expiry', 60)
+    
+    @property
+    def HTTP_CONNECT_TIMEOUT(self) -> float:
+        return self._config.get('http', {}).get('connect_timeout', 10)
+    
+    @property
+    def HTTP_READ_TIMEOUT(self) -> float:
+        return self._config.get('http', {}).get('read_timeout', 60)
+    
+    @property
+    def HTTP_HTTP2(self) -> bool:
+        """Dùng HTTP/2 cho upload async (cần cài thêm package h2)"""
+        return self._config.get('http', {}).get('http2', False)
+    
+    # ============================================
+    # Upload Telemetry
+    # ============================================
+    @property
+    def TELEMETRY_METRICS_FILE(self) -> Optional[Path]:
+        """File metrics Prometheus (textfile collector), rỗng = không ghi"""
+        path = self._config.get('telemetry', {}).get('metrics_file', './data/metrics/upload.prom')
+        return Path(path) if path else None
+    
+    @property
+    def TELEMETRY_UPLOADS_LOG(self) -> Optional[Path]:
+        """File JSONL ghi số liệu từng lượt upload, rỗng = không ghi"""
+        path = self._config.get('telemetry', {}).get('uploads_log', './logs/uploads.jsonl')
+        return Path(path) if path else None
+    
+    @property
+    def TELEMETRY_METRICS_PORT(self) -> int:
+        """Port phục vụ /metrics (0 = tắt)"""
+        return self._config.get('telemetry', {}).get('metrics_port', 0)
+    
+    @property
+    def TELEMETRY_FLUSH_INTERVAL(self) -> float:
+        """Số giây tối thiểu giữa hai lần ghi metrics_file trong lúc upload"""
+        return self._config.get('telemetry', {}).get('flush_interval', 15)
+    
+    # ============================================
+    # Batch Upload
+    # ============================================
+    @property
+    def BATCH_CONCURRENCY(self) -> int:
+        return self._config.get('batch', {}).get('concurrency', 2)
+    
+    @property
+    def BATCH_MAX_PER_RUN(self) -> int:
+        """Số video tối đa mỗi lượt batch (0 = không giới hạn)"""
+        return self._config.get('batch', {}).get('max_per_run', 0)
+    
+    @property
+    def BATCH_DAILY_CAP(self) -> int:
+        """Số video tối đa mỗi ngày, tính cả các lượt trước (0 = không giới hạn)"""
+        return self._config.get('batch', {}).get('daily_cap', 0)
+    
+    # ============================================
+    # Description Prefetch
+    # ============================================
+    @property
+    def PREFETCH_ENABLED(self) -> bool:
+        return self._config.get('prefetch', {}).get('enabled', True)
+    
+    @property
+    def PREFETCH_DEPTH(self) -> int:
+        """Số video đầu hàng đợi luôn được chuẩn bị sẵn (mô tả + thumbnail), 0 = tắt"""
+        if not self.PREFETCH_ENABLED:
+            return 0
+        return self._config.get('prefetch', {}).get('depth', 3)
+    
+    @property
+    def PREFETCH_INTERVAL_MINUTES(self) -> float:
+        return self._config.get('prefetch', {}).get('interval_minutes', 30)
+    
+    @property
+    def PREFETCH_CONCURRENCY(self) -> int:
+        """Số request LLM cùng lúc khi prefetch (thấp để không tranh quota với lượt upload)"""
+        return self._config.get('prefetch', {}).get('concurrency', 2)
+    
+    # ============================================
+    # Retry
+    # ============================================
+    @property
+    def RETRY_MAX_ATTEMPTS(self) -> int:
+        return self._config.get('retry', {}).get('max_attempts', 3)
+    
+    @property
+    def RETRY_BACKOFF_FACTOR(self) -> float:
+        return self._config.get('retry', {}).get('backoff_factor', 2)
+    
+    @property
+    def RETRY_MAX_DELAY(self) -> float:
+        return self._config.get('retry', {}).get('max_delay', 60)
+    
+    @property
+    def RETRY_BASE_DELAY(self) -> float:
+        return self._config.get('retry', {}).get('base_delay', 1)
+    
+    @property
+    def RETRY_BUDGET_RATIO(self) -> float:
+        """Tỉ lệ retry tối đa trên số lần gọi của mỗi target"""
+        return self._config.get('retry', {}).get('budget_ratio', 0.2)
+    
+    @property
+    def RETRY_BUDGET_MIN_RETRIES(self) -> int:
+        return self._config.get('retry', {}).get('budget_min_retries', 10)
+    
     # ============================================
     # Logging Configuration
     # ============================================
@@ -133,6 +425,16 @@ class Settings(BaseSettings):
         """Loại prompt: default, tech_tutorial, entertainment, educational"""
         return self._config.get('description', {}).get('prompt_type', 'default')
     
+    @property
+    def DESCRIPTION_STORE_DB(self) -> Path:
+        """Nơi lưu mô tả đã tạo trước (generate_descriptions.py), upload chỉ đọc ra"""
+        return Path(self._config.get('description', {}).get('store_db', './data/descriptions.db'))
+    
+    @property
+    def DESCRIPTION_BATCH_CONCURRENCY(self) -> int:
+        """Số request LLM cùng lúc khi tạo mô tả hàng loạt"""
+        return self._config.get('description', {}).get('batch_concurrency', 5)
+    
     # ============================================
     # Feature Flags
     # ============================================
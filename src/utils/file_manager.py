@@ -1,78 +1,694 @@
 """
 File management utilities for handling video files
 """
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from collections import deque
 from datetime import datetime
 import json
+import shutil
+import sqlite3
+import threading
+import yaml
 from loguru import logger
 
+from src.utils.fingerprint import FingerprintCache
+from src.utils.video_index import VideoDirectoryIndex
+from src.utils.video_probe import PROBE_EXTENSIONS, ProbeError, VideoMetadataIndex, probe_video
+
+
+class UploadState:
+    """Các trạng thái của video trong ledger"""
+    PENDING = "pending"
+    DESCRIBED = "described"
+    UPLOADING = "uploading"
+    UPLOADED = "uploaded"
+    FAILED = "failed"
+    
+    ALL = (PENDING, DESCRIBED, UPLOADING, UPLOADED, FAILED)
+
+
+class UploadLedger(ABC):
+    """Interface cho backend lưu trạng thái upload của từng video"""
+    
+    @abstractmethod
+    def get_state(self, name: str) -> Optional[str]:
+        """Lấy trạng thái của video (None nếu chưa có)"""
+    
+    @abstractmethod
+    def set_state(
+        self,
+        name: str,
+        state: str,
+        video_id: Optional[str] = None,
+        error: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ):
+        """Cập nhật trạng thái của video"""
+    
+    @abstractmethod
+    def get_names(self, state: str) -> Set[str]:
+        """Lấy tên các video đang ở trạng thái `state`"""
+    
+    def count(self, state: str) -> int:
+        """Đếm số video ở trạng thái `state`"""
+        return len(self.get_names(state))
+    
+    @abstractmethod
+    def get_uploaded_fingerprints(self) -> Dict[str, Optional[str]]:
+        """Lấy fingerprint nội dung của các video đã upload (tên -> fingerprint, None nếu chưa có)"""
+    
+    @abstractmethod
+    def count_uploaded_since(self, since: datetime) -> int:
+        """Đếm số video được upload từ thời điểm `since`"""
+    
+    def close(self):
+        """Giải phóng tài nguyên"""
+    
+    @staticmethod
+    def _check_state(state: str):
+        if state not in UploadState.ALL:
+            raise ValueError(f"Unknown upload state: {state}")
+
+
+class JsonUploadLedger(UploadLedger):
+    """Ledger dạng file `.uploaded.json` (format cũ, đọc/ghi toàn bộ file mỗi lần)"""
+    
+    def __init__(self, log_file: Path):
+        self.log_file = Path(log_file)
+        self._lock = threading.Lock()
+    
+    def _load(self) -> dict:
+        if not self.log_file.exists():
+            return {}
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading uploaded log: {e}")
+            return {}
+    
+    def get_state(self, name: str) -> Optional[str]:
+        data = self._load()
+        if name in data.get('uploaded', []):
+            return UploadState.UPLOADED
+        return data.get('states', {}).get(name)
+    
+    def set_state(
+        self,
+        name: str,
+        state: str,
+        video_id: Optional[str] = None,
+        error: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ):
+        self._check_state(state)
+        with self._lock:
+            data = self._load()
+            uploaded = set(data.get('uploaded', []))
+            states = data.get('states', {})
+            fingerprints = data.get('fingerprints', {})
+            uploaded_at = data.get('uploaded_at', {})
+            
+            if state == UploadState.UPLOADED:
+                uploaded.add(name)
+                states.pop(name, None)
+                uploaded_at[name] = datetime.now().isoformat()
+            else:
+                uploaded.discard(name)
+                states[name] = state
+            if fingerprint:
+                fingerprints[name] = fingerprint
+            
+            data = {
+                'uploaded': sorted(uploaded),
+                'states': states,
+                'fingerprints': fingerprints,
+                'uploaded_at': uploaded_at,
+                'last_updated': datetime.now().isoformat()
+            }
+            with open(self.log_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    def get_names(self, state: str) -> Set[str]:
+        data = self._load()
+        if state == UploadState.UPLOADED:
+            return set(data.get('uploaded', []))
+        return {name for name, s in data.get('states', {}).items() if s == state}
+    
+    def get_uploaded_fingerprints(self) -> Dict[str, Optional[str]]:
+        data = self._load()
+        fingerprints = data.get('fingerprints', {})
+        return {name: fingerprints.get(name) for name in data.get('uploaded', [])}
+    
+    def count_uploaded_since(self, since: datetime) -> int:
+        data = self._load()
+        uploaded = set(data.get('uploaded', []))
+        threshold = since.isoformat()
+        return sum(1 for name, ts in data.get('uploaded_at', {}).items() if name in uploaded and ts >= threshold)
+
+
+class SQLiteUploadLedger(UploadLedger):
+    """
+    Ledger lưu trong SQLite (WAL mode, mỗi video một dòng)
+    
+    Tra cứu và cập nhật theo tên video đi qua primary key nên là O(log n),
+    mỗi thay đổi trạng thái là một transaction riêng (atomic, crash-safe).
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS videos (
+            name TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            video_id TEXT,
+            error TEXT,
+            updated_at TEXT NOT NULL,
+            fingerprint TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_videos_state ON videos(state);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+    
+    def _migrate(self):
+        """Thêm các cột mới vào database tạo bởi phiên bản cũ"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        if 'fingerprint' not in columns:
+            self._conn.execute("ALTER TABLE videos ADD COLUMN fingerprint TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_fingerprint ON videos(fingerprint)")
+    
+    def get_state(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM videos WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set_state(
+        self,
+        name: str,
+        state: str,
+        video_id: Optional[str] = None,
+        error: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ):
+        self._check_state(state)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO videos (name, state, video_id, error, updated_at, fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    state = excluded.state,
+                    video_id = COALESCE(excluded.video_id, videos.video_id),
+                    error = excluded.error,
+                    updated_at = excluded.updated_at,
+                    fingerprint = COALESCE(excluded.fingerprint, videos.fingerprint)
+                """,
+                (name, state, video_id, error, datetime.now().isoformat(), fingerprint)
+            )
+    
+    def get_names(self, state: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM videos WHERE state = ?", (state,)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def count(self, state: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM videos WHERE state = ?", (state,)
+            ).fetchone()
+        return row[0]
+    
+    def get_uploaded_fingerprints(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, fingerprint FROM videos WHERE state = ?", (UploadState.UPLOADED,)
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+    
+    def count_uploaded_since(self, since: datetime) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM videos WHERE state = ? AND updated_at >= ?",
+                (UploadState.UPLOADED, since.isoformat())
+            ).fetchone()
+        return row[0]
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+    
+    def import_json(self, json_file: Path) -> int:
+        """
+        Import một lần từ file `.uploaded.json` cũ
+        
+        Args:
+            json_file: Đường dẫn file `.uploaded.json`
+        
+        Returns:
+            Số video được import (0 nếu file đã được import trước đó)
+        """
+        json_file = Path(json_file)
+        meta_key = f"json_imported:{json_file.name}"
+        if not json_file.exists() or self.get_meta(meta_key):
+            return 0
+        
+        legacy = JsonUploadLedger(json_file)
+        now = datetime.now().isoformat()
+        # File cũ không lưu thời điểm upload của từng video
+        unknown_time = datetime(1970, 1, 1).isoformat()
+        rows = [(name, UploadState.UPLOADED, unknown_time) for name in legacy.get_names(UploadState.UPLOADED)]
+        
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO videos (name, state, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO NOTHING
+                    """,
+                    rows
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (meta_key, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        
+        logger.info(f"Imported {len(rows)} uploaded videos from {json_file.name}")
+        return len(rows)
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PendingQueue:
+    """
+    Hàng đợi video chờ upload (materialized view của một lần quét folder + ledger)
+    
+    count/peek/pop đều O(1). Tạo bằng `VideoFileManager.get_pending_queue()`
+    và dùng chung cho cả lượt chạy thay vì quét lại folder mỗi lần cần.
+    """
+    
+    ORDERS = ("name", "mtime", "size", "priority")
+    
+    def __init__(self, videos: Iterable[Path], order: str = "name"):
+        self.order = order
+        self._items = deque(videos)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __bool__(self) -> bool:
+        return bool(self._items)
+    
+    def __iter__(self) -> Iterator[Path]:
+        return iter(list(self._items))
+    
+    def count(self) -> int:
+        """Số video còn trong hàng đợi"""
+        return len(self._items)
+    
+    def peek(self) -> Optional[Path]:
+        """Xem video tiếp theo (không lấy ra)"""
+        return self._items[0] if self._items else None
+    
+    def pop(self) -> Optional[Path]:
+        """Lấy video tiếp theo ra khỏi hàng đợi"""
+        return self._items.popleft() if self._items else None
+    
+    def discard(self, video_path: Path):
+        """Bỏ video khỏi hàng đợi (nếu có)"""
+        try:
+            self._items.remove(Path(video_path))
+        except ValueError:
+            pass
+
 
 class VideoFileManager:
     """Quản lý video files trong folder"""
     
-    def __init__(self, video_folder: Path):
+    LEDGER_BACKENDS = ("sqlite", "json")
+    PRIORITY_FILE_NAME = ".priority.yaml"
+    STATE_DIR_NAME = ".state"
+    # File trạng thái bot từng ghi thẳng vào folder video (chuyển vào state dir ở lần chạy đầu)
+    LEGACY_STATE_FILES = (".uploaded.json", ".uploaded.db", ".fingerprints.db", ".video_index.json")
+    
+    def __init__(
+        self,
+        video_folder: Path,
+        ledger_backend: str = "sqlite",
+        supported_formats: Optional[Iterable[str]] = None,
+        queue_order: str = "name",
+        dedup: bool = True,
+        full_hash: bool = False,
+        max_file_size_mb: Optional[float] = None,
+        state_dir: Optional[Path] = None,
+        index_rescan_interval: float = 300
+    ):
+        """
+        Args:
+            index_rescan_interval: Số giây giữa hai lần quét lại toàn bộ folder video (kể cả khi có inotify)
+            state_dir: Folder chứa ledger/fingerprint/index (mặc định `<video_folder>/.state`).
+                Không để trực tiếp trong folder video: file -wal/-shm của SQLite làm đổi
+                mtime của folder và snapshot index không bao giờ được dùng lại.
+        """
+        if queue_order not in PendingQueue.ORDERS:
+            raise ValueError(f"Unsupported queue order: {queue_order}")
+        
         self.video_folder = Path(video_folder)
-        self.uploaded_log_file = self.video_folder / ".uploaded.json"
+        self.state_dir = Path(state_dir) if state_dir else self.video_folder / self.STATE_DIR_NAME
+        self.uploaded_log_file = self.state_dir / ".uploaded.json"
+        self.ledger_db_file = self.state_dir / ".uploaded.db"
+        self.fingerprint_db_file = self.state_dir / ".fingerprints.db"
+        self.priority_file = self.video_folder / self.PRIORITY_FILE_NAME
+        self.queue_order = queue_order
+        self.max_file_size_mb = max_file_size_mb
+        self.pending_queue: Optional[PendingQueue] = None
         self._ensure_folder_exists()
+        self._migrate_legacy_state()
+        self.ledger = self._create_ledger(ledger_backend)
+        self.index = VideoDirectoryIndex(
+            self.video_folder,
+            formats=supported_formats,
+            snapshot_file=self.state_dir / ".video_index.json",
+            rescan_interval=index_rescan_interval
+        )
+        self.fingerprints = FingerprintCache(self.fingerprint_db_file, full_hash=full_hash) if dedup else None
+        self.metadata_index = VideoMetadataIndex(self.fingerprint_db_file) if dedup else None
+    
+    @classmethod
+    def from_settings(cls, settings, video_folder: Optional[Path] = None) -> "VideoFileManager":
+        """Tạo VideoFileManager từ Settings (video_folder: folder riêng của một kênh)"""
+        return cls(
+            video_folder or settings.VIDEO_FOLDER_PATH,
+            ledger_backend=settings.VIDEO_LEDGER_BACKEND,
+            supported_formats=settings.SUPPORTED_VIDEO_FORMATS,
+            queue_order=settings.VIDEO_QUEUE_ORDER,
+            dedup=settings.VIDEO_DEDUP,
+            full_hash=settings.VIDEO_FULL_HASH,
+            max_file_size_mb=settings.VIDEO_MAX_FILE_SIZE_MB,
+            index_rescan_interval=settings.VIDEO_INDEX_RESCAN_MINUTES * 60
+        )
     
     def _ensure_folder_exists(self):
         """Đảm bảo folder tồn tại"""
         self.video_folder.mkdir(parents=True, exist_ok=True)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
     
-    def get_all_videos(self) -> List[Path]:
-        """Lấy tất cả video files"""
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'}
-        videos = []
+    def _migrate_legacy_state(self):
+        """Chuyển ledger/fingerprint/index cũ từ folder video vào state dir (kèm file -wal/-shm)"""
+        for name in self.LEGACY_STATE_FILES:
+            target = self.state_dir / name
+            if not (self.video_folder / name).exists() or target.exists():
+                continue
+            for suffix in ("", "-wal", "-shm"):
+                source = self.video_folder / f"{name}{suffix}"
+                if source.exists():
+                    shutil.move(str(source), str(self.state_dir / source.name))
+            logger.info(f"📦 Moved {name} to {self.state_dir}")
+    
+    def _create_ledger(self, backend: str) -> UploadLedger:
+        """Tạo ledger backend theo cấu hình"""
+        if backend not in self.LEDGER_BACKENDS:
+            raise ValueError(f"Unsupported ledger backend: {backend}")
         
-        for ext in video_extensions:
-            videos.extend(self.video_folder.glob(f'*{ext}'))
+        if backend == "json":
+            return JsonUploadLedger(self.uploaded_log_file)
         
-        return sorted(videos)
+        ledger = SQLiteUploadLedger(self.ledger_db_file)
+        ledger.import_json(self.uploaded_log_file)
+        return ledger
+    
+    def get_all_videos(self) -> List[Path]:
+        """Lấy tất cả video files (từ index, chỉ quét lại folder khi có thay đổi)"""
+        return self.index.videos()
     
     def get_uploaded_videos(self) -> set:
         """Lấy danh sách video đã upload"""
-        if not self.uploaded_log_file.exists():
-            return set()
-        
+        return self.ledger.get_names(UploadState.UPLOADED)
+    
+    def get_video_state(self, video_path: Path) -> str:
+        """Lấy trạng thái hiện tại của video"""
+        return self.ledger.get_state(Path(video_path).name) or UploadState.PENDING
+    
+    def mark_state(
+        self,
+        video_path: Path,
+        state: str,
+        video_id: Optional[str] = None,
+        error: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ):
+        """Cập nhật trạng thái của video trong ledger"""
         try:
-            with open(self.uploaded_log_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return set(data.get('uploaded', []))
+            self.ledger.set_state(
+                Path(video_path).name, state, video_id=video_id, error=error, fingerprint=fingerprint
+            )
         except Exception as e:
-            logger.error(f"Error reading uploaded log: {e}")
-            return set()
+            logger.error(f"Error updating state of {Path(video_path).name} to {state}: {e}")
     
-    def mark_as_uploaded(self, video_path: Path):
-        """Đánh dấu video đã được upload"""
-        uploaded = self.get_uploaded_videos()
-        uploaded.add(str(video_path.name))
-        
-        data = {
-            'uploaded': list(uploaded),
-            'last_updated': datetime.now().isoformat()
-        }
+    def mark_as_uploaded(self, video_path: Path, video_id: Optional[str] = None):
+        """Đánh dấu video đã được upload (kèm fingerprint nội dung)"""
+        try:
+            fingerprint = self.get_fingerprint(video_path)
+        except OSError as e:
+            logger.warning(f"Could not fingerprint {video_path.name}: {e}")
+            fingerprint = None
+        self.mark_state(video_path, UploadState.UPLOADED, video_id=video_id, fingerprint=fingerprint)
+        logger.info(f"Marked {video_path.name} as uploaded")
+    
+    def get_fingerprint(self, video_path: Path) -> Optional[str]:
+        """Lấy fingerprint nội dung của video (None nếu tắt dedup)"""
+        if not self.fingerprints:
+            return None
+        video_path = Path(video_path)
+        return self.fingerprints.get(video_path, key=self._fingerprint_key(video_path))
+    
+    def _fingerprint_key(self, video_path: Path) -> Optional[Tuple[int, int, int]]:
+        """(inode, size, mtime_ns) vừa stat lại qua directory index nếu video nằm trong folder"""
+        entry = self.index.restat(video_path.name) if video_path.parent == self.video_folder else None
+        return (entry[2], entry[0], entry[1]) if entry else None
+    
+    def _same_content(self, video_path: Path, fingerprint: str, other_name: str) -> bool:
+        """
+        Xác nhận video trùng nội dung với `other_name` (cùng sampled fingerprint)
         
+        Khi bật full_hash, so thêm full hash để hai video khác nhau nhưng trùng
+        vùng lấy mẫu (vd. cùng intro/outro) không bị bỏ qua. Không có full hash
+        của video kia (file đã xóa, chưa từng hash) thì tin sampled hash.
+        """
+        cache = self.fingerprints
+        if not cache.full_hash:
+            return True
+        video_path = Path(video_path)
         try:
-            with open(self.uploaded_log_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Marked {video_path.name} as uploaded")
+            key = self._fingerprint_key(video_path) or cache.file_key(video_path)
+            full = cache.compute_full(video_path, key)
+            other = self.video_folder / other_name
+            if other_name != video_path.name and other.exists():
+                others = {cache.compute_full(other, self._fingerprint_key(other))}
+            else:
+                others = cache.full_hashes(fingerprint, exclude=key)
+        except OSError as e:
+            logger.warning(f"Could not hash {video_path.name}: {e}")
+            return True
+        others.discard(None)
+        if full is None or not others or full in others:
+            return True
+        logger.warning(f"⚠️ {video_path.name} matches {other_name} by sampled hash only, content differs: keeping it")
+        return False
+    
+    def find_duplicate(self, video_path: Path) -> Optional[str]:
+        """Tìm video đã upload có cùng nội dung, trả về tên của nó"""
+        fingerprint = self.get_fingerprint(video_path)
+        if not fingerprint:
+            return None
+        for name, uploaded_fp in self.ledger.get_uploaded_fingerprints().items():
+            if uploaded_fp == fingerprint and name != Path(video_path).name:
+                if self._same_content(video_path, fingerprint, name):
+                    return name
+        return None
+    
+    def _load_priorities(self) -> Dict[str, int]:
+        """Đọc priority từ file `.priority.yaml` (tên video: số, lớn hơn được upload trước)"""
+        if not self.priority_file.exists():
+            return {}
+        try:
+            with open(self.priority_file, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            return {str(name): int(priority) for name, priority in data.items()}
         except Exception as e:
-            logger.error(f"Error marking video as uploaded: {e}")
+            logger.error(f"Error reading priority file: {e}")
+            return {}
     
-    def get_next_video(self) -> Optional[Path]:
-        """Lấy video tiếp theo cần upload"""
-        all_videos = self.get_all_videos()
-        uploaded = self.get_uploaded_videos()
+    def _sort_videos(self, videos: List[Path], order: str) -> List[Path]:
+        """Sắp xếp video theo policy (dùng size/mtime có sẵn trong index)"""
+        if order == "name":
+            return videos
+        if order == "priority":
+            priorities = self._load_priorities()
+            return sorted(videos, key=lambda v: (-priorities.get(v.name, 0), v.name))
+        
+        field = 0 if order == "size" else 1
+        return sorted(videos, key=lambda v: ((self.index.stat(v.name) or (0, 0, 0))[field], v.name))
+    
+    def get_pending_queue(self, order: Optional[str] = None) -> PendingQueue:
+        """
+        Tạo hàng đợi video chờ upload từ một lần quét folder + ledger
+        
+        Args:
+            order: name, mtime, size hoặc priority (mặc định theo cấu hình)
+        
+        Returns:
+            PendingQueue, đồng thời được giữ ở `self.pending_queue` để dùng chung
+        """
+        order = order or self.queue_order
+        if order not in PendingQueue.ORDERS:
+            raise ValueError(f"Unsupported queue order: {order}")
+        
+        videos = self._filter_pending(self.get_all_videos())
+        self.pending_queue = PendingQueue(self._sort_videos(videos, order), order=order)
+        return self.pending_queue
+    
+    def peek_pending(self, limit: Optional[int] = None, order: Optional[str] = None) -> List[Path]:
+        """`limit` video đầu hàng đợi (None = tất cả), quét lại nhưng không thay `self.pending_queue` đang dùng"""
+        order = order or self.queue_order
+        return self._sort_videos(self._filter_pending(self.get_all_videos()), order)[:limit]
+    
+    def get_metadata(self, video_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Lấy metadata (duration, resolution, codec, bitrate, faststart) của video
+        
+        Kết quả được cache theo fingerprint nên chỉ probe mỗi nội dung một lần.
+        
+        Returns:
+            Dict metadata, None nếu container không hỗ trợ probe (avi, flv, wmv)
         
-        for video in all_videos:
-            if video.name not in uploaded:
-                return video
+        Raises:
+            ProbeError: Nếu header hỏng
+        """
+        video_path = Path(video_path)
+        if video_path.suffix.lower() not in PROBE_EXTENSIONS:
+            return None
         
+        fingerprint = self.get_fingerprint(video_path)
+        if fingerprint and self.metadata_index:
+            return self.metadata_index.get_or_probe(fingerprint, video_path)
+        return probe_video(video_path)
+    
+    def validate_video(self, video_path: Path) -> Optional[str]:
+        """
+        Kiểm tra nhanh video trước khi upload (size, header)
+        
+        Returns:
+            Lý do không hợp lệ, None nếu video hợp lệ
+        """
+        video_path = Path(video_path)
+        try:
+            size = video_path.stat().st_size
+        except OSError as e:
+            return f"Cannot read file: {e}"
+        
+        if size == 0:
+            return "File is empty"
+        if self.max_file_size_mb and size > self.max_file_size_mb * 1024 * 1024:
+            return f"File size {size / 1024 / 1024:.0f} MB exceeds limit of {self.max_file_size_mb} MB"
+        
+        try:
+            metadata = self.get_metadata(video_path)
+        except ProbeError as e:
+            return f"Invalid video header: {e}"
+        
+        if metadata is not None:
+            if not metadata.get('duration'):
+                # Duration không bắt buộc trong MKV/fMP4 (YouTube vẫn nhận): không biết thì bỏ qua
+                logger.debug(f"{video_path.name}: duration unknown")
+            if not metadata.get('video_codec'):
+                return "No video track found"
+            if not metadata.get('faststart'):
+                logger.debug(f"{video_path.name}: moov/index is not at the front of the file")
         return None
     
+    def _filter_pending(self, videos: List[Path]) -> List[Path]:
+        """
+        Lọc các video chưa upload
+        
+        Khi bật dedup, video được coi là đã upload nếu nội dung (fingerprint)
+        đã được upload dưới bất kỳ tên nào. Video trùng tên với video đã upload
+        nhưng khác nội dung vẫn được đưa vào hàng đợi.
+        """
+        if not self.fingerprints:
+            uploaded = self.get_uploaded_videos()
+            return [v for v in videos if v.name not in uploaded]
+        
+        uploaded = self.ledger.get_uploaded_fingerprints()
+        uploaded_fps = {fp: name for name, fp in uploaded.items() if fp}
+        seen_fps: Dict[str, Path] = {}
+        pending = []
+        
+        for video in videos:
+            try:
+                fingerprint = self.get_fingerprint(video)
+            except OSError as e:
+                logger.warning(f"Could not fingerprint {video.name}: {e}")
+                continue
+            
+            duplicate_of = uploaded_fps.get(fingerprint)
+            if duplicate_of and self._same_content(video, fingerprint, duplicate_of):
+                if duplicate_of != video.name:
+                    logger.debug(f"Skipping {video.name}: same content as uploaded {duplicate_of}")
+                continue
+            if video.name in uploaded and uploaded[video.name] is None:
+                # Bản ghi cũ chưa có fingerprint: tin theo tên
+                continue
+            if fingerprint in seen_fps and self._same_content(video, fingerprint, seen_fps[fingerprint].name):
+                logger.debug(f"Skipping {video.name}: duplicate of another pending video")
+                continue
+            
+            seen_fps.setdefault(fingerprint, video)
+            pending.append(video)
+        
+        return pending
+    
+    def get_next_video(self) -> Optional[Path]:
+        """Lấy video tiếp theo cần upload"""
+        return self.get_pending_queue().peek()
+    
     def get_pending_videos_count(self) -> int:
         """Đếm số video còn chờ upload"""
-        all_videos = self.get_all_videos()
-        uploaded = self.get_uploaded_videos()
-        return len([v for v in all_videos if v.name not in uploaded])
+        return self.get_pending_queue().count()
+    
+    def close(self):
+        """Đóng ledger và index"""
+        self.index.close()
+        self.ledger.close()
+        if self.fingerprints:
+            self.fingerprints.close()
+        if self.metadata_index:
+            self.metadata_index.close()
@@ -0,0 +1,212 @@
+"""
+Content fingerprints for video files (sampled mmap hash + optional full BLAKE2)
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from loguru import logger
+
+
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 16
+FULL_HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Khóa cache: (inode, size, mtime_ns)
+FileKey = Tuple[int, int, int]
+
+
+def sampled_fingerprint(
+    path: Path,
+    block_size: int = SAMPLE_BLOCK_SIZE,
+    blocks: int = SAMPLE_BLOCKS
+) -> str:
+    """
+    Hash nhanh nội dung file: đầu file, cuối file và `blocks` block cách đều nhau
+    
+    Chỉ đọc khoảng (blocks + 2) * block_size byte qua mmap nên file vài GB
+    cũng chỉ mất vài ms. Size của file cũng được đưa vào hash.
+    
+    Args:
+        path: Đường dẫn file
+        block_size: Kích thước mỗi block lấy mẫu
+        blocks: Số block lấy mẫu ở giữa file
+    
+    Returns:
+        Fingerprint dạng "s1:<hex>"
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(size.to_bytes(8, 'little'))
+        
+        if size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if size <= block_size * (blocks + 2):
+                    digest.update(mm)
+                else:
+                    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_RANDOM'):
+                        mm.madvise(mmap.MADV_RANDOM)
+                    step = (size - block_size) // (blocks + 1)
+                    offsets = [0] + [step * i for i in range(1, blocks + 1)] + [size - block_size]
+                    for offset in offsets:
+                        digest.update(mm[offset:offset + block_size])
+    
+    return f"s1:{digest.hexdigest()}"
+
+
+def full_fingerprint(path: Path, chunk_size: int = FULL_HASH_CHUNK_SIZE) -> str:
+    """Hash BLAKE2b toàn bộ nội dung file (chậm, dùng trong background)"""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return f"b2:{digest.hexdigest()}"
+
+
+class FingerprintCache:
+    """
+    Cache fingerprint trong SQLite, keyed theo (inode, size, mtime_ns)
+    
+    File không đổi thì không bao giờ bị hash lại. Hash toàn bộ file (nếu bật)
+    chạy trong thread pool và được ghi vào cache khi xong.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            inode INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sampled TEXT NOT NULL,
+            full TEXT,
+            PRIMARY KEY (inode, size, mtime_ns)
+        );
+    """
+    
+    def __init__(self, db_file: Path, full_hash: bool = False, max_workers: int = 2):
+        self.db_file = Path(db_file)
+        self.full_hash = full_hash
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._memory: Optional[Dict[FileKey, Tuple[str, Optional[str]]]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._pending: Dict[FileKey, Future] = {}
+    
+    def _load(self) -> Dict[FileKey, Tuple[str, Optional[str]]]:
+        """Load toàn bộ cache vào memory một lần (một câu SELECT)"""
+        if self._memory is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT inode, size, mtime_ns, sampled, full FROM fingerprints"
+                ).fetchall()
+            self._memory = {(r[0], r[1], r[2]): (r[3], r[4]) for r in rows}
+        return self._memory
+    
+    @staticmethod
+    def file_key(path: Path) -> FileKey:
+        st = os.stat(path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+    
+    def get(self, path: Path, key: Optional[FileKey] = None) -> str:
+        """
+        Lấy sampled fingerprint của file (hash nếu chưa có trong cache)
+        
+        Args:
+            path: Đường dẫn file
+            key: (inode, size, mtime_ns) nếu đã biết (vd. từ directory index)
+        """
+        key = key or self.file_key(path)
+        memory = self._load()
+        cached = memory.get(key)
+        if cached:
+            if self.full_hash and cached[1] is None:
+                self.schedule_full_hash(path, key)
+            return cached[0]
+        
+        sampled = sampled_fingerprint(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (inode, size, mtime_ns, sampled, full) VALUES (?, ?, ?, ?, NULL)",
+                (*key, sampled)
+            )
+        memory[key] = (sampled, None)
+        
+        if self.full_hash:
+            self.schedule_full_hash(path, key)
+        return sampled
+    
+    def get_full(self, path: Path, key: Optional[FileKey] = None) -> Optional[str]:
+        """Lấy full hash nếu đã tính xong (không chờ)"""
+        key = key or self.file_key(path)
+        cached = self._load().get(key)
+        return cached[1] if cached else None
+    
+    def compute_full(self, path: Path, key: Optional[FileKey] = None) -> Optional[str]:
+        """Lấy full hash, tính ngay (chờ) nếu chưa có"""
+        key = key or self.file_key(path)
+        full = self.get_full(path, key)
+        if full is not None:
+            return full
+        self.get(path, key)
+        with self._lock:
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+        return self._compute_full(Path(path), key)
+    
+    def full_hashes(self, sampled: str, exclude: Optional[FileKey] = None) -> Set[str]:
+        """Full hash đã biết của các file có cùng sampled fingerprint (trừ file `exclude`)"""
+        return {
+            full for key, (other, full) in self._load().items()
+            if other == sampled and full and key != exclude
+        }
+    
+    def schedule_full_hash(self, path: Path, key: FileKey) -> Future:
+        """Tính full BLAKE2 hash trong thread pool"""
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="fingerprint"
+                )
+            future = self._executor.submit(self._compute_full, Path(path), key)
+            self._pending[key] = future
+        return future
+    
+    def _compute_full(self, path: Path, key: FileKey) -> Optional[str]:
+        full = None
+        try:
+            full = full_fingerprint(path)
+            memory = self._load()
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE fingerprints SET full = ? WHERE inode = ? AND size = ? AND mtime_ns = ?",
+                    (full, *key)
+                )
+                if key in memory:
+                    memory[key] = (memory[key][0], full)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not hash {path.name}: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        return full
+    
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._conn.close()
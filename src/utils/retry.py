@@ -0,0 +1,250 @@
+"""
+Retry with exponential backoff, error classification and per-target retry budgets
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import random
+import socket
+import ssl
+import threading
+import time
+from loguru import logger
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# 403 của Google API có thể là rate limit (thử lại được) hoặc hết quota (không)
+RETRYABLE_403_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "backendError")
+
+RETRYABLE_EXCEPTIONS = (ConnectionError, TimeoutError, socket.timeout, socket.gaierror, ssl.SSLError)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After dạng số giây hoặc HTTP-date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _status_and_headers(exc: BaseException) -> Tuple[Optional[int], Dict[str, str], str]:
+    """Lấy HTTP status, headers và body từ các loại exception của googleapiclient/httpx/SDK LLM"""
+    # googleapiclient.errors.HttpError: resp là httplib2.Response (dict headers)
+    resp = getattr(exc, 'resp', None)
+    if resp is not None and hasattr(resp, 'status'):
+        content = getattr(exc, 'content', b'') or b''
+        body = content.decode('utf-8', 'replace') if isinstance(content, bytes) else str(content)
+        return int(resp.status), {k.lower(): v for k, v in dict(resp).items()}, body
+    
+    # httpx.HTTPStatusError và SDK dùng httpx (openai, ...): exc.response
+    response = getattr(exc, 'response', None)
+    status = getattr(exc, 'status_code', None) or getattr(response, 'status_code', None)
+    if status is None:
+        # google.api_core exceptions: exc.code là HTTP status
+        code = getattr(exc, 'code', None)
+        status = code if isinstance(code, int) else None
+    headers: Dict[str, str] = {}
+    body = ""
+    if response is not None:
+        headers = {k.lower(): v for k, v in getattr(response, 'headers', {}).items()}
+        try:
+            body = response.text
+        except Exception:
+            body = ""
+    return (int(status) if status else None), headers, body
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Phân loại lỗi
+    
+    Returns:
+        (có thử lại được không, số giây server yêu cầu chờ theo Retry-After)
+    """
+    status, headers, body = _status_and_headers(exc)
+    if status is not None:
+        retry_after = _parse_retry_after(headers.get('retry-after'))
+        if status in RETRYABLE_STATUSES:
+            return True, retry_after
+        if status == 403 and any(reason in body for reason in RETRYABLE_403_REASONS):
+            return True, retry_after
+        return False, None
+    
+    if isinstance(exc, RETRYABLE_EXCEPTIONS):
+        return True, None
+    # Lỗi kết nối của httpx/httplib2 không kế thừa ConnectionError
+    name = type(exc).__name__
+    if name in ("TransportError", "ConnectError", "ReadError", "WriteError", "RemoteProtocolError",
+                "ReadTimeout", "WriteTimeout", "ConnectTimeout", "PoolTimeout",
+                "ServerNotFoundError", "APIConnectionError", "APITimeoutError"):
+        return True, None
+    return False, None
+
+
+@dataclass
+class RetryBudget:
+    """
+    Bộ đếm retry của một target (vd. youtube.upload, llm.gemini)
+    
+    Số retry không được vượt quá `min_retries + ratio * calls`: khi dịch vụ
+    lỗi hàng loạt thì ngừng retry thay vì nhân số request lên.
+    """
+    ratio: float = 0.2
+    min_retries: int = 10
+    calls: int = 0
+    retries: int = 0
+    successes: int = 0
+    failures: int = 0
+    exhausted: int = 0
+    
+    def can_retry(self) -> bool:
+        return self.retries < self.min_retries + self.ratio * self.calls
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'successes': self.successes,
+            'failures': self.failures,
+            'budget_exhausted': self.exhausted,
+        }
+
+
+class Retrier:
+    """
+    Chạy một thao tác với retry (exponential backoff + jitter)
+    
+    Lỗi tạm thời (5xx, 429, mất kết nối) được thử lại tối đa `max_attempts`
+    lần, tôn trọng Retry-After; lỗi 4xx (auth, quota, request sai) được
+    raise ngay. Hết lượt thử thì raise lại lỗi cuối cùng nên code gọi giữ
+    nguyên cách xử lý lỗi cũ.
+    """
+    
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_factor: float = 2,
+        max_delay: float = 60,
+        base_delay: float = 1.0,
+        budget_ratio: float = 0.2,
+        budget_min_retries: int = 10
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.base_delay = base_delay
+        self.budget_ratio = budget_ratio
+        self.budget_min_retries = budget_min_retries
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_settings(cls, settings) -> "Retrier":
+        return cls(
+            max_attempts=settings.RETRY_MAX_ATTEMPTS,
+            backoff_factor=settings.RETRY_BACKOFF_FACTOR,
+            max_delay=settings.RETRY_MAX_DELAY,
+            base_delay=settings.RETRY_BASE_DELAY,
+            budget_ratio=settings.RETRY_BUDGET_RATIO,
+            budget_min_retries=settings.RETRY_BUDGET_MIN_RETRIES
+        )
+    
+    def budget(self, target: str) -> RetryBudget:
+        with self._lock:
+            if target not in self._budgets:
+                self._budgets[target] = RetryBudget(self.budget_ratio, self.budget_min_retries)
+            return self._budgets[target]
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Bộ đếm retry theo từng target"""
+        with self._lock:
+            return {target: budget.as_dict() for target, budget in self._budgets.items()}
+    
+    def backoff(self, attempt: int) -> float:
+        """Thời gian chờ trước lần thử thứ `attempt + 1` (equal jitter)"""
+        delay = min(self.max_delay, self.base_delay * self.backoff_factor ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+    
+    def _next_delay(self, target: str, attempt: int, exc: BaseException) -> Optional[float]:
+        """Số giây chờ trước lần thử tiếp theo, None nếu phải bỏ cuộc"""
+        budget = self.budget(target)
+        retryable, retry_after = classify_error(exc)
+        with self._lock:
+            if not retryable or attempt >= self.max_attempts:
+                budget.failures += 1
+                return None
+            if retry_after is not None and retry_after > self.max_delay:
+                logger.warning(f"[{target}] Retry-After {retry_after:.0f}s exceeds max_delay, giving up")
+                budget.failures += 1
+                return None
+            if not budget.can_retry():
+                logger.warning(f"[{target}] Retry budget exhausted, giving up")
+                budget.exhausted += 1
+                budget.failures += 1
+                return None
+            budget.retries += 1
+        
+        delay = max(self.backoff(attempt), retry_after or 0)
+        logger.warning(
+            f"🔁 [{target}] Attempt {attempt}/{self.max_attempts} failed ({type(exc).__name__}: {exc}), "
+            f"retrying in {delay:.1f}s"
+        )
+        return delay
+    
+    def _start(self, target: str):
+        budget = self.budget(target)
+        with self._lock:
+            budget.calls += 1
+    
+    def _succeeded(self, target: str):
+        budget = self.budget(target)
+        with self._lock:
+            budget.successes += 1
+    
+    def call(self, target: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Gọi `fn` (đồng bộ) với retry"""
+        self._start(target)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(target, attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self._succeeded(target)
+            return result
+    
+    async def acall(self, target: str, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Gọi coroutine function `fn` với retry (chờ bằng asyncio.sleep)"""
+        self._start(target)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(target, attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._succeeded(target)
+            return result
@@ -5,7 +5,10 @@ from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
 from typing import Optional, Tuple
 from loguru import logger
+import hashlib
+import os
 import textwrap
+import threading
 
 
 class ThumbnailGenerator:
@@ -21,6 +24,9 @@ class ThumbnailGenerator:
     ACCENT_COLOR = (231, 76, 60)  # Red
     BORDER_COLOR = (52, 73, 94)  # Dark blue
     
+    # Tăng khi đổi cách vẽ để thumbnail cũ trong cache không còn được dùng
+    STYLE_VERSION = 1
+    
     def __init__(self, output_dir: str = "data/thumbnails"):
         """
         Initialize thumbnail generator
@@ -116,11 +122,35 @@ class ThumbnailGenerator:
             
             logger.success(f"✅ Thumbnail created: {output_path}")
             return output_path
-            
+        
         except Exception as e:
             logger.error(f"❌ Error creating thumbnail: {e}")
             raise
     
+    def cache_key(self, title: str) -> str:
+        """Khóa cache: thumbnail chỉ phụ thuộc vào title và kiểu vẽ"""
+        raw = f"{self.STYLE_VERSION}|{self.WIDTH}x{self.HEIGHT}|{title}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+    
+    def cached_thumbnail(self, title: str, video_name: str) -> Path:
+        """
+        Thumbnail cho title, chỉ vẽ nếu chưa có trong cache
+        
+        File được đặt tên theo hash của title nên video upload lại (hoặc
+        retry) với cùng title dùng lại ảnh đã vẽ.
+        """
+        key = self.cache_key(title)
+        cached_path = self.output_dir / f"thumb_{key}.jpg"
+        if cached_path.exists():
+            logger.info(f"📷 Thumbnail cache hit for: {video_name}")
+            return cached_path
+        # Vẽ ra file tạm rồi rename để hai worker cùng title không đọc phải file dở
+        tmp_path = self.create_thumbnail(
+            title, video_name, output_filename=f"thumb_{key}.{os.getpid()}-{threading.get_ident()}.tmp.jpg"
+        )
+        os.replace(tmp_path, cached_path)
+        return cached_path
+    
     def _add_gradient(self, img: Image.Image):
         """Thêm gradient effect (tối dần ở dưới)"""
         gradient = Image.new('RGBA', (self.WIDTH, self.HEIGHT), (0, 0, 0, 0))
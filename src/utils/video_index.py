@@ -0,0 +1,306 @@
+"""
+Incremental directory index for the video folder
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from loguru import logger
+
+
+DEFAULT_VIDEO_FORMATS = ('mp4', 'avi', 'mov', 'mkv', 'flv', 'wmv')
+
+
+def normalize_formats(formats: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Chuẩn hóa danh sách định dạng ('MP4', '.mp4' -> '.mp4')"""
+    formats = formats or DEFAULT_VIDEO_FORMATS
+    return tuple(sorted({f".{str(fmt).lower().lstrip('.')}" for fmt in formats}))
+
+
+class _InotifyWatcher:
+    """
+    Theo dõi thay đổi của folder bằng inotify (Linux, qua ctypes)
+    
+    Chỉ đọc event ở chế độ non-blocking khi index được refresh,
+    không cần thread riêng.
+    """
+    
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+    
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    RESCAN_MASK = IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF
+    
+    _EVENT_HEADER = struct.Struct('iIII')
+    
+    def __init__(self, fd: int):
+        self.fd = fd
+    
+    @classmethod
+    def create(cls, folder: Path) -> Optional["_InotifyWatcher"]:
+        """Tạo watcher, trả về None nếu hệ thống không hỗ trợ inotify"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(cls.IN_NONBLOCK | cls.IN_CLOEXEC)
+            if fd < 0:
+                return None
+            wd = libc.inotify_add_watch(fd, os.fsencode(str(folder)), cls.WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                return None
+            return cls(fd)
+        except (OSError, AttributeError):
+            return None
+    
+    def read_changes(self) -> Optional[set]:
+        """
+        Đọc các event đang chờ
+        
+        Returns:
+            Tập tên file bị thay đổi, hoặc None nếu cần quét lại toàn bộ folder
+        """
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            except OSError:
+                return None
+            
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+                offset += self._EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & self.RESCAN_MASK:
+                    return None
+                if name:
+                    changed.add(os.fsdecode(name))
+    
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class VideoDirectoryIndex:
+    """
+    Snapshot của folder video, keyed theo tên file với (size, mtime_ns, inode)
+    
+    Quét folder bằng một lần `os.scandir` và lưu snapshot ra file để lần
+    chạy sau không phải quét lại nếu folder không đổi. Việc refresh là
+    incremental: dùng inotify nếu có, nếu không thì so mtime của folder.
+    
+    inotify không báo thay đổi do máy khác ghi trên NFS/SMB, và mtime của
+    folder không đổi khi file bị ghi đè tại chỗ, nên folder vẫn được quét lại
+    toàn bộ sau mỗi `rescan_interval` giây; video có mtime trong khoảng đó
+    (có thể đang được copy) được stat lại ở mỗi lần refresh.
+    """
+    
+    SNAPSHOT_VERSION = 2
+    # mtime của folder có độ phân giải thô trên một số filesystem (NFS, FAT),
+    # thay đổi xảy ra sát thời điểm quét có thể không làm mtime đổi
+    RACY_WINDOW_NS = 2_000_000_000
+    
+    def __init__(
+        self,
+        folder: Path,
+        formats: Optional[Iterable[str]] = None,
+        snapshot_file: Optional[Path] = None,
+        use_inotify: bool = True,
+        rescan_interval: float = 300
+    ):
+        self.folder = Path(folder)
+        self.formats = normalize_formats(formats)
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else self.folder / ".video_index.json"
+        self.rescan_interval = rescan_interval
+        self.entries: Dict[str, Tuple[int, int, int]] = {}
+        self._dir_mtime_ns: Optional[int] = None
+        self._scanned_at_ns = 0
+        self._sorted: Optional[List[Path]] = None
+        self._lock = threading.Lock()
+        self._watcher = _InotifyWatcher.create(self.folder) if use_inotify else None
+        self._synced = False
+        # Snapshot load lúc khởi động được tin như vừa quét
+        self._last_full_scan = time.monotonic()
+        self._loaded = self._load_snapshot()
+    
+    def _is_video(self, name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in self.formats
+    
+    def _load_snapshot(self) -> bool:
+        """Load snapshot từ lần chạy trước"""
+        if not self.snapshot_file.exists():
+            return False
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read video index snapshot: {e}")
+            return False
+        
+        if data.get('version') != self.SNAPSHOT_VERSION or tuple(data.get('formats', [])) != self.formats:
+            return False
+        
+        self.entries = {name: tuple(entry) for name, entry in data.get('entries', {}).items()}
+        self._dir_mtime_ns = data.get('dir_mtime_ns')
+        self._scanned_at_ns = data.get('scanned_at_ns', 0)
+        return True
+    
+    def _save_snapshot(self):
+        """
+        Ghi snapshot ra file
+        
+        Ghi đè tại chỗ thay vì file tạm + rename để không làm đổi mtime của
+        folder (nếu không lần refresh sau sẽ luôn phải quét lại). Snapshot hỏng
+        chỉ dẫn tới một lần quét lại toàn bộ.
+        """
+        data = {
+            'version': self.SNAPSHOT_VERSION,
+            'formats': list(self.formats),
+            'dir_mtime_ns': self._dir_mtime_ns,
+            'scanned_at_ns': self._scanned_at_ns,
+            'entries': self.entries,
+        }
+        try:
+            with open(self.snapshot_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"Could not write video index snapshot: {e}")
+    
+    def _full_scan(self, dir_mtime_ns: int):
+        """Quét toàn bộ folder bằng một lần os.scandir"""
+        entries = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not self._is_video(entry.name):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries[entry.name] = (st.st_size, st.st_mtime_ns, entry.inode())
+        
+        added = entries.keys() - self.entries.keys()
+        removed = self.entries.keys() - entries.keys()
+        changed = {n for n in entries.keys() & self.entries.keys() if entries[n] != self.entries[n]}
+        if added or removed or changed:
+            logger.debug(f"Video index: +{len(added)} -{len(removed)} ~{len(changed)}")
+        
+        self.entries = entries
+        self._dir_mtime_ns = dir_mtime_ns
+        self._scanned_at_ns = time.time_ns()
+        self._last_full_scan = time.monotonic()
+        self._sorted = None
+        self._save_snapshot()
+    
+    def _stat_entries(self, names: Iterable[str]) -> bool:
+        """Stat lại các file, cập nhật entry; True nếu có entry đổi"""
+        changed = False
+        for name in names:
+            try:
+                st = os.stat(self.folder / name)
+            except OSError:
+                changed |= self.entries.pop(name, None) is not None
+                continue
+            entry = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if self.entries.get(name) != entry:
+                self.entries[name] = entry
+                changed = True
+        if changed:
+            self._sorted = None
+        return changed
+    
+    def _apply_changes(self, names: set):
+        """Cập nhật incremental các file được inotify báo thay đổi"""
+        names = {name for name in names if self._is_video(name)}
+        if not names:
+            return
+        self._stat_entries(names)
+        self._dir_mtime_ns = os.stat(self.folder).st_mtime_ns
+        self._scanned_at_ns = time.time_ns()
+        self._save_snapshot()
+    
+    def _restat_recent(self):
+        """Stat lại video ghi gần đây (đang copy / ghi đè tại chỗ không làm đổi mtime folder)"""
+        cutoff = time.time_ns() - int(self.rescan_interval * 1e9)
+        recent = [name for name, (_, mtime_ns, _) in self.entries.items() if mtime_ns >= cutoff]
+        if recent and self._stat_entries(recent):
+            self._save_snapshot()
+    
+    def refresh(self, force: bool = False):
+        """Đồng bộ index với trạng thái hiện tại của folder"""
+        with self._lock:
+            if time.monotonic() - self._last_full_scan >= self.rescan_interval:
+                force = True
+            # inotify chỉ đáng tin sau lần đồng bộ đầu tiên trong process này,
+            # thay đổi xảy ra khi process chưa chạy phải dựa vào mtime
+            if self._watcher and self._synced and not force:
+                changes = self._watcher.read_changes()
+                if changes is not None:
+                    self._apply_changes(changes)
+                    self._restat_recent()
+                    return
+                force = True
+            
+            dir_mtime_ns = os.stat(self.folder).st_mtime_ns
+            unchanged = (
+                self._loaded
+                and dir_mtime_ns == self._dir_mtime_ns
+                and self._scanned_at_ns - dir_mtime_ns > self.RACY_WINDOW_NS
+            )
+            if force or not unchanged:
+                self._full_scan(dir_mtime_ns)
+            else:
+                self._restat_recent()
+            self._loaded = True
+            self._synced = True
+    
+    def videos(self) -> List[Path]:
+        """Danh sách video (đã sort theo tên)"""
+        self.refresh()
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = [self.folder / name for name in sorted(self.entries)]
+            return list(self._sorted)
+    
+    def stat(self, name: str) -> Optional[Tuple[int, int, int]]:
+        """Lấy (size, mtime_ns, inode) của video trong index"""
+        return self.entries.get(name)
+    
+    def restat(self, name: str) -> Optional[Tuple[int, int, int]]:
+        """Stat lại video và cập nhật index (dùng khi cần giá trị hiện tại, vd. khóa fingerprint)"""
+        with self._lock:
+            if self._is_video(name) and self._stat_entries([name]):
+                self._save_snapshot()
+            return self.entries.get(name)
+    
+    def close(self):
+        if self._watcher:
+            self._watcher.close()
+            self._watcher = None
@@ -0,0 +1,408 @@
+"""
+Pure-Python container header prober for MP4/MOV and MKV/WebM
+"""
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+import json
+import os
+import sqlite3
+import struct
+import threading
+from loguru import logger
+
+
+class ProbeError(Exception):
+    """File không đọc được header hoặc không đúng định dạng container"""
+
+
+MP4_EXTENSIONS = {'.mp4', '.m4v', '.mov'}
+MKV_EXTENSIONS = {'.mkv', '.webm'}
+PROBE_EXTENSIONS = MP4_EXTENSIONS | MKV_EXTENSIONS
+
+# moov/Tracks thường chỉ vài MB, giới hạn để file hỏng không làm đọc hết RAM
+MAX_HEADER_BYTES = 64 * 1024 * 1024
+
+
+def probe_video(path: Path) -> Dict[str, Any]:
+    """
+    Đọc metadata từ header của container (chỉ đọc các atom/element cần thiết)
+    
+    Args:
+        path: Đường dẫn video (.mp4/.mov/.m4v/.mkv/.webm)
+    
+    Returns:
+        Dict gồm container, duration (giây), width, height, video_codec,
+        audio_codec, bitrate (bit/s), faststart, size
+    
+    Raises:
+        ProbeError: Nếu không parse được header
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    size = path.stat().st_size
+    
+    with open(path, 'rb') as f:
+        head = f.read(12)
+        f.seek(0)
+        try:
+            if head[:4] == b'\x1a\x45\xdf\xa3':
+                metadata = _probe_mkv(f, size)
+            elif head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip') or suffix in MP4_EXTENSIONS:
+                metadata = _probe_mp4(f, size)
+            else:
+                raise ProbeError(f"Unsupported container: {path.name}")
+        except (struct.error, IndexError) as e:
+            raise ProbeError(f"Truncated or corrupt header: {e}") from e
+    
+    metadata['size'] = size
+    duration = metadata.get('duration') or 0
+    metadata['bitrate'] = int(size * 8 / duration) if duration > 0 else None
+    return metadata
+
+
+def _empty_metadata(container: str) -> Dict[str, Any]:
+    return {
+        'container': container,
+        'duration': None,
+        'width': None,
+        'height': None,
+        'video_codec': None,
+        'audio_codec': None,
+        'faststart': False,
+    }
+
+
+# ============================================
+# MP4 / MOV (ISO BMFF atoms)
+# ============================================
+_MP4_CONTAINERS = {b'trak', b'mdia', b'minf', b'stbl'}
+
+
+def _iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Duyệt các box trong khoảng [start, end), trả về (type, payload_offset, payload_end)"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if box_size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            box_size = struct.unpack('>Q', large)[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size:
+            raise ProbeError(f"Invalid box size for {box_type!r} at {offset}")
+        yield box_type, offset + header_size, min(offset + box_size, end)
+        offset += box_size
+
+
+def _iter_buffer_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Như _iter_boxes nhưng trên buffer đã đọc sẵn (nội dung moov)"""
+    offset = start
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size:
+            raise ProbeError(f"Invalid box size for {box_type!r} at {offset}")
+        yield box_type, offset + header_size, min(offset + box_size, end)
+        offset += box_size
+
+
+def _probe_mp4(f: BinaryIO, size: int) -> Dict[str, Any]:
+    metadata = _empty_metadata('mp4')
+    moov = None
+    mdat_seen = False
+    
+    for box_type, start, end in _iter_boxes(f, 0, size):
+        if box_type == b'ftyp':
+            f.seek(start)
+            brand = f.read(4)
+            if brand == b'qt  ':
+                metadata['container'] = 'mov'
+        elif box_type == b'mdat':
+            mdat_seen = True
+        elif box_type == b'moov':
+            if end - start > MAX_HEADER_BYTES:
+                raise ProbeError("moov atom too large")
+            f.seek(start)
+            moov = f.read(end - start)
+            metadata['faststart'] = not mdat_seen
+            if mdat_seen:
+                break
+    
+    if moov is None:
+        raise ProbeError("moov atom not found")
+    
+    for box_type, start, end in _iter_buffer_boxes(moov, 0, len(moov)):
+        if box_type == b'mvhd':
+            version = moov[start]
+            if version == 1:
+                timescale, duration = struct.unpack_from('>IQ', moov, start + 20)
+            else:
+                timescale, duration = struct.unpack_from('>II', moov, start + 12)
+            # fMP4 để duration = 0 trong mvhd (thời lượng nằm trong các fragment): coi như không biết
+            if timescale and duration:
+                metadata['duration'] = duration / timescale
+        elif box_type == b'trak':
+            _parse_trak(moov, start, end, metadata)
+    
+    return metadata
+
+
+def _parse_trak(data: bytes, start: int, end: int, metadata: Dict[str, Any]):
+    """Đọc tkhd (kích thước), hdlr (loại track) và stsd (codec) của một track"""
+    found = {}
+    
+    def walk(s: int, e: int):
+        for box_type, bs, be in _iter_buffer_boxes(data, s, e):
+            if box_type == b'tkhd':
+                offset = bs + (88 if data[bs] == 1 else 76)
+                width, height = struct.unpack_from('>II', data, offset)
+                found['width'], found['height'] = width >> 16, height >> 16
+            elif box_type == b'hdlr':
+                found['handler'] = data[bs + 8:bs + 12]
+            elif box_type == b'stsd':
+                if struct.unpack_from('>I', data, bs + 4)[0] > 0:
+                    found['codec'] = data[bs + 12:bs + 16].decode('latin-1').strip()
+            elif box_type in _MP4_CONTAINERS:
+                walk(bs, be)
+    
+    walk(start, end)
+    
+    handler = found.get('handler')
+    if handler == b'vide' and metadata['video_codec'] is None:
+        metadata['video_codec'] = found.get('codec')
+        metadata['width'] = found.get('width')
+        metadata['height'] = found.get('height')
+    elif handler == b'soun' and metadata['audio_codec'] is None:
+        metadata['audio_codec'] = found.get('codec')
+
+
+# ============================================
+# Matroska / WebM (EBML)
+# ============================================
+_EBML_HEADER = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_CLUSTER = 0x1F43B675
+_DOC_TYPE = 0x4282
+
+_UNKNOWN_SIZE = -1
+
+
+def _read_vint(data: bytes, offset: int, keep_marker: bool) -> Tuple[int, int]:
+    """Đọc số nguyên độ dài thay đổi của EBML, trả về (giá trị, offset mới)"""
+    if offset >= len(data):
+        raise ProbeError("Truncated EBML data")
+    first = data[offset]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or offset + length > len(data):
+        raise ProbeError("Invalid EBML variable-length integer")
+    value = first if keep_marker else first & (mask - 1)
+    for b in data[offset + 1:offset + length]:
+        value = (value << 8) | b
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = _UNKNOWN_SIZE
+    return value, offset + length
+
+
+def _read_element_header(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """Đọc (id, size) của element tại vị trí hiện tại của file"""
+    buf = f.read(12)
+    if len(buf) < 2:
+        return None
+    element_id, offset = _read_vint(buf, 0, keep_marker=True)
+    element_size, offset = _read_vint(buf, offset, keep_marker=False)
+    f.seek(offset - len(buf), os.SEEK_CUR)
+    return element_id, element_size
+
+
+def _iter_elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    offset = start
+    while offset < end:
+        element_id, offset = _read_vint(data, offset, keep_marker=True)
+        element_size, offset = _read_vint(data, offset, keep_marker=False)
+        element_end = end if element_size == _UNKNOWN_SIZE else min(offset + element_size, end)
+        yield element_id, offset, element_end
+        offset = element_end
+
+
+def _read_uint(data: bytes, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], 'big') if end > start else 0
+
+
+def _probe_mkv(f: BinaryIO, size: int) -> Dict[str, Any]:
+    header = _read_element_header(f)
+    if not header or header[0] != _EBML_HEADER:
+        raise ProbeError("Missing EBML header")
+    ebml = f.read(header[1])
+    doc_type = 'matroska'
+    for element_id, start, end in _iter_elements(ebml, 0, len(ebml)):
+        if element_id == _DOC_TYPE:
+            doc_type = ebml[start:end].decode('ascii', 'ignore')
+    metadata = _empty_metadata('webm' if doc_type == 'webm' else 'mkv')
+    
+    header = _read_element_header(f)
+    if not header or header[0] != _SEGMENT:
+        raise ProbeError("Missing Segment element")
+    segment_end = size if header[1] == _UNKNOWN_SIZE else min(f.tell() + header[1], size)
+    
+    timecode_scale = 1_000_000
+    raw_duration = None
+    have_info = have_tracks = False
+    cluster_seen = False
+    
+    while f.tell() < segment_end and not (have_info and have_tracks):
+        element_start = f.tell()
+        header = _read_element_header(f)
+        if not header:
+            break
+        element_id, element_size = header
+        payload_start = f.tell()
+        
+        if element_id in (_INFO, _TRACKS):
+            if element_size == _UNKNOWN_SIZE or element_size > MAX_HEADER_BYTES:
+                raise ProbeError("Invalid Info/Tracks element size")
+            data = f.read(element_size)
+            if element_id == _INFO:
+                have_info = True
+                for child_id, cs, ce in _iter_elements(data, 0, len(data)):
+                    if child_id == _TIMECODE_SCALE:
+                        timecode_scale = _read_uint(data, cs, ce)
+                    elif child_id == _DURATION:
+                        raw_duration = struct.unpack('>f' if ce - cs == 4 else '>d', data[cs:ce])[0]
+            else:
+                have_tracks = True
+                _parse_mkv_tracks(data, metadata)
+            metadata['faststart'] = not cluster_seen
+        elif element_id == _CLUSTER:
+            cluster_seen = True
+            if element_size == _UNKNOWN_SIZE:
+                # Cluster live-stream không có size: không thể nhảy qua
+                break
+        
+        if element_size == _UNKNOWN_SIZE:
+            break
+        next_offset = payload_start + element_size
+        if next_offset <= element_start:
+            break
+        f.seek(next_offset)
+    
+    if not have_tracks:
+        raise ProbeError("Tracks element not found")
+    if raw_duration is not None:
+        metadata['duration'] = raw_duration * timecode_scale / 1e9
+    return metadata
+
+
+def _parse_mkv_tracks(data: bytes, metadata: Dict[str, Any]):
+    for element_id, start, end in _iter_elements(data, 0, len(data)):
+        if element_id != _TRACK_ENTRY:
+            continue
+        track_type = None
+        codec = None
+        width = height = None
+        for child_id, cs, ce in _iter_elements(data, start, end):
+            if child_id == _TRACK_TYPE:
+                track_type = _read_uint(data, cs, ce)
+            elif child_id == _CODEC_ID:
+                codec = data[cs:ce].decode('ascii', 'ignore').rstrip('\0')
+            elif child_id == _VIDEO:
+                for video_id, vs, ve in _iter_elements(data, cs, ce):
+                    if video_id == _PIXEL_WIDTH:
+                        width = _read_uint(data, vs, ve)
+                    elif video_id == _PIXEL_HEIGHT:
+                        height = _read_uint(data, vs, ve)
+        
+        if track_type == 1 and metadata['video_codec'] is None:
+            metadata['video_codec'] = codec
+            metadata['width'] = width
+            metadata['height'] = height
+        elif track_type == 2 and metadata['audio_codec'] is None:
+            metadata['audio_codec'] = codec
+
+
+def describe_metadata(metadata: Optional[Dict[str, Any]]) -> str:
+    """Tóm tắt metadata thành một dòng để đưa vào context của LLM"""
+    if not metadata:
+        return ""
+    parts = []
+    duration = metadata.get('duration')
+    if duration:
+        minutes, seconds = divmod(int(round(duration)), 60)
+        hours, minutes = divmod(minutes, 60)
+        parts.append(f"thời lượng {hours}:{minutes:02d}:{seconds:02d}" if hours else f"thời lượng {minutes}:{seconds:02d}")
+    if metadata.get('width') and metadata.get('height'):
+        parts.append(f"độ phân giải {metadata['width']}x{metadata['height']}")
+    if metadata.get('video_codec'):
+        parts.append(f"codec {metadata['video_codec']}")
+    return f"Thông tin video: {', '.join(parts)}" if parts else ""
+
+
+class VideoMetadataIndex:
+    """Cache metadata đã probe trong SQLite, keyed theo fingerprint nội dung"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS video_metadata (
+            fingerprint TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM video_metadata WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, fingerprint: str, metadata: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO video_metadata (fingerprint, data) VALUES (?, ?)",
+                (fingerprint, json.dumps(metadata))
+            )
+    
+    def get_or_probe(self, fingerprint: str, path: Path) -> Dict[str, Any]:
+        """Lấy metadata từ cache, probe file nếu chưa có"""
+        metadata = self.get(fingerprint)
+        if metadata is None:
+            metadata = probe_video(path)
+            self.put(fingerprint, metadata)
+            logger.debug(f"Probed {Path(path).name}: {metadata}")
+        return metadata
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,155 @@
+"""
+Bounded-concurrency batch upload engine for draining the video backlog
+"""
+import asyncio
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from src.utils.config import Settings
+from src.workflows.upload_workflow import YouTubeUploadWorkflow
+
+
+class BatchUploadEngine:
+    """
+    Upload nhiều video song song từ cùng một hàng đợi pending
+    
+    Mỗi worker chạy trọn workflow (chọn video -> tạo mô tả -> upload) cho
+    một video rồi lấy video tiếp theo. Số video được giới hạn bởi
+    `max_per_run` (mỗi lượt) và `daily_cap` (tính cả các video đã upload
+    trong ngày; ledger được đọc lại trước mỗi video nên cap vẫn đúng khi
+    có worker/process khác upload song song). Băng thông tổng được giới hạn bởi
+    BandwidthLimiter dùng chung của uploader. Khi quota YouTube không còn
+    đủ cho một video, workflow trả về "deferred" và worker dừng lại.
+    """
+    
+    def __init__(
+        self,
+        workflow: YouTubeUploadWorkflow,
+        concurrency: int = 2,
+        max_per_run: Optional[int] = None,
+        daily_cap: Optional[int] = None
+    ):
+        self.workflow = workflow
+        self.file_manager = workflow.file_manager
+        self.concurrency = max(1, concurrency)
+        self.max_per_run = max_per_run
+        self.daily_cap = daily_cap
+    
+    @classmethod
+    def from_settings(cls, workflow: YouTubeUploadWorkflow, settings: Settings) -> "BatchUploadEngine":
+        return cls(
+            workflow,
+            concurrency=settings.BATCH_CONCURRENCY,
+            max_per_run=settings.BATCH_MAX_PER_RUN,
+            daily_cap=settings.BATCH_DAILY_CAP
+        )
+    
+    def remaining_today(self) -> Optional[int]:
+        """Số video còn được upload hôm nay theo daily_cap (None = không giới hạn)"""
+        if not self.daily_cap:
+            return None
+        start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        uploaded_today = self.file_manager.ledger.count_uploaded_since(start_of_day)
+        return max(0, self.daily_cap - uploaded_today)
+    
+    def _run_limit(self, count: Optional[int], pending: int) -> int:
+        """Số video tối đa cho lượt chạy này"""
+        limits = [pending]
+        if count is not None:
+            limits.append(count)
+        if self.max_per_run:
+            limits.append(self.max_per_run)
+        remaining = self.remaining_today()
+        if remaining is not None:
+            limits.append(remaining)
+        return max(0, min(limits))
+    
+    async def run(self, count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Chạy batch upload
+        
+        Args:
+            count: Số video muốn upload (None = drain tới khi hết hàng đợi hoặc chạm cap)
+        
+        Returns:
+            Kết quả từng video: video, status, video_id, video_url, error, elapsed
+        """
+        # Quét folder + hash video chạy ngoài event loop
+        queue = await asyncio.to_thread(self.file_manager.get_pending_queue)
+        limit = self._run_limit(count, queue.count())
+        quota = getattr(self.workflow, 'quota', None)
+        if quota:
+            quota.log_capacity()
+        logger.info(
+            f"📦 Batch upload: {queue.count()} pending, uploading up to {limit} "
+            f"with {self.concurrency} workers"
+        )
+        if limit == 0:
+            if self.remaining_today() == 0:
+                logger.warning(f"⚠️ Daily cap of {self.daily_cap} uploads reached")
+            return []
+        
+        results: List[Dict[str, Any]] = []
+        admitted = 0
+        in_flight = 0
+        claim_lock = asyncio.Lock()
+        
+        async def claim_slot() -> bool:
+            """Giữ chỗ cho một video: đọc lại ledger mỗi lần (process khác có thể đã upload)"""
+            nonlocal admitted, in_flight
+            async with claim_lock:
+                if admitted >= limit or not queue:
+                    return False
+                if self.daily_cap:
+                    remaining = await asyncio.to_thread(self.remaining_today)
+                    if remaining - in_flight <= 0:
+                        logger.warning(f"⚠️ Daily cap of {self.daily_cap} uploads reached")
+                        return False
+                admitted += 1
+                in_flight += 1
+                return True
+        
+        async def worker(worker_id: int):
+            nonlocal in_flight
+            while await claim_slot():
+                started = time.monotonic()
+                try:
+                    state = await self.workflow.process_next()
+                finally:
+                    in_flight -= 1
+                result = self._summarize(state, time.monotonic() - started)
+                results.append(result)
+                logger.info(f"[worker {worker_id}] {result['video'] or '-'}: {result['status']}")
+                if state["status"] in ("no_videos", "deferred"):
+                    return
+        
+        await asyncio.gather(*(worker(i) for i in range(min(self.concurrency, limit))))
+        self._log_summary(results)
+        return results
+    
+    @staticmethod
+    def _summarize(state: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        upload_result = state.get("upload_result") or {}
+        return {
+            "video": Path(state["video_path"]).name if state.get("video_path") else "",
+            "status": state.get("status", ""),
+            "video_id": upload_result.get("video_id"),
+            "video_url": upload_result.get("video_url"),
+            "error": state.get("error", ""),
+            "elapsed": round(elapsed, 1),
+        }
+    
+    @staticmethod
+    def _log_summary(results: List[Dict[str, Any]]):
+        uploaded = [r for r in results if r["status"] == "uploaded"]
+        logger.info("=" * 60)
+        logger.info(f"📊 Batch finished: {len(uploaded)}/{len(results)} uploaded")
+        for r in results:
+            if r["status"] == "uploaded":
+                logger.info(f"  ✅ {r['video']} -> {r['video_url']} ({r['elapsed']}s)")
+            elif r["video"]:
+                logger.info(f"  ❌ {r['video']}: {r['error']} ({r['elapsed']}s)")
+        logger.info("=" * 60)
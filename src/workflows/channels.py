@@ -0,0 +1,277 @@
+"""
+Channel registry and lazily built per-channel uploader pool (nhiều kênh trong một process)
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import threading
+from loguru import logger
+
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.http_pool import HttpPool
+from src.tools.quota import QuotaLedger
+from src.tools.rate_limiter import get_shared_limiter
+from src.tools.telemetry import get_shared_telemetry
+from src.tools.youtube_auth import YouTubeAuth
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.config import Settings
+from src.utils.retry import Retrier
+
+
+DEFAULT_CHANNEL = "default"
+
+# Tạo auth cho kênh (None = kênh chưa upload được)
+AuthFactory = Callable[["ChannelConfig"], Optional[Any]]
+
+
+@dataclass
+class ChannelConfig:
+    """Cấu hình một kênh: credentials, folder video, lịch, prompt và quota riêng"""
+    name: str
+    video_folder: Path
+    token_file: Path
+    session_dir: Path
+    quota_db: Path
+    channel_id: str = ""
+    client_id: str = ""
+    client_secret: str = ""
+    client_secrets_file: Optional[Path] = None
+    upload_time: str = "17:30"
+    prompt_type: str = "default"
+    category: str = "22"
+    privacy_status: str = "public"
+    daily_quota: int = 10000
+    concurrency: int = 1
+    project: str = ""
+    
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.client_id) or bool(self.client_secrets_file and self.client_secrets_file.exists())
+    
+    @staticmethod
+    def project_quota_db(settings: Settings, project: str) -> Path:
+        """
+        File quota của một Cloud project
+        
+        Quota YouTube Data API tính theo project (OAuth client), không theo
+        kênh: các kênh dùng chung client thì dùng chung một sổ quota.
+        """
+        if not project or project == settings.YOUTUBE_CLIENT_ID:
+            return settings.YOUTUBE_QUOTA_DB
+        digest = hashlib.sha1(project.encode('utf-8')).hexdigest()[:12]
+        return settings.YOUTUBE_QUOTA_DB.with_name(f"quota_{digest}.db")
+    
+    @classmethod
+    def default(cls, settings: Settings) -> "ChannelConfig":
+        """Kênh duy nhất theo cấu hình cũ (youtube.*, video.folder_path, token.json)"""
+        return cls(
+            name=DEFAULT_CHANNEL,
+            video_folder=settings.VIDEO_FOLDER_PATH,
+            token_file=Path('token.json'),
+            session_dir=settings.UPLOAD_SESSION_DIR,
+            quota_db=settings.YOUTUBE_QUOTA_DB,
+            channel_id=settings.YOUTUBE_CHANNEL_ID,
+            client_id=settings.YOUTUBE_CLIENT_ID,
+            client_secret=settings.YOUTUBE_CLIENT_SECRET,
+            upload_time=settings.UPLOAD_SCHEDULE_TIME,
+            prompt_type=settings.DESCRIPTION_PROMPT_TYPE,
+            category=settings.YOUTUBE_CATEGORY,
+            privacy_status=settings.YOUTUBE_PRIVACY_STATUS,
+            daily_quota=settings.YOUTUBE_DAILY_QUOTA,
+            concurrency=settings.BATCH_CONCURRENCY
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], settings: Settings) -> "ChannelConfig":
+        """
+        Kênh trong `channels:` của settings.yaml
+        
+        Mỗi kênh có token và thư mục data riêng (data/channels/<name>/);
+        field không khai báo lấy theo cấu hình chung.
+        """
+        name = data['name']
+        data_dir = Path(data.get('data_dir', f'./data/channels/{name}'))
+        client_secrets_file = data.get('client_secrets_file')
+        client_id = data.get('client_id', settings.YOUTUBE_CLIENT_ID)
+        # Project: khai báo `project`, hoặc suy ra từ OAuth client của kênh
+        project = data.get('project') or (
+            f"secrets:{Path(client_secrets_file).resolve()}" if client_secrets_file else client_id
+        )
+        return cls(
+            name=name,
+            video_folder=Path(data.get('folder', settings.VIDEO_FOLDER_PATH)),
+            token_file=Path(data.get('token_file', data_dir / 'token.json')),
+            session_dir=data_dir / 'upload_sessions',
+            quota_db=cls.project_quota_db(settings, project),
+            channel_id=data.get('channel_id', ''),
+            client_id=client_id,
+            client_secret=data.get('client_secret', settings.YOUTUBE_CLIENT_SECRET),
+            client_secrets_file=Path(client_secrets_file) if client_secrets_file else None,
+            upload_time=data.get('upload_time', settings.UPLOAD_SCHEDULE_TIME),
+            prompt_type=data.get('prompt_type', settings.DESCRIPTION_PROMPT_TYPE),
+            category=str(data.get('category', settings.YOUTUBE_CATEGORY)),
+            privacy_status=data.get('privacy_status', settings.YOUTUBE_PRIVACY_STATUS),
+            daily_quota=data.get('daily_quota', settings.YOUTUBE_DAILY_QUOTA),
+            concurrency=data.get('concurrency', settings.BATCH_CONCURRENCY),
+            project=project
+        )
+
+
+class ChannelRegistry:
+    """Danh sách kênh (không khai báo `channels:` thì chỉ có kênh `default`)"""
+    
+    def __init__(self, channels: List[ChannelConfig]):
+        if not channels:
+            raise ValueError("At least one channel is required")
+        names = [channel.name for channel in channels]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate channel names: {names}")
+        # Mỗi kênh một folder (và một ledger .state/.uploaded.db), nếu không các kênh tranh nhau một hàng đợi
+        folders: Dict[Path, str] = {}
+        for channel in channels:
+            folder = channel.video_folder.resolve()
+            if folder in folders:
+                raise ValueError(
+                    f"Channels '{folders[folder]}' and '{channel.name}' use the same video folder {channel.video_folder}; "
+                    f"set a distinct `folder` for each channel"
+                )
+            folders[folder] = channel.name
+        self._channels = {channel.name: channel for channel in channels}
+    
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ChannelRegistry":
+        entries = settings.CHANNELS
+        if not entries:
+            return cls([ChannelConfig.default(settings)])
+        return cls([ChannelConfig.from_dict(entry, settings) for entry in entries])
+    
+    def get(self, name: str) -> ChannelConfig:
+        if name not in self._channels:
+            raise KeyError(f"Unknown channel '{name}' (available: {', '.join(self._channels)})")
+        return self._channels[name]
+    
+    def names(self) -> List[str]:
+        return list(self._channels)
+    
+    def __iter__(self) -> Iterator[ChannelConfig]:
+        return iter(self._channels.values())
+    
+    def __len__(self) -> int:
+        return len(self._channels)
+
+
+class UploaderPool:
+    """
+    Uploader của từng kênh, chỉ tạo khi kênh đó cần upload lần đầu
+    
+    Mỗi kênh có credentials (YouTubeAuth/token riêng), session store,
+    QuotaLedger và HTTP pool riêng, cộng với semaphore giới hạn số upload
+    song song của kênh, nên một kênh hết quota hoặc đang upload nhiều
+    không ảnh hưởng kênh khác. Retrier và giới hạn băng thông tổng được
+    dùng chung cho cả process.
+    """
+    
+    def __init__(
+        self,
+        settings: Settings,
+        registry: ChannelRegistry,
+        retrier: Optional[Retrier] = None,
+        auth_factory: Optional[AuthFactory] = None
+    ):
+        self.settings = settings
+        self.registry = registry
+        self.retrier = retrier or Retrier.from_settings(settings)
+        self.auth_factory = auth_factory or self.youtube_auth
+        self.rate_limiter = get_shared_limiter(
+            settings.UPLOAD_MAX_BANDWIDTH_MBPS, settings.UPLOAD_BANDWIDTH_PROFILES
+        )
+        # Metrics upload chung cho mọi kênh (một file / một endpoint /metrics)
+        self.telemetry = get_shared_telemetry(settings)
+        self._lock = threading.Lock()
+        self._quotas: Dict[Path, QuotaLedger] = {}
+        self._uploaders: Dict[str, YouTubeUploader] = {}
+        self._async_uploaders: Dict[str, AsyncYouTubeUploader] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    def quota(self, name: str) -> QuotaLedger:
+        """Sổ quota của Cloud project mà kênh dùng (chung cho các kênh cùng project)"""
+        channel = self.registry.get(name)
+        with self._lock:
+            if channel.quota_db not in self._quotas:
+                limits = {c.daily_quota for c in self.registry if c.quota_db == channel.quota_db}
+                if len(limits) > 1:
+                    logger.warning(
+                        f"⚠️ Channels of project '{channel.project}' declare different daily_quota {sorted(limits)}, "
+                        f"using {min(limits)}"
+                    )
+                self._quotas[channel.quota_db] = QuotaLedger(channel.quota_db, daily_limit=min(limits))
+            return self._quotas[channel.quota_db]
+    
+    @staticmethod
+    def youtube_auth(channel: ChannelConfig) -> Optional[YouTubeAuth]:
+        """Auth factory mặc định: OAuth của kênh (None nếu kênh chưa cấu hình OAuth client)"""
+        if not channel.has_credentials:
+            return None
+        return YouTubeAuth(
+            channel.client_id,
+            channel.client_secret,
+            YouTubeUploader.SCOPES,
+            token_file=channel.token_file,
+            legacy_token_file=channel.token_file.with_suffix('.pickle'),
+            client_secrets_file=channel.client_secrets_file
+        )
+    
+    def uploader(self, name: str) -> Optional[YouTubeUploader]:
+        """YouTubeUploader của kênh (None nếu `auth_factory` không tạo được auth cho kênh)"""
+        channel = self.registry.get(name)
+        base_url = self.settings.YOUTUBE_API_BASE_URL or None
+        quota = self.quota(name)
+        with self._lock:
+            if name not in self._uploaders:
+                auth = self.auth_factory(channel)
+                if auth is None:
+                    return None
+                self._uploaders[name] = YouTubeUploader(
+                    client_id=channel.client_id,
+                    client_secret=channel.client_secret,
+                    chunk_size_mb=self.settings.UPLOAD_CHUNK_SIZE_MB,
+                    session_dir=channel.session_dir,
+                    rate_limiter=self.rate_limiter,
+                    retrier=self.retrier,
+                    quota=quota,
+                    auth=auth,
+                    pool=HttpPool.from_settings(self.settings),
+                    base_url=base_url,
+                    telemetry=self.telemetry,
+                    use_mmap=self.settings.UPLOAD_USE_MMAP,
+                    readahead_mb=self.settings.UPLOAD_READAHEAD_MB,
+                    adaptive_chunks=self.settings.UPLOAD_ADAPTIVE_CHUNKS,
+                    max_chunk_size=int(self.settings.UPLOAD_MAX_CHUNK_SIZE_MB * 1024 * 1024),
+                    target_chunk_seconds=self.settings.UPLOAD_TARGET_CHUNK_SECONDS
+                )
+                logger.debug(f"📺 Created uploader for channel '{name}'")
+            return self._uploaders[name]
+    
+    def async_uploader(self, name: str) -> Optional[AsyncYouTubeUploader]:
+        """Uploader async của kênh, dùng chung credentials/session/quota với `uploader(name)`"""
+        uploader = self.uploader(name)
+        if uploader is None:
+            return None
+        with self._lock:
+            if name not in self._async_uploaders:
+                self._async_uploaders[name] = AsyncYouTubeUploader.from_uploader(uploader)
+            return self._async_uploaders[name]
+    
+    def semaphore(self, name: str) -> asyncio.Semaphore:
+        """Giới hạn số video của kênh được xử lý cùng lúc"""
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(max(1, self.registry.get(name).concurrency))
+        return self._semaphores[name]
+    
+    async def aclose(self, name: Optional[str] = None):
+        """Đóng HTTP client của một kênh (hoặc mọi kênh) nếu đã tạo"""
+        for channel_name, async_uploader in list(self._async_uploaders.items()):
+            if name is None or channel_name == name:
+                await async_uploader.aclose()
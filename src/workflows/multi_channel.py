@@ -0,0 +1,92 @@
+"""
+Run the upload schedule of every configured channel in one process and one event loop
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+from loguru import logger
+import schedule
+
+from src.agents.description_store import DescriptionStore
+from src.utils.config import Settings
+from src.utils.thumbnail_generator import ThumbnailGenerator
+from src.workflows.channels import AuthFactory, ChannelRegistry, UploaderPool
+from src.workflows.prefetch import DescriptionPrefetcher
+from src.workflows.upload_workflow import YouTubeUploadWorkflow
+
+
+class MultiChannelScheduler:
+    """
+    Lịch upload cho nhiều kênh trong cùng một process
+    
+    LLM agent, thumbnail generator, retrier và giới hạn băng thông được
+    load một lần và dùng chung; mỗi kênh có workflow, hàng đợi video,
+    uploader (tạo khi cần), quota và giới hạn song song riêng.
+    """
+    
+    def __init__(
+        self,
+        settings: Settings,
+        registry: Optional[ChannelRegistry] = None,
+        auth_factory: Optional[AuthFactory] = None
+    ):
+        self.settings = settings
+        self.registry = registry or ChannelRegistry.from_settings(settings)
+        self.uploaders = UploaderPool(settings, self.registry, auth_factory=auth_factory)
+        description_agent = YouTubeUploadWorkflow.create_description_agent(settings, self.uploaders.retrier)
+        thumbnail_generator = ThumbnailGenerator()
+        description_store = DescriptionStore.from_settings(settings)
+        self.workflows: Dict[str, YouTubeUploadWorkflow] = {
+            channel.name: YouTubeUploadWorkflow(
+                settings,
+                channel=channel,
+                uploaders=self.uploaders,
+                description_agent=description_agent,
+                thumbnail_generator=thumbnail_generator,
+                description_store=description_store
+            )
+            for channel in self.registry
+        }
+        # Chuẩn bị trước mô tả/thumbnail cho vài video tiếp theo của mỗi kênh
+        self.prefetchers: Dict[str, DescriptionPrefetcher] = {
+            name: DescriptionPrefetcher.from_settings(workflow, settings)
+            for name, workflow in self.workflows.items()
+        }
+    
+    def workflow(self, name: str) -> YouTubeUploadWorkflow:
+        self.registry.get(name)
+        return self.workflows[name]
+    
+    async def run(self):
+        """Chạy lịch upload của mọi kênh"""
+        logger.info(f"🤖 YouTube Auto Upload Bot started ({len(self.workflows)} channels)")
+        self.uploaders.telemetry.start_server()
+        for prefetcher in self.prefetchers.values():
+            prefetcher.start()
+        
+        for name, workflow in self.workflows.items():
+            hour, minute = map(int, workflow.channel.upload_time.split(':'))
+            schedule.every().day.at(f"{hour:02d}:{minute:02d}").do(
+                lambda workflow=workflow: asyncio.create_task(workflow.upload_daily_video())
+            ).tag(name)
+            logger.info(f"📅 Channel '{name}': upload daily at {hour:02d}:{minute:02d}")
+        
+        next_run = schedule.next_run()
+        if next_run:
+            logger.info(f"⏰ Next upload scheduled at: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        logger.info("💤 Waiting for scheduled time...")
+        while True:
+            schedule.run_pending()
+            # Kênh bị hoãn vì hết quota được chạy lại ngay sau khi quota của kênh đó reset
+            for workflow in self.workflows.values():
+                if workflow.deferred_until and datetime.now() >= workflow.deferred_until:
+                    workflow.deferred_until = None
+                    asyncio.create_task(workflow.upload_daily_video())
+            await asyncio.sleep(60)  # Check every minute
+    
+    async def aclose(self):
+        for prefetcher in self.prefetchers.values():
+            await prefetcher.stop()
+        await self.uploaders.aclose()
+        self.uploaders.telemetry.close()
@@ -0,0 +1,100 @@
+"""
+Background prefetch: keep the next K pending videos prepared ahead of the upload slot
+"""
+import asyncio
+from typing import Dict, Optional
+from loguru import logger
+
+from src.utils.config import Settings
+from src.workflows.upload_workflow import YouTubeUploadWorkflow
+
+
+class DescriptionPrefetcher:
+    """
+    Chuẩn bị trước `depth` video đầu hàng đợi của một kênh
+    
+    Chạy nền theo chu kỳ `interval` giây: tạo mô tả (title, description,
+    tags) cho video chưa có rồi lưu vào DescriptionStore, vẽ sẵn thumbnail
+    vào cache. Chỉ chạy khi kênh không có lượt upload nào để không tranh
+    CPU/quota LLM với giờ đăng. Thứ tự upload không đổi: tới giờ upload,
+    video đầu hàng đợi đã có mô tả thì upload luôn, chưa có thì tạo inline.
+    """
+    
+    def __init__(
+        self,
+        workflow: YouTubeUploadWorkflow,
+        depth: int = 3,
+        interval: float = 1800,
+        concurrency: int = 2
+    ):
+        self.workflow = workflow
+        self.depth = max(0, depth)
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self._task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def from_settings(cls, workflow: YouTubeUploadWorkflow, settings: Settings) -> "DescriptionPrefetcher":
+        return cls(
+            workflow,
+            depth=settings.PREFETCH_DEPTH,
+            interval=settings.PREFETCH_INTERVAL_MINUTES * 60,
+            concurrency=settings.PREFETCH_CONCURRENCY
+        )
+    
+    async def prefetch_once(self) -> Dict[str, int]:
+        """
+        Một lượt chuẩn bị
+        
+        Returns:
+            Số video generated / failed / skipped (rỗng nếu bỏ qua vì đang upload)
+        """
+        workflow = self.workflow
+        # Đang bypass cache: mô tả tạo trước không được dùng lúc upload
+        if not self.depth or workflow.active_uploads or workflow.descriptions_bypassed:
+            return {}
+        # Quét folder + hash video chạy ngoài event loop
+        videos = await asyncio.to_thread(workflow.file_manager.peek_pending, self.depth)
+        if not videos:
+            return {}
+        counts = await workflow.pregenerate_descriptions(max_concurrency=self.concurrency, videos=videos)
+        
+        if workflow.settings.AUTO_GENERATE_THUMBNAIL:
+            for video_path in videos:
+                stored = workflow._stored_description(video_path)
+                if not stored:
+                    continue
+                try:
+                    await asyncio.to_thread(
+                        workflow.thumbnail_generator.cached_thumbnail, stored["title"], video_path.name
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not prepare thumbnail for {video_path.name}: {e}")
+        
+        ready = sum(1 for video_path in videos if workflow._is_prepared(video_path))
+        logger.info(f"🧺 Channel '{workflow.channel.name}': {ready}/{len(videos)} next videos prepared")
+        return counts
+    
+    async def run(self):
+        """Vòng lặp nền (dừng bằng stop() hoặc cancel task)"""
+        while True:
+            try:
+                await self.prefetch_once()
+            except Exception as e:
+                logger.warning(f"⚠️ Prefetch failed for channel '{self.workflow.channel.name}': {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self) -> Optional[asyncio.Task]:
+        """Chạy run() trong task nền (không làm gì nếu depth = 0)"""
+        if self.depth and self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -2,7 +2,7 @@
 LangGraph workflow for YouTube video upload automation
 """
 import asyncio
-from typing import Dict, Any, TypedDict
+from typing import Dict, Any, List, Optional, Tuple, TypedDict
 from datetime import datetime, time as dt_time
 from pathlib import Path
 from loguru import logger
@@ -10,10 +10,18 @@ import schedule
 
 from langgraph.graph import StateGraph, END
 from src.agents.description_agent import DescriptionAgent
+from src.agents.description_store import DescriptionStore
+from src.agents.llm_cache import LLMCache
+from src.agents.provider_pool import HedgedLLM
 from src.tools.youtube_uploader import YouTubeUploader
-from src.utils.file_manager import VideoFileManager
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.quota import UPLOAD_COST
+from src.utils.file_manager import VideoFileManager, PendingQueue, UploadState
 from src.utils.config import Settings
+from src.utils.retry import Retrier
 from src.utils.thumbnail_generator import ThumbnailGenerator
+from src.utils.video_probe import ProbeError, describe_metadata
+from src.workflows.channels import ChannelConfig, ChannelRegistry, UploaderPool
 
 
 class WorkflowState(TypedDict):
@@ -30,26 +38,116 @@ class WorkflowState(TypedDict):
 class YouTubeUploadWorkflow:
     """Workflow tự động upload video lên YouTube"""
     
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        file_manager: Optional[VideoFileManager] = None,
+        channel: Optional[ChannelConfig] = None,
+        uploaders: Optional[UploaderPool] = None,
+        description_agent: Optional[DescriptionAgent] = None,
+        thumbnail_generator: Optional[ThumbnailGenerator] = None,
+        description_store: Optional[DescriptionStore] = None
+    ):
         self.settings = settings
+        # Kênh của workflow (mặc định: một kênh theo cấu hình youtube.* như trước)
+        self.channel = channel or ChannelConfig.default(settings)
+        # Uploader/quota theo kênh; khi chạy nhiều kênh, pool và LLM agent được dùng chung
+        self.uploaders = uploaders or UploaderPool(settings, ChannelRegistry([self.channel]))
+        # Retry dùng chung (bộ đếm budget theo từng target: youtube.upload, llm.gemini, ...)
+        self.retrier = self.uploaders.retrier
+        # Quota dùng chung với mọi process khác (chạy tay, scheduler) qua file SQLite
+        self.quota = self.uploaders.quota(self.channel.name)
+        self.deferred_until: Optional[datetime] = None
+        # Số lượt đang chạy (prefetch nền chỉ chạy khi không có upload)
+        self.active_uploads = 0
+        # Thumbnail bắt đầu vẽ ngay khi stream LLM có title: video name -> (title, task)
+        self._thumbnail_tasks: Dict[str, Tuple[str, "asyncio.Task[Path]"]] = {}
         
+        self.description_agent = description_agent or self.create_description_agent(settings, self.retrier)
+        self.file_manager = file_manager or VideoFileManager.from_settings(settings, self.channel.video_folder)
+        self.thumbnail_generator = thumbnail_generator or ThumbnailGenerator()
+        # Mô tả đã tạo trước (hoặc ở lượt chạy lỗi trước đó) được dùng lại, không gọi LLM
+        self.descriptions = description_store or DescriptionStore.from_settings(settings)
+        # False (vd. upload_now.py --no-llm-cache): luôn tạo mô tả mới, không dùng mô tả đã lưu
+        self.reuse_descriptions = True
+        self.workflow = self._build_workflow()
+    
+    @staticmethod
+    def create_description_agent(settings: Settings, retrier: Optional[Retrier] = None) -> DescriptionAgent:
+        """DescriptionAgent theo cấu hình llm.* (một instance dùng chung cho mọi kênh)"""
         # Select API key based on provider
         api_key = (settings.GOOGLE_API_KEY if settings.LLM_PROVIDER == "gemini" 
                    else settings.OPENAI_API_KEY)
         
-        self.description_agent = DescriptionAgent(
+        return DescriptionAgent(
             provider=settings.LLM_PROVIDER,
             api_key=api_key,
             model=settings.LLM_MODEL,
-            temperature=settings.LLM_TEMPERATURE
+            temperature=settings.LLM_TEMPERATURE,
+            retrier=retrier,
+            cache=LLMCache.from_settings(settings) if settings.LLM_CACHE_ENABLED else None,
+            stream=settings.LLM_STREAM_ENABLED,
+            title_within_tokens=settings.LLM_STREAM_TITLE_WITHIN_TOKENS,
+            stream_max_attempts=settings.LLM_STREAM_MAX_ATTEMPTS,
+            fallbacks=settings.LLM_HEDGE_PROVIDERS if settings.LLM_HEDGE_ENABLED else None,
+            hedge_options={
+                "quantile": settings.LLM_HEDGE_QUANTILE,
+                "initial_delay": settings.LLM_HEDGE_INITIAL_DELAY_SECONDS,
+                "min_delay": settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+                "max_delay": settings.LLM_HEDGE_MAX_DELAY_SECONDS,
+                "min_samples": settings.LLM_HEDGE_MIN_SAMPLES
+            }
+        )
+    
+    @property
+    def youtube_uploader(self) -> Optional[YouTubeUploader]:
+        """Uploader của kênh (tạo khi cần lần đầu, None nếu chưa cấu hình YouTube)"""
+        return self.uploaders.uploader(self.channel.name)
+    
+    @property
+    def async_uploader(self) -> Optional[AsyncYouTubeUploader]:
+        """Upload thật sự chạy trên event loop (httpx), dùng chung credentials/session với bản đồng bộ"""
+        return self.uploaders.async_uploader(self.channel.name)
+    
+    def _metadata_context(self, video_path: Path) -> str:
+        """Metadata của video (đã cache) làm context cho LLM"""
+        try:
+            return describe_metadata(self.file_manager.get_metadata(video_path))
+        except ProbeError as e:
+            logger.debug(f"No metadata for {video_path.name}: {e}")
+            return ""
+    
+    @property
+    def descriptions_bypassed(self) -> bool:
+        """Không dùng mô tả đã lưu (tắt reuse_descriptions hoặc đang bypass cache LLM)"""
+        cache = self.description_agent.cache
+        return not self.reuse_descriptions or bool(cache and cache.bypass)
+    
+    def _prompt_version(self) -> str:
+        return self.description_agent.prompt_version(self.channel.prompt_type)
+    
+    def _stored_description(self, video_path: Path) -> Optional[Dict[str, Any]]:
+        """Mô tả đã lưu còn dùng được (None khi bypass, đã hết hạn hoặc prompt đã đổi)"""
+        if self.descriptions_bypassed:
+            return None
+        return self.descriptions.get(video_path, self.channel.prompt_type, self._prompt_version())
+    
+    def _is_prepared(self, video_path: Path) -> bool:
+        """Video đã có mô tả lưu sẵn cho prompt type của kênh"""
+        return self._stored_description(video_path) is not None
+    
+    def _start_thumbnail(self, title: str, video_name: str) -> Optional["asyncio.Task[Path]"]:
+        """Bắt đầu vẽ thumbnail trong worker thread (None nếu tắt auto thumbnail)"""
+        if not self.settings.AUTO_GENERATE_THUMBNAIL:
+            return None
+        # Đã bắt đầu vẽ từ lúc stream có title
+        started_title, task = self._thumbnail_tasks.pop(video_name, (None, None))
+        if task and started_title == title:
+            return task
+        logger.info("📷 Generating thumbnail in background...")
+        return asyncio.create_task(
+            asyncio.to_thread(self.thumbnail_generator.cached_thumbnail, title, video_name)
         )
-        self.youtube_uploader = YouTubeUploader(
-            client_id=settings.YOUTUBE_CLIENT_ID,
-            client_secret=settings.YOUTUBE_CLIENT_SECRET
-        ) if settings.YOUTUBE_CLIENT_ID else None
-        self.file_manager = VideoFileManager(settings.VIDEO_FOLDER_PATH)
-        self.thumbnail_generator = ThumbnailGenerator()
-        self.workflow = self._build_workflow()
     
     def _build_workflow(self) -> StateGraph:
         """Xây dựng LangGraph workflow"""
@@ -59,7 +157,20 @@ class YouTubeUploadWorkflow:
             """Node: Chọn video tiếp theo"""
             logger.info("📹 Selecting next video to upload...")
             
-            video_path = self.file_manager.get_next_video()
+            # Dùng chung hàng đợi đã tạo trong lượt chạy này, không quét lại folder
+            queue = self.file_manager.pending_queue or await asyncio.to_thread(self.file_manager.get_pending_queue)
+            # Giữ đúng thứ tự hàng đợi (name/mtime/size/priority); prefetch chỉ chuẩn bị trước đầu hàng đợi
+            video_path = queue.pop()
+            
+            # Kiểm tra header/size trước khi tốn thời gian gọi LLM và upload
+            while video_path:
+                problem = self.file_manager.validate_video(video_path)
+                if not problem:
+                    break
+                logger.warning(f"⚠️ Skipping invalid video {video_path.name}: {problem}")
+                self.file_manager.mark_state(video_path, UploadState.FAILED, error=problem)
+                video_path = queue.pop()
+            
             if not video_path:
                 logger.warning("⚠️ No more videos to upload")
                 state["status"] = "no_videos"
@@ -69,6 +180,15 @@ class YouTubeUploadWorkflow:
             state["video_path"] = str(video_path)
             state["status"] = "video_selected"
             logger.info(f"Selected video: {video_path.name}")
+            
+            # Đã có mô tả (prefetch / batch) thì upload luôn, không chờ LLM
+            stored = self._stored_description(video_path)
+            if stored:
+                logger.info(f"📦 Using prepared description for {video_path.name}")
+                state["title"] = stored["title"]
+                state["description"] = stored["description"]
+                state["tags"] = stored["tags"]
+                state["status"] = "description_generated"
             return state
         
         async def generate_description_node(state: WorkflowState) -> WorkflowState:
@@ -77,20 +197,36 @@ class YouTubeUploadWorkflow:
             
             try:
                 video_path = Path(state["video_path"])
-                prompt_type = self.settings.DESCRIPTION_PROMPT_TYPE
+                prompt_type = self.channel.prompt_type
                 logger.info(f"📝 Using prompt type: {prompt_type}")
                 
-                result = await self.description_agent.generate_description(
-                    video_path=video_path,
-                    additional_context="",
-                    prompt_type=prompt_type
-                )
+                result = self._stored_description(video_path)
+                if result:
+                    logger.info(f"📦 Using stored description for {video_path.name}")
+                else:
+                    if self.descriptions_bypassed:
+                        # Mô tả cũ không được dùng lại nữa, kể cả khi lượt tạo mới lỗi
+                        self.descriptions.delete(video_path)
+                    version = self._prompt_version()
+                    def start_thumbnail(title: str):
+                        task = self._start_thumbnail(title, video_path.name)
+                        if task:
+                            self._thumbnail_tasks[video_path.name] = (title, task)
+                    
+                    result = await self.description_agent.generate_description(
+                        video_path=video_path,
+                        additional_context=await asyncio.to_thread(self._metadata_context, video_path),
+                        prompt_type=prompt_type,
+                        on_title=start_thumbnail
+                    )
+                    self.descriptions.save(video_path, prompt_type, result, version)
                 
                 state["title"] = result["title"]
                 state["description"] = result["description"]
                 state["tags"] = result["tags"]
                 state["status"] = "description_generated"
-                
+                self.file_manager.mark_state(video_path, UploadState.DESCRIBED)
+            
             except Exception as e:
                 logger.error(f"Error generating description: {e}")
                 state["error"] = str(e)
@@ -103,44 +239,44 @@ class YouTubeUploadWorkflow:
             logger.info("🚀 Uploading video to YouTube...")
             
             try:
-                if not self.youtube_uploader:
-                    logger.warning("⚠️ YouTube uploader not configured. Skipping upload.")
+                if not self.async_uploader:
+                    logger.error(
+                        f"❌ Channel '{self.channel.name}' has no YouTube OAuth client configured "
+                        f"(client_id/client_secret or client_secrets_file). Skipping upload."
+                    )
                     state["error"] = "YouTube credentials not configured"
                     state["status"] = "error"
                     return state
                 
                 video_path = Path(state["video_path"])
-                result = self.youtube_uploader.upload_video(
+                self.file_manager.mark_state(video_path, UploadState.UPLOADING)
+                # Title đã có sau bước generate_description: vẽ thumbnail song song với upload
+                thumbnail_task = self._start_thumbnail(state["title"], video_path.name)
+                result = await self.async_uploader.upload_video(
                     video_path=video_path,
                     title=state["title"],
                     description=state["description"],
                     tags=state["tags"],
-                    category_id=self.settings.YOUTUBE_CATEGORY,
-                    privacy_status=self.settings.YOUTUBE_PRIVACY_STATUS
+                    category_id=self.channel.category,
+                    privacy_status=self.channel.privacy_status
                 )
                 
                 if result:
                     state["upload_result"] = result
                     video_id = result.get('video_id')
                     
-                    # Generate and upload thumbnail
-                    if video_id and self.settings.AUTO_GENERATE_THUMBNAIL:
+                    # Upload thumbnail ngay sau khi videos.insert trả về
+                    if video_id and thumbnail_task:
                         try:
-                            logger.info("📷 Generating thumbnail...")
-                            thumbnail_path = self.thumbnail_generator.create_thumbnail(
-                                title=state["title"],
-                                video_name=video_path.name
-                            )
-                            
-                            # Upload thumbnail
-                            thumbnail_uploaded = self.youtube_uploader.upload_thumbnail(
+                            thumbnail_path = await thumbnail_task
+                            thumbnail_uploaded = await self.async_uploader.upload_thumbnail(
                                 video_id=video_id,
                                 thumbnail_path=thumbnail_path
                             )
                             
                             if thumbnail_uploaded:
                                 logger.success("✅ Thumbnail uploaded!")
-                            
+                        
                         except Exception as e:
                             logger.warning(f"⚠️ Could not upload thumbnail: {e}")
                             # Don't fail the whole upload if thumbnail fails
@@ -148,15 +284,21 @@ class YouTubeUploadWorkflow:
                     state["status"] = "uploaded"
                     
                     # Mark video as uploaded
-                    self.file_manager.mark_as_uploaded(video_path)
+                    self.file_manager.mark_as_uploaded(video_path, video_id=video_id)
                 else:
                     state["error"] = "Upload failed"
                     state["status"] = "error"
-                    
+                    self.file_manager.mark_state(video_path, UploadState.FAILED, error=state["error"])
+                    # Thumbnail vẫn được vẽ xong và nằm trong cache cho lần thử sau
+                    if thumbnail_task:
+                        await asyncio.gather(thumbnail_task, return_exceptions=True)
+            
             except Exception as e:
                 logger.error(f"Error uploading video: {e}")
                 state["error"] = str(e)
                 state["status"] = "error"
+                if state.get("video_path"):
+                    self.file_manager.mark_state(Path(state["video_path"]), UploadState.FAILED, error=str(e))
             
             return state
         
@@ -192,6 +334,7 @@ class YouTubeUploadWorkflow:
             should_continue,
             {
                 "generate_description": "generate_description",
+                "upload_video": "upload_video",
                 "end": END
             }
         )
@@ -213,22 +356,69 @@ class YouTubeUploadWorkflow:
         
         return workflow.compile()
     
-    async def upload_daily_video(self):
-        """Upload một video (gọi hàng ngày)"""
-        logger.info("=" * 60)
-        logger.info(f"🎬 Starting daily video upload at {datetime.now()}")
-        logger.info("=" * 60)
+    async def pregenerate_descriptions(
+        self,
+        limit: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        force: bool = False,
+        videos: Optional[List[Path]] = None
+    ) -> Dict[str, int]:
+        """
+        Tạo trước mô tả cho các video đang chờ upload
         
-        # Check pending videos
-        pending_count = self.file_manager.get_pending_videos_count()
-        logger.info(f"📊 Pending videos: {pending_count}")
+        Chạy batch LLM song song (giới hạn `max_concurrency`), lưu từng kết
+        quả ngay khi xong; video lỗi được bỏ qua và tạo lại ở lượt sau hoặc
+        lúc upload.
         
-        if pending_count == 0:
-            logger.warning("⚠️ No videos left to upload!")
-            return
+        Args:
+            limit: Số video tối đa (None = cả hàng đợi)
+            max_concurrency: Số request LLM cùng lúc (mặc định theo description.batch_concurrency)
+            force: Tạo lại cả video đã có mô tả
+            videos: Danh sách video (mặc định: hàng đợi pending hiện tại)
         
-        # Run workflow
-        initial_state = WorkflowState(
+        Returns:
+            Số video generated / failed / skipped
+        """
+        prompt_type = self.channel.prompt_type
+        if videos is None:
+            videos = await asyncio.to_thread(self.file_manager.peek_pending)
+        todo = [v for v in videos if force or not self._is_prepared(v)]
+        if limit is not None:
+            todo = todo[:limit]
+        counts = {"generated": 0, "failed": 0, "skipped": len(videos) - len(todo)}
+        if not todo:
+            logger.info("✅ All pending videos already have descriptions")
+            return counts
+        
+        # Probe metadata (kèm fingerprint video) chạy ngoài event loop
+        contexts = await asyncio.to_thread(lambda: {v: self._metadata_context(v) for v in todo})
+        version = self._prompt_version()
+        results = self.description_agent.generate_descriptions(
+            todo,
+            prompt_type=prompt_type,
+            contexts=contexts,
+            max_concurrency=max_concurrency or self.settings.DESCRIPTION_BATCH_CONCURRENCY,
+            use_cache=not force
+        )
+        async for video_path, result in results:
+            if isinstance(result, Exception):
+                counts["failed"] += 1
+                continue
+            self.descriptions.save(video_path, prompt_type, result, version)
+            self.file_manager.mark_state(video_path, UploadState.DESCRIBED)
+            counts["generated"] += 1
+            logger.info(f"📝 [{counts['generated'] + counts['failed']}/{len(todo)}] {video_path.name}: {result['title'][:60]}")
+        
+        logger.success(
+            f"✅ Descriptions: {counts['generated']} generated, {counts['failed']} failed, "
+            f"{counts['skipped']} already stored"
+        )
+        return counts
+    
+    @staticmethod
+    def initial_state() -> WorkflowState:
+        """State rỗng cho một lượt chạy workflow"""
+        return WorkflowState(
             video_path="",
             title="",
             description="",
@@ -237,23 +427,115 @@ class YouTubeUploadWorkflow:
             error="",
             status="start"
         )
+    
+    async def process_next(self) -> Dict[str, Any]:
+        """
+        Chạy workflow cho video tiếp theo trong hàng đợi pending
+        
+        An toàn khi gọi song song: mỗi lần gọi pop một video khác nhau từ
+        hàng đợi dùng chung. Nếu quota YouTube hôm nay không đủ cho một
+        lượt upload thì không chạy mà trả về state "deferred".
+        """
+        if not self.quota.reserve(UPLOAD_COST):
+            capacity = self.quota.capacity()
+            self.deferred_until = capacity['resets_at']
+            state = self.initial_state()
+            state["status"] = "deferred"
+            state["error"] = (
+                f"YouTube quota exhausted ({capacity['remaining']} units left), "
+                f"deferred until {self.deferred_until.strftime('%Y-%m-%d %H:%M')}"
+            )
+            logger.warning(f"⏸️ {state['error']}")
+            return state
         
-        result = await self.workflow.ainvoke(initial_state)
+        try:
+            # Giới hạn số video của kênh xử lý cùng lúc (độc lập với các kênh khác)
+            async with self.uploaders.semaphore(self.channel.name):
+                self.active_uploads += 1
+                try:
+                    return await self.workflow.ainvoke(self.initial_state())
+                finally:
+                    self.active_uploads -= 1
+        finally:
+            self.quota.release(UPLOAD_COST)
+    
+    async def aclose(self):
+        """Đóng HTTP pool của uploader (log số kết nối được dùng lại) và log hit rate của LLM cache"""
+        await self.uploaders.aclose(self.channel.name)
+        cache = getattr(self.description_agent, 'cache', None)
+        if cache is not None:
+            stats = cache.stats()
+            if stats['hits'] + stats['misses']:
+                logger.info(
+                    f"🗃️ LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['hit_ratio']:.0%}), {stats['entries']} entries"
+                )
+        stream_stats = getattr(self.description_agent, 'stream_stats', None)
+        if stream_stats and stream_stats['aborted']:
+            logger.info(
+                f"✂️ LLM streams: {stream_stats['aborted']}/{stream_stats['streams']} aborted off-format "
+                f"(~{stream_stats['wasted_tokens']} tokens discarded)"
+            )
+        llm = getattr(self.description_agent, 'llm', None)
+        if isinstance(llm, HedgedLLM) and llm.calls:
+            stats = llm.stats()
+            latencies = ", ".join(
+                f"{name} p95={provider['p95'] or 0:.1f}s ({provider['wins']}/{provider['calls']} won)"
+                for name, provider in stats['providers'].items()
+            )
+            logger.info(
+                f"🛡️ LLM hedging: {stats['hedges']} hedges, {stats['hedge_wins']} won by hedge, "
+                f"{stats['failovers']} failovers; {latencies}"
+            )
+    
+    async def upload_daily_video(self, pending_queue: Optional[PendingQueue] = None) -> Optional[Dict[str, Any]]:
+        """
+        Upload một video (gọi hàng ngày)
+        
+        Args:
+            pending_queue: Hàng đợi đã tạo sẵn (nếu có), nếu không sẽ quét folder một lần
+        
+        Returns:
+            State cuối của workflow, None nếu không còn video
+        """
+        logger.info("=" * 60)
+        logger.info(f"🎬 Starting daily video upload for channel '{self.channel.name}' at {datetime.now()}")
+        logger.info("=" * 60)
+        
+        # Check pending videos (một lần quét, select_video dùng lại hàng đợi này)
+        if pending_queue is not None:
+            self.file_manager.pending_queue = pending_queue
+        else:
+            # Quét folder + hash (full hash có thể mất vài phút) chạy ngoài event loop
+            pending_queue = await asyncio.to_thread(self.file_manager.get_pending_queue)
+        logger.info(f"📊 Pending videos: {pending_queue.count()}")
+        
+        if not pending_queue:
+            logger.warning("⚠️ No videos left to upload!")
+            return None
+        self.quota.log_capacity()
+        
+        # Run workflow
+        result = await self.process_next()
         
         # Log result
-        if result["status"] == "uploaded":
+        if result["status"] == "deferred":
+            logger.warning("⏸️ Upload deferred until the YouTube quota resets")
+        elif result["status"] == "uploaded":
             logger.success("✅ Video uploaded successfully!")
             logger.info(f"Video URL: {result['upload_result'].get('video_url')}")
         else:
             logger.error(f"❌ Upload failed: {result.get('error', 'Unknown error')}")
+        
+        return result
     
     async def run(self):
         """Chạy workflow với schedule"""
         logger.info("🤖 YouTube Auto Upload Bot started")
-        logger.info(f"📅 Upload schedule: {self.settings.UPLOAD_SCHEDULE_TIME} daily")
+        logger.info(f"📅 Upload schedule: {self.channel.upload_time} daily")
         
         # Parse schedule time
-        hour, minute = map(int, self.settings.UPLOAD_SCHEDULE_TIME.split(':'))
+        hour, minute = map(int, self.channel.upload_time.split(':'))
         
         # Schedule daily upload
         schedule.every().day.at(f"{hour:02d}:{minute:02d}").do(
@@ -271,4 +553,8 @@ class YouTubeUploadWorkflow:
         logger.info("💤 Waiting for scheduled time...")
         while True:
             schedule.run_pending()
+            # Lượt bị hoãn vì hết quota được chạy lại ngay sau khi quota reset
+            if self.deferred_until and datetime.now() >= self.deferred_until:
+                self.deferred_until = None
+                asyncio.create_task(self.upload_daily_video())
             await asyncio.sleep(60)  # Check every minute
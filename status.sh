@@ -31,16 +31,21 @@ if tmux has-session -t $SESSION_NAME 2>/dev/null; then
     # Show pending videos
     echo "📊 Videos status:"
     python3 -c "
-from src.utils.file_manager import VideoFileManager
+from src.utils.file_manager import VideoFileManager, UploadState
 from src.utils.config import Settings
 
 settings = Settings()
-fm = VideoFileManager(settings.VIDEO_FOLDER_PATH)
-pending = fm.get_pending_videos_count()
-uploaded = len(fm.get_uploaded_videos())
+fm = VideoFileManager.from_settings(settings)
+queue = fm.get_pending_queue()
+next_video = queue.peek()
 
-print(f'  Pending: {pending}')
-print(f'  Uploaded: {uploaded}')
+print(f'  Pending: {queue.count()}')
+print(f'  Uploaded: {fm.ledger.count(UploadState.UPLOADED)}')
+print(f'  Next: {next_video.name if next_video else \"N/A\"}')
+
+from src.tools.quota import QuotaLedger
+capacity = QuotaLedger.from_settings(settings).capacity()
+print(f'  Quota: {capacity[\"used\"]}/{capacity[\"limit\"]} units, {capacity[\"uploads_remaining\"]} uploads left today')
 "
     
 else
@@ -44,7 +44,7 @@ async def test_description_generation():
         )
         
         # Check for videos
-        file_manager = VideoFileManager(settings.VIDEO_FOLDER_PATH)
+        file_manager = VideoFileManager.from_settings(settings)
         video = file_manager.get_next_video()
         
         if not video:
@@ -12,7 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from src.workflows.upload_workflow import YouTubeUploadWorkflow
 from src.utils.config import Settings
-from src.utils.file_manager import VideoFileManager
+from src.utils.file_manager import VideoFileManager, UploadState
 from loguru import logger
 
 
@@ -21,7 +21,7 @@ class ScheduleManager:
     
     def __init__(self):
         self.settings = Settings()
-        self.file_manager = VideoFileManager(self.settings.VIDEO_FOLDER_PATH)
+        self.file_manager = VideoFileManager.from_settings(self.settings)
         
     async def run_upload_job(self):
         """Job upload 1 video"""
@@ -29,29 +29,29 @@ class ScheduleManager:
             logger.info("🚀 Starting scheduled upload job...")
             logger.info(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             
-            # Check for pending videos
-            pending_count = self.file_manager.get_pending_videos_count()
-            logger.info(f"📊 Pending videos: {pending_count}")
+            # Check for pending videos (một lần quét, workflow dùng lại hàng đợi này)
+            queue = self.file_manager.get_pending_queue()
+            logger.info(f"📊 Pending videos: {queue.count()}")
             
-            if pending_count == 0:
+            if not queue:
                 logger.warning("⚠️ Không còn video để upload!")
                 logger.info("💡 Hãy thêm video mới vào folder: data/videos/")
                 return
             
             # Initialize workflow
-            workflow = YouTubeUploadWorkflow(self.settings)
+            workflow = YouTubeUploadWorkflow(self.settings, file_manager=self.file_manager)
             
             # Run workflow
-            result = await workflow.run()
+            result = await workflow.upload_daily_video(queue)
             
-            if result.get("status") == "uploaded":
+            if result and result.get("status") == "uploaded":
                 logger.success("✅ Upload thành công!")
                 logger.info(f"📹 Video: {result.get('video_path')}")
                 logger.info(f"📌 Title: {result.get('title')}")
-                logger.info(f"🔗 Video ID: {result.get('video_id', 'N/A')}")
-                logger.info(f"📊 Videos còn lại: {pending_count - 1}")
+                logger.info(f"🔗 Video ID: {result['upload_result'].get('video_id', 'N/A')}")
+                logger.info(f"📊 Videos còn lại: {queue.count()}")
             else:
-                logger.error(f"❌ Upload thất bại: {result.get('error', 'Unknown error')}")
+                logger.error(f"❌ Upload thất bại: {(result or {}).get('error', 'Unknown error')}")
                 
         except Exception as e:
             logger.error(f"❌ Lỗi khi chạy upload job: {e}")
@@ -165,7 +165,7 @@ def show_menu():
 async def show_schedule_info():
     """Hiển thị thông tin schedule"""
     settings = Settings()
-    file_manager = VideoFileManager(settings.VIDEO_FOLDER_PATH)
+    file_manager = VideoFileManager.from_settings(settings)
     
     print("\n" + "=" * 60)
     print("📊 Schedule Information")
@@ -174,8 +174,11 @@ async def show_schedule_info():
     print(f"\n⏰ Upload Time: {settings.UPLOAD_SCHEDULE_TIME}")
     print(f"🌍 Timezone: {settings.TIMEZONE}")
     print(f"📹 Video Folder: {settings.VIDEO_FOLDER_PATH}")
-    print(f"📊 Pending Videos: {file_manager.get_pending_videos_count()}")
-    print(f"✅ Uploaded Videos: {len(file_manager.get_uploaded_videos())}")
+    queue = file_manager.get_pending_queue()
+    next_video = queue.peek()
+    print(f"📊 Pending Videos: {queue.count()}")
+    print(f"✅ Uploaded Videos: {file_manager.ledger.count(UploadState.UPLOADED)}")
+    print(f"⏭️  Next Video: {next_video.name if next_video else 'N/A'} (order: {queue.order})")
     
     print(f"\n📝 Upload Config:")
     print(f"   - LLM: {settings.LLM_PROVIDER} ({settings.LLM_MODEL})")
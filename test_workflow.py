@@ -24,7 +24,7 @@ async def test_upload_workflow():
         
         # Step 1: Select video
         logger.info("\n📹 STEP 1: Selecting video...")
-        file_manager = VideoFileManager(settings.VIDEO_FOLDER_PATH)
+        file_manager = VideoFileManager.from_settings(settings)
         video = file_manager.get_next_video()
         
         if not video:
@@ -0,0 +1,89 @@
+"""
+Tests for AsyncYouTubeUploader (offline, dùng httpx.MockTransport)
+"""
+import asyncio
+import httpx
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.upload_sessions import UploadSessionStore
+
+
+CHUNK = 256 * 1024
+
+
+class FakeResumableServer:
+    """Server resumable upload giả lập trong memory"""
+    
+    def __init__(self, size: int, fail_after_chunks: int = None):
+        self.size = size
+        self.received = 0
+        self.chunks = 0
+        self.fail_after_chunks = fail_after_chunks
+        self.sessions_started = 0
+    
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            self.sessions_started += 1
+            assert request.headers["x-upload-content-length"] == str(self.size)
+            return httpx.Response(200, headers={"location": "https://upload.example/session/1"})
+        
+        content_range = request.headers["content-range"]
+        if content_range.startswith("bytes */"):
+            return self._status()
+        
+        if self.fail_after_chunks is not None and self.chunks >= self.fail_after_chunks:
+            return httpx.Response(503, text="unavailable")
+        start = int(content_range.split(" ")[1].split("-")[0])
+        assert start == self.received
+        self.received += len(request.read())
+        self.chunks += 1
+        return self._status()
+    
+    def _status(self) -> httpx.Response:
+        if self.received >= self.size:
+            return httpx.Response(200, json={"id": "abc123"})
+        return httpx.Response(308, headers={"range": f"bytes=0-{self.received - 1}"})
+
+
+def make_uploader(tmp_path, server: FakeResumableServer) -> AsyncYouTubeUploader:
+    return AsyncYouTubeUploader(
+        chunk_size=CHUNK,
+        sessions=UploadSessionStore(tmp_path / "sessions"),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    )
+
+
+def test_async_upload_streams_chunks_and_reports_progress(tmp_path):
+    """Test upload từng chunk và await progress callback"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x" * (2 * CHUNK + 100))
+    server = FakeResumableServer(video.stat().st_size)
+    uploader = make_uploader(tmp_path, server)
+    progress = []
+    
+    async def on_progress(sent, total):
+        progress.append((sent, total))
+    
+    result = asyncio.run(uploader.upload_video(video, "Title", "Desc", ["tag"], progress_callback=on_progress))
+    
+    assert result["video_id"] == "abc123"
+    assert server.chunks == 3
+    assert progress[-1] == (video.stat().st_size, video.stat().st_size)
+    assert uploader.sessions.load(video) is None
+
+
+def test_async_upload_resumes_saved_session(tmp_path):
+    """Test upload lỗi giữa chừng rồi tiếp tục từ byte server đã xác nhận"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x" * (3 * CHUNK))
+    server = FakeResumableServer(video.stat().st_size, fail_after_chunks=1)
+    
+    assert asyncio.run(make_uploader(tmp_path, server).upload_video(video, "Title", "Desc", [])) is None
+    
+    server.fail_after_chunks = None
+    uploader = make_uploader(tmp_path, server)
+    assert uploader.sessions.load(video)["progress"] == CHUNK
+    result = asyncio.run(uploader.upload_video(video, "Title", "Desc", []))
+    
+    assert result["video_id"] == "abc123"
+    assert server.sessions_started == 1
+    assert server.chunks == 3
@@ -0,0 +1,118 @@
+"""
+Tests for BatchUploadEngine and BandwidthLimiter
+"""
+import asyncio
+import threading
+from pathlib import Path
+from src.tools.rate_limiter import BandwidthLimiter
+from src.utils.file_manager import VideoFileManager
+from src.workflows.batch_upload import BatchUploadEngine
+
+
+class FakeWorkflow:
+    """Workflow giả: pop video từ hàng đợi, 'upload' mất một chút thời gian"""
+    
+    def __init__(self, file_manager):
+        self.file_manager = file_manager
+        self.active = 0
+        self.max_active = 0
+    
+    async def process_next(self):
+        video_path = self.file_manager.pending_queue.pop()
+        if not video_path:
+            return {"status": "no_videos", "video_path": "", "error": "No pending videos found"}
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.file_manager.mark_as_uploaded(video_path, video_id=video_path.stem)
+        return {
+            "status": "uploaded",
+            "video_path": str(video_path),
+            "upload_result": {"video_id": video_path.stem, "video_url": f"https://youtu.be/{video_path.stem}"},
+            "error": "",
+        }
+
+
+def make_videos(folder: Path, count: int):
+    for i in range(count):
+        (folder / f"video{i}.mp4").write_bytes(f"content {i}".encode())
+
+
+def test_batch_drains_queue_with_bounded_concurrency(tmp_path):
+    """Drain hết hàng đợi, không vượt quá concurrency"""
+    make_videos(tmp_path, 5)
+    workflow = FakeWorkflow(VideoFileManager(tmp_path))
+    engine = BatchUploadEngine(workflow, concurrency=2)
+    
+    results = asyncio.run(engine.run())
+    
+    assert sorted(r["video"] for r in results) == [f"video{i}.mp4" for i in range(5)]
+    assert all(r["status"] == "uploaded" for r in results)
+    assert workflow.max_active == 2
+    assert workflow.file_manager.get_pending_videos_count() == 0
+
+
+def test_batch_respects_count_and_daily_cap(tmp_path):
+    """count và daily_cap (tính cả video đã upload hôm nay) giới hạn số video"""
+    make_videos(tmp_path, 6)
+    manager = VideoFileManager(tmp_path)
+    workflow = FakeWorkflow(manager)
+    
+    results = asyncio.run(BatchUploadEngine(workflow, concurrency=3).run(count=2))
+    assert len(results) == 2
+    
+    engine = BatchUploadEngine(workflow, concurrency=3, daily_cap=3)
+    assert engine.remaining_today() == 1
+    results = asyncio.run(engine.run())
+    assert len(results) == 1
+    assert asyncio.run(engine.run()) == []
+    assert manager.get_pending_videos_count() == 3
+
+
+def test_batch_rechecks_daily_cap_per_video(tmp_path):
+    """Video do process khác upload giữa chừng cũng được tính vào daily_cap"""
+    make_videos(tmp_path, 5)
+    manager = VideoFileManager(tmp_path)
+    
+    class SharedLedgerWorkflow(FakeWorkflow):
+        async def process_next(self):
+            state = await super().process_next()
+            if state["video_path"].endswith("video0.mp4"):
+                manager.mark_as_uploaded(tmp_path / "video4.mp4", video_id="other")
+            return state
+    
+    engine = BatchUploadEngine(SharedLedgerWorkflow(manager), concurrency=1, daily_cap=3)
+    results = asyncio.run(engine.run())
+    
+    assert [r["video"] for r in results] == ["video0.mp4", "video1.mp4"]
+    assert engine.remaining_today() == 0
+
+
+def test_bandwidth_limiter_reserve():
+    """Bucket cho phép nợ, thời gian chờ tỉ lệ với số byte vượt quá"""
+    limiter = BandwidthLimiter(rate_mbps=8)  # 1 MB/s, burst 1 giây
+    assert limiter.enabled
+    assert limiter.reserve(500_000) == 0.0
+    wait = limiter.reserve(1_500_000)
+    assert 0.9 < wait <= 1.0
+    
+    assert BandwidthLimiter().reserve(10_000_000) == 0.0
+
+
+def test_batch_scans_queue_off_the_event_loop(tmp_path):
+    """Quét folder + hash (full hash có thể rất lâu) không chặn event loop"""
+    make_videos(tmp_path, 2)
+    manager = VideoFileManager(tmp_path)
+    scan_threads = []
+    get_pending_queue = manager.get_pending_queue
+    
+    def tracked_scan(*args, **kwargs):
+        scan_threads.append(threading.current_thread())
+        return get_pending_queue(*args, **kwargs)
+    
+    manager.get_pending_queue = tracked_scan
+    results = asyncio.run(BatchUploadEngine(FakeWorkflow(manager), concurrency=1).run())
+    
+    assert len(results) == 2
+    assert scan_threads and threading.main_thread() not in scan_threads
@@ -0,0 +1,113 @@
+"""
+Tests for ChannelRegistry / UploaderPool (nhiều kênh trong một process)
+"""
+import pytest
+from src.tools.mock_youtube import MockAuth, mock_auth_factory
+from src.utils.config import Settings
+from src.workflows.channels import ChannelConfig, ChannelRegistry, UploaderPool
+
+
+def make_settings(tmp_path):
+    """Settings với sổ quota nằm trong tmp_path"""
+    settings = Settings()
+    settings._config.setdefault('youtube', {})['quota_db'] = str(tmp_path / "quota.db")
+    return settings
+
+
+def make_registry(tmp_path, settings):
+    return ChannelRegistry([
+        ChannelConfig.from_dict({
+            "name": "toeic", "data_dir": str(tmp_path / "toeic"), "client_id": "id-1",
+            "folder": str(tmp_path / "videos" / "toeic"),
+            "prompt_type": "toeic_part_youtube", "daily_quota": 5000, "concurrency": 1
+        }, settings),
+        ChannelConfig.from_dict({
+            "name": "tech", "data_dir": str(tmp_path / "tech"), "client_id": "id-2",
+            "folder": str(tmp_path / "videos" / "tech"),
+            "upload_time": "20:00"
+        }, settings),
+        ChannelConfig.from_dict({
+            "name": "draft", "data_dir": str(tmp_path / "draft"), "client_id": "",
+            "folder": str(tmp_path / "videos" / "draft")
+        }, settings),
+    ])
+
+
+def test_channel_config_defaults_and_validation(tmp_path):
+    """Field không khai báo lấy theo cấu hình chung; tên kênh phải khác nhau"""
+    settings = make_settings(tmp_path)
+    registry = make_registry(tmp_path, settings)
+    
+    toeic = registry.get("toeic")
+    assert toeic.token_file == tmp_path / "toeic" / "token.json"
+    assert toeic.upload_time == settings.UPLOAD_SCHEDULE_TIME
+    assert registry.get("tech").prompt_type == settings.DESCRIPTION_PROMPT_TYPE
+    assert registry.names() == ["toeic", "tech", "draft"]
+    
+    with pytest.raises(KeyError):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        ChannelRegistry([toeic, toeic])
+
+
+def test_uploader_pool_is_lazy_and_isolated(tmp_path):
+    """Uploader tạo khi cần, mỗi kênh có token, quota và semaphore riêng"""
+    settings = make_settings(tmp_path)
+    pool = UploaderPool(settings, make_registry(tmp_path, settings))
+    assert pool._uploaders == {}
+    
+    toeic = pool.uploader("toeic")
+    assert pool.uploader("toeic") is toeic
+    assert list(pool._uploaders) == ["toeic"]
+    assert pool.uploader("draft") is None
+    
+    tech = pool.uploader("tech")
+    assert toeic.auth.token_file != tech.auth.token_file
+    assert toeic.quota is pool.quota("toeic")
+    
+    pool.quota("toeic").charge("videos.insert")
+    assert pool.quota("toeic").remaining() == 5000 - 1600
+    assert pool.quota("tech").used() == 0
+    
+    assert pool.semaphore("toeic") is not pool.semaphore("tech")
+    assert pool.async_uploader("tech").quota is tech.quota
+
+
+def test_channels_share_quota_per_project_and_need_own_folder(tmp_path):
+    """Kênh cùng OAuth client dùng chung sổ quota; hai kênh không được chung folder"""
+    settings = make_settings(tmp_path)
+    
+    def channel(name, **extra):
+        return ChannelConfig.from_dict({
+            "name": name, "data_dir": str(tmp_path / name), "folder": str(tmp_path / "videos" / name), **extra
+        }, settings)
+    
+    registry = ChannelRegistry([
+        channel("a", client_id="shared", daily_quota=8000),
+        channel("b", client_id="shared", daily_quota=6000),
+        channel("c", client_id="other"),
+    ])
+    pool = UploaderPool(settings, registry)
+    assert pool.quota("a") is pool.quota("b")
+    assert pool.quota("a") is not pool.quota("c")
+    assert pool.quota("a").daily_limit == 6000
+    
+    pool.quota("a").charge("videos.insert")
+    assert pool.quota("b").used() == 1600
+    
+    with pytest.raises(ValueError):
+        ChannelRegistry([
+            ChannelConfig.from_dict({"name": "x", "data_dir": str(tmp_path / "x")}, settings),
+            ChannelConfig.from_dict({"name": "y", "data_dir": str(tmp_path / "y")}, settings),
+        ])
+
+
+def test_uploader_pool_uses_injected_auth_factory(tmp_path):
+    """Kênh chưa có OAuth client chỉ có uploader khi auth factory tạo được auth (vd. mock server)"""
+    settings = make_settings(tmp_path)
+    registry = make_registry(tmp_path, settings)
+    assert UploaderPool(settings, registry).uploader("draft") is None
+    
+    pool = UploaderPool(settings, registry, auth_factory=mock_auth_factory(UploaderPool.youtube_auth))
+    assert isinstance(pool.uploader("draft").auth, MockAuth)
+    assert not isinstance(pool.uploader("toeic").auth, MockAuth)
@@ -0,0 +1,70 @@
+"""
+Tests for batch description generation (DescriptionAgent.generate_descriptions + DescriptionStore)
+"""
+import asyncio
+from pathlib import Path
+from langchain_core.runnables import RunnableLambda
+from src.agents.description_agent import DescriptionAgent
+from src.agents.description_store import DescriptionStore
+from src.agents.llm_cache import LLMCache
+
+
+def test_batch_is_bounded_streams_and_survives_failures(tmp_path):
+    """Tối đa max_concurrency request cùng lúc, video lỗi không làm hỏng cả batch"""
+    running = {"now": 0, "peak": 0, "calls": 0}
+    
+    async def fake_llm(prompt_value):
+        running["now"] += 1
+        running["calls"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        text = prompt_value.to_string()
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if "broken" in text:
+            raise RuntimeError("LLM error")
+        return "Mô tả video"
+    
+    agent = DescriptionAgent(
+        provider="gemini", cache=LLMCache(tmp_path / "llm.db"), llm=RunnableLambda(fake_llm)
+    )
+    videos = [Path(f"lesson_{i:02d}.mp4") for i in range(8)] + [Path("broken.mp4")]
+    
+    async def collect():
+        return [item async for item in agent.generate_descriptions(videos, max_concurrency=3)]
+    
+    results = asyncio.run(collect())
+    assert running["peak"] == 3
+    assert len(results) == 9
+    failed = [path for path, result in results if isinstance(result, Exception)]
+    assert failed == [Path("broken.mp4")]
+    
+    # Lần chạy sau: video đã xong lấy từ cache, chỉ gọi lại video lỗi
+    calls = running["calls"]
+    assert len(asyncio.run(collect())) == 9
+    assert running["calls"] == calls + 1
+
+
+def test_description_store_roundtrip(tmp_path):
+    """Mô tả lưu theo video + prompt type"""
+    store = DescriptionStore(tmp_path / "descriptions.db")
+    video = tmp_path / "lesson.mp4"
+    store.save(video, "toeic_part_youtube", {"title": "Tiêu đề", "description": "Mô tả", "tags": ["toeic"]})
+    
+    assert store.get(video, "toeic_part_youtube")["tags"] == ["toeic"]
+    assert store.get(video, "default") is None
+    assert store.has(video, "toeic_part_youtube") and store.count() == 1
+
+
+def test_description_store_drops_expired_and_outdated_prompt(tmp_path):
+    """Mô tả quá TTL hoặc tạo bằng prompt cũ bị bỏ và xóa khỏi store"""
+    store = DescriptionStore(tmp_path / "descriptions.db", ttl=3600)
+    video = tmp_path / "lesson.mp4"
+    store.save(video, "default", {"title": "Tiêu đề", "description": "Mô tả", "tags": []}, version="v1")
+    
+    assert store.has(video, "default", "v1")
+    assert store.get(video, "default", "v2") is None
+    assert store.count() == 0
+    
+    store.save(video, "default", {"title": "Tiêu đề", "description": "Mô tả", "tags": []}, version="v2")
+    store._conn.execute("UPDATE descriptions SET created_at = '2000-01-01T00:00:00'")
+    assert store.get(video, "default", "v2") is None and store.count() == 0
@@ -1,9 +1,11 @@
 """
 Tests for VideoFileManager
 """
+import json
+import os
 import pytest
 from pathlib import Path
-from src.utils.file_manager import VideoFileManager
+from src.utils.file_manager import VideoFileManager, SQLiteUploadLedger, UploadState
 
 
 def test_file_manager_initialization(tmp_path):
@@ -43,3 +45,168 @@ def test_mark_and_get_uploaded(tmp_path):
     # Check if marked
     uploaded = manager.get_uploaded_videos()
     assert "test.mp4" in uploaded
+
+
+
+def test_ledger_states(tmp_path):
+    """Test chuyển trạng thái video trong SQLite ledger"""
+    video = tmp_path / "test.mp4"
+    video.touch()
+    
+    manager = VideoFileManager(tmp_path)
+    assert manager.get_video_state(video) == UploadState.PENDING
+    
+    manager.mark_state(video, UploadState.UPLOADING)
+    assert manager.get_video_state(video) == UploadState.UPLOADING
+    assert manager.get_pending_videos_count() == 1
+    
+    manager.mark_as_uploaded(video, video_id="abc123")
+    assert manager.get_video_state(video) == UploadState.UPLOADED
+    assert manager.get_pending_videos_count() == 0
+    
+    with pytest.raises(ValueError):
+        manager.ledger.set_state("test.mp4", "unknown")
+
+
+def test_import_legacy_json(tmp_path):
+    """Test import một lần từ .uploaded.json cũ"""
+    (tmp_path / "old.mp4").touch()
+    (tmp_path / "new.mp4").touch()
+    (tmp_path / ".uploaded.json").write_text(
+        json.dumps({"uploaded": ["old.mp4"], "last_updated": "2024-01-01T00:00:00"}),
+        encoding="utf-8"
+    )
+    
+    manager = VideoFileManager(tmp_path)
+    assert manager.get_uploaded_videos() == {"old.mp4"}
+    assert manager.get_next_video().name == "new.mp4"
+    
+    # Import chỉ chạy một lần
+    ledger = SQLiteUploadLedger(manager.ledger_db_file)
+    assert ledger.import_json(manager.uploaded_log_file) == 0
+
+
+def test_json_ledger_backend(tmp_path):
+    """Test backend json vẫn giữ format .uploaded.json"""
+    video = tmp_path / "test.mp4"
+    video.touch()
+    
+    manager = VideoFileManager(tmp_path, ledger_backend="json")
+    manager.mark_as_uploaded(video)
+    
+    data = json.loads(manager.uploaded_log_file.read_text(encoding="utf-8"))
+    assert data["uploaded"] == ["test.mp4"]
+
+
+def test_pending_queue_orders(tmp_path):
+    """Test hàng đợi pending với các policy sắp xếp"""
+    for i, (name, size) in enumerate([("b.mp4", 30), ("a.mp4", 10), ("c.mp4", 20)]):
+        video = tmp_path / name
+        video.write_bytes(b"x" * size)
+        os.utime(video, ns=(0, (i + 1) * 10**9))
+    (tmp_path / ".priority.yaml").write_text("c.mp4: 5\nb.mp4: 1\n", encoding="utf-8")
+    
+    manager = VideoFileManager(tmp_path)
+    manager.mark_as_uploaded(tmp_path / "a.mp4")
+    
+    assert [v.name for v in manager.get_pending_queue("name")] == ["b.mp4", "c.mp4"]
+    assert [v.name for v in manager.get_pending_queue("size")] == ["c.mp4", "b.mp4"]
+    assert [v.name for v in manager.get_pending_queue("mtime")] == ["b.mp4", "c.mp4"]
+    
+    queue = manager.get_pending_queue("priority")
+    assert queue is manager.pending_queue
+    assert queue.count() == 2
+    assert queue.peek().name == "c.mp4"
+    assert queue.pop().name == "c.mp4"
+    assert queue.pop().name == "b.mp4"
+    assert queue.pop() is None
+    
+    with pytest.raises(ValueError):
+        manager.get_pending_queue("random")
+
+
+def test_dedup_by_content(tmp_path):
+    """Test bỏ qua video đổi tên/copy, nhưng vẫn upload video khác nội dung trùng tên"""
+    (tmp_path / "a.mp4").write_bytes(b"video-a" * 1000)
+    manager = VideoFileManager(tmp_path)
+    manager.mark_as_uploaded(tmp_path / "a.mp4")
+    
+    # Copy với tên khác -> trùng nội dung
+    (tmp_path / "a_copy.mp4").write_bytes(b"video-a" * 1000)
+    assert manager.find_duplicate(tmp_path / "a_copy.mp4") == "a.mp4"
+    assert manager.get_pending_queue().count() == 0
+    
+    # Nội dung khác nhưng dùng lại tên đã upload
+    (tmp_path / "a.mp4").write_bytes(b"video-b" * 1000)
+    os.utime(tmp_path / "a.mp4", ns=(0, 10**9))
+    assert [v.name for v in manager.get_pending_queue()] == ["a.mp4"]
+
+
+def test_sampled_fingerprint_large_file(tmp_path):
+    """Test sampled hash chỉ phụ thuộc các block lấy mẫu và size"""
+    from src.utils.fingerprint import sampled_fingerprint, SAMPLE_BLOCK_SIZE
+    
+    size = SAMPLE_BLOCK_SIZE * 40
+    data = bytearray(os.urandom(size))
+    (tmp_path / "big.mp4").write_bytes(data)
+    original = sampled_fingerprint(tmp_path / "big.mp4")
+    
+    data[0] ^= 0xFF
+    (tmp_path / "big.mp4").write_bytes(data)
+    assert sampled_fingerprint(tmp_path / "big.mp4") != original
+    
+    data[0] ^= 0xFF
+    data.append(0)
+    (tmp_path / "big.mp4").write_bytes(data)
+    assert sampled_fingerprint(tmp_path / "big.mp4") != original
+
+
+def test_incomplete_ledger_backend_fails_at_construction():
+    from src.utils.file_manager import UploadLedger
+    
+    class PartialLedger(UploadLedger):
+        def get_state(self, name):
+            return None
+    
+    with pytest.raises(TypeError):
+        PartialLedger()
+
+
+def test_index_snapshot_survives_ledger_open(tmp_path, monkeypatch):
+    """Ledger/fingerprint DB nằm ngoài folder video nên không làm snapshot index bị bỏ"""
+    (tmp_path / "a.mp4").write_bytes(b"a")
+    (tmp_path / ".uploaded.db").touch()  # ledger cũ trong folder được chuyển vào state dir
+    manager = VideoFileManager(tmp_path)
+    assert not (tmp_path / ".uploaded.db").exists() and manager.ledger_db_file.exists()
+    manager.mark_state(tmp_path / "a.mp4", UploadState.DESCRIBED)
+    past = os.stat(tmp_path).st_mtime - 3600
+    os.utime(tmp_path, (past, past))
+    assert [p.name for p in manager.get_all_videos()] == ["a.mp4"]
+    manager.index.close()
+    manager.ledger.close()
+    
+    # Lần chạy sau: mở ledger (WAL) rồi đồng bộ index, không quét lại folder
+    restarted = VideoFileManager(tmp_path)
+    restarted.mark_state(tmp_path / "a.mp4", UploadState.UPLOADING)
+    monkeypatch.setattr(restarted.index, "_full_scan", lambda *_: pytest.fail("full scan"))
+    assert [p.name for p in restarted.get_all_videos()] == ["a.mp4"]
+
+
+def test_full_hash_confirms_sampled_match(tmp_path):
+    """Video khác nội dung nhưng trùng sampled hash chỉ bị coi là trùng khi không bật full_hash"""
+    from src.utils.fingerprint import SAMPLE_BLOCK_SIZE, sampled_fingerprint
+    
+    data = bytearray(os.urandom(SAMPLE_BLOCK_SIZE * 40))
+    (tmp_path / "a.mp4").write_bytes(data)
+    data[SAMPLE_BLOCK_SIZE + 100] ^= 0xFF  # Vùng không được lấy mẫu
+    (tmp_path / "b.mp4").write_bytes(data)
+    assert sampled_fingerprint(tmp_path / "a.mp4") == sampled_fingerprint(tmp_path / "b.mp4")
+    
+    manager = VideoFileManager(tmp_path, full_hash=True)
+    manager.mark_as_uploaded(tmp_path / "a.mp4")
+    assert [v.name for v in manager.get_pending_queue()] == ["b.mp4"]
+    assert manager.find_duplicate(tmp_path / "b.mp4") is None
+    manager.fingerprints.close()
+    
+    sampled_only = VideoFileManager(tmp_path, full_hash=False)
+    assert [v.name for v in sampled_only.get_pending_queue()] == []
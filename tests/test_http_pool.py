@@ -0,0 +1,61 @@
+"""
+Tests for HttpPool (kết nối keep-alive được dùng lại, đếm số kết nối)
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.tools.http_pool import ConnectionStats, HttpPool, PooledHttp
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_async_client_reuses_connection(server_url):
+    """Các request liên tiếp (upload, thumbnail, status) dùng lại một kết nối"""
+    pool = HttpPool()
+    
+    async def run():
+        client = pool.async_client()
+        assert pool.async_client() is client
+        for _ in range(3):
+            resp = await client.get(f"{server_url}/status")
+            assert resp.status_code == 200
+        await pool.aclose()
+    
+    asyncio.run(run())
+    stats = pool.stats()["async"]
+    assert stats == {"requests": 3, "connections": 1, "reused": 2, "reuse_ratio": 0.667}
+
+
+def test_sync_http_reuses_connection(server_url):
+    """httplib2 trong pool giữ kết nối giữa các request"""
+    stats = ConnectionStats()
+    http = PooledHttp(stats, timeout=5)
+    for _ in range(3):
+        resp, _ = http.request(f"{server_url}/videos")
+        assert resp.status == 200
+    assert stats.as_dict()["connections"] == 1
+    assert stats.as_dict()["reused"] == 2
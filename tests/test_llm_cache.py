@@ -0,0 +1,70 @@
+"""
+Tests for LLMCache (TTL, LRU eviction) và cache của DescriptionAgent
+"""
+import asyncio
+import time
+from pathlib import Path
+from langchain_core.runnables import RunnableLambda
+from src.agents.description_agent import DescriptionAgent
+from src.agents.llm_cache import LLMCache
+
+
+def test_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    """Entry hết TTL bị bỏ qua; vượt max_entries thì entry lâu không dùng nhất bị xóa"""
+    cache = LLMCache(tmp_path / "llm.db", ttl=60, max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    
+    cache.set("a", "A")
+    now[0] += 1
+    cache.set("b", "B")
+    now[0] += 1
+    assert cache.get("a") == "A"  # a mới được dùng, b thành LRU
+    now[0] += 1
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    
+    now[0] += 120
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 2 and stats["evictions"] == 1
+    
+    cache.bypass = True
+    cache.set("d", "D")
+    assert cache.get("d") is None
+
+
+class FakeLLM:
+    """LLM giả: trả về chuỗi, đếm số lần được gọi"""
+    def __init__(self):
+        self.calls = 0
+        self.runnable = RunnableLambda(self._invoke)
+    
+    def _invoke(self, prompt_value):
+        self.calls += 1
+        return f"Mô tả #{self.calls}"
+
+
+def test_description_agent_reuses_cached_output(tmp_path):
+    """Lần gọi thứ hai cho cùng video không gọi LLM; đổi model hoặc use_cache=False thì gọi lại"""
+    def make_agent(model):
+        llm = FakeLLM()
+        agent = DescriptionAgent(
+            provider="gemini", model=model, cache=LLMCache(tmp_path / "llm.db"), llm=llm.runnable
+        )
+        return agent, llm
+    
+    agent, llm = make_agent("gemini-2.5-flash")
+    first = asyncio.run(agent.generate_description(Path("lesson_01.mp4")))
+    again = asyncio.run(agent.generate_description(Path("lesson_01.mp4")))
+    assert again["description"] == first["description"]
+    assert llm.calls == 1
+    
+    asyncio.run(agent.generate_description(Path("lesson_01.mp4"), use_cache=False))
+    assert llm.calls == 2
+    
+    other, other_llm = make_agent("gemini-2.5-pro")
+    asyncio.run(other.generate_description(Path("lesson_01.mp4")))
+    assert other_llm.calls == 1
+    assert other.cache.stats()["entries"] == 2
@@ -0,0 +1,38 @@
+"""
+Tests for MmapMediaUpload (chunk là memoryview của vùng mmap)
+"""
+from googleapiclient.http import MediaFileUpload
+from src.tools.mmap_media import MmapMediaUpload
+
+
+def test_getbytes_matches_media_file_upload(tmp_path):
+    """Cùng nội dung chunk như MediaFileUpload, chunk cuối ngắn hơn, file rỗng không lỗi"""
+    video = tmp_path / "video.mp4"
+    data = bytes(range(256)) * 5000
+    video.write_bytes(data)
+    reference = MediaFileUpload(str(video), chunksize=4096, resumable=True)
+    
+    with MmapMediaUpload(video, chunksize=4096, readahead=8192) as media:
+        assert media.size() == len(data) and media.mimetype() == "video/mp4"
+        for begin in range(0, len(data), 300_000):
+            chunk = media.getbytes(begin, 300_000)
+            assert isinstance(chunk, memoryview)
+            reference.stream().seek(begin)
+            assert bytes(chunk) == reference.stream().read(300_000)
+        # Chunk trước đó được giải phóng khi lấy chunk mới
+        first = media.getbytes(0, 10)
+        media.getbytes(10, 10)
+        assert _released(first)
+    
+    empty = tmp_path / "empty.mp4"
+    empty.write_bytes(b"")
+    with MmapMediaUpload(empty) as media:
+        assert media.size() == 0 and media.getbytes(0, 100) == b""
+
+
+def _released(view: memoryview) -> bool:
+    try:
+        view.tobytes()
+        return False
+    except ValueError:
+        return True
@@ -0,0 +1,96 @@
+"""
+End-to-end tests với MockYouTubeServer (resumable upload, lỗi mạng, thumbnail, videos.list)
+"""
+import asyncio
+import json
+import pytest
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.mock_youtube import MockAuth, MockYouTubeServer
+from src.tools.telemetry import UploadTelemetry
+from src.tools.upload_sessions import UploadSessionStore
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.retry import Retrier
+
+
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def server():
+    with MockYouTubeServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"v" * (3 * CHUNK + 100))
+    return path
+
+
+def test_async_upload_survives_5xx_and_dropped_connection(tmp_path, server, video):
+    """Chunk lỗi 503 / mất kết nối được gửi lại, video và thumbnail lên đủ"""
+    thumbnail = tmp_path / "thumb.jpg"
+    thumbnail.write_bytes(b"jpeg")
+    server.fail_next("ok", "error", "drop")
+    uploader = AsyncYouTubeUploader(
+        auth=MockAuth(),
+        chunk_size=CHUNK,
+        sessions=UploadSessionStore(tmp_path / "sessions"),
+        retrier=Retrier(max_attempts=3, base_delay=0),
+        base_url=server.url
+    )
+    
+    async def run():
+        result = await uploader.upload_video(video, "Title", "Desc", ["tag"])
+        thumbnail_ok = await uploader.upload_thumbnail(result["video_id"], thumbnail)
+        await uploader.aclose()
+        return result, thumbnail_ok
+    
+    result, thumbnail_ok = asyncio.run(run())
+    
+    assert thumbnail_ok
+    uploaded = server.videos[result["video_id"]]
+    assert uploaded["snippet"]["title"] == "Title"
+    assert uploaded["fileDetails"]["fileSize"] == str(video.stat().st_size)
+    assert server.stats()["errors"] == 1 and server.stats()["drops"] == 1
+    assert uploader.retrier.stats()["youtube.upload"]["retries"] == 2
+
+
+def test_sync_upload_resumes_after_restart(tmp_path, server, video):
+    """Uploader đồng bộ trỏ vào mock server qua base_url, resume từ byte đã nhận"""
+    def make_uploader():
+        return YouTubeUploader(
+            "id", "secret", chunk_size_mb=0.25, session_dir=tmp_path / "sessions",
+            auth=MockAuth(), base_url=server.url
+        )
+    
+    server.fail_next("ok", "error")
+    first = make_uploader()
+    assert first.upload_video(video, "Title", "Desc", []) is None
+    assert first.sessions.load(video)["progress"] == CHUNK
+    
+    second = make_uploader()
+    result = second.upload_video(video, "Title", "Desc", [])
+    assert result["video_id"] in server.videos
+    assert server.stats()["uploads"] == 1
+    assert second.get_videos([result["video_id"]])[result["video_id"]]["processingDetails"]["processingStatus"] == "succeeded"
+
+
+def test_sync_upload_adapts_chunk_size(tmp_path, server):
+    """Uploader đồng bộ cũng tăng chunk size theo throughput đo được (adaptive_chunks)"""
+    video = tmp_path / "big.mp4"
+    video.write_bytes(b"v" * (16 * CHUNK))
+    telemetry = UploadTelemetry(uploads_log=tmp_path / "uploads.jsonl")
+    uploader = YouTubeUploader(
+        "id", "secret", chunk_size_mb=0.25, session_dir=tmp_path / "sessions",
+        auth=MockAuth(), base_url=server.url, telemetry=telemetry,
+        adaptive_chunks=True, max_chunk_size=4 * CHUNK
+    )
+    result = uploader.upload_video(video, "Title", "Desc", [])
+    assert server.videos[result["video_id"]]["fileDetails"]["fileSize"] == str(video.stat().st_size)
+    
+    record = json.loads((tmp_path / "uploads.jsonl").read_text().strip())
+    sizes = [chunk["chunk_size"] for chunk in record["chunks"]]
+    assert sizes[0] == CHUNK and max(sizes) == 4 * CHUNK
+    assert sizes == sorted(sizes)
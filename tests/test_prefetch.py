@@ -0,0 +1,64 @@
+"""
+Tests for the background description prefetcher
+"""
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from src.workflows.prefetch import DescriptionPrefetcher
+
+
+class FakeWorkflow:
+    """Workflow tối thiểu: lưu mô tả vào dict, ghi lại video được tạo trước"""
+    
+    def __init__(self, videos):
+        self.active_uploads = 0
+        self.descriptions_bypassed = False
+        self.videos = videos
+        self.stored = {}
+        self.thumbnails = []
+        self.channel = SimpleNamespace(name="default", prompt_type="default")
+        self.settings = SimpleNamespace(AUTO_GENERATE_THUMBNAIL=True)
+        self.scan_threads = []
+        self.file_manager = SimpleNamespace(peek_pending=self.peek_pending)
+        self.thumbnail_generator = SimpleNamespace(
+            cached_thumbnail=lambda title, name: self.thumbnails.append(name)
+        )
+    
+    def peek_pending(self, limit=None):
+        self.scan_threads.append(threading.current_thread())
+        return self.videos[:limit]
+    
+    def _stored_description(self, video_path):
+        return self.stored.get(video_path)
+    
+    def _is_prepared(self, video_path):
+        return video_path in self.stored
+    
+    async def pregenerate_descriptions(self, max_concurrency=None, videos=None):
+        for video_path in videos:
+            self.stored[video_path] = {"title": video_path.stem}
+        return {"generated": len(videos), "failed": 0, "skipped": 0}
+
+
+def test_prefetch_prepares_next_videos_only_when_idle():
+    videos = [Path(f"lesson_{i}.mp4") for i in range(5)]
+    workflow = FakeWorkflow(videos)
+    prefetcher = DescriptionPrefetcher(workflow, depth=2)
+    
+    # Đang upload: không tranh tài nguyên
+    workflow.active_uploads = 1
+    assert asyncio.run(prefetcher.prefetch_once()) == {}
+    assert workflow.stored == {}
+    
+    workflow.active_uploads = 0
+    assert asyncio.run(prefetcher.prefetch_once())["generated"] == 2
+    assert set(workflow.stored) == set(videos[:2])
+    assert workflow.thumbnails == ["lesson_0.mp4", "lesson_1.mp4"]
+    # Quét folder (kèm hash) không chạy trên event loop
+    assert threading.main_thread() not in workflow.scan_threads
+    
+    # Bypass cache LLM (--no-llm-cache): mô tả tạo trước sẽ không được dùng, không prefetch
+    workflow.descriptions_bypassed = True
+    workflow.stored.clear()
+    assert asyncio.run(prefetcher.prefetch_once()) == {}
@@ -0,0 +1,51 @@
+"""
+Tests for PromptRegistry (compile một lần, kiểm tra biến template, hot reload)
+"""
+import os
+import pytest
+from langchain_core.runnables import RunnableLambda
+from src.agents.prompt_registry import DEFAULT_PROMPTS_PATH, PromptRegistry
+
+
+ECHO_LLM = RunnableLambda(lambda prompt_value: prompt_value.to_string())
+
+
+def write_prompts(path, tech_prompt, mtime):
+    path.write_text(
+        "default_description_prompt: Viết mô tả.\n"
+        "custom_prompts:\n"
+        f"  tech_tutorial: {tech_prompt}\n",
+        encoding="utf-8"
+    )
+    os.utime(path, (mtime, mtime))
+
+
+def test_repo_prompts_compile_once():
+    """prompts.yaml của repo hợp lệ; cùng prompt type trả về cùng chain"""
+    registry = PromptRegistry(ECHO_LLM, DEFAULT_PROMPTS_PATH)
+    assert {"default", "toeic_part_youtube"} <= set(registry.prompt_types())
+    toeic = registry.get("toeic_part_youtube")
+    assert registry.get("toeic_part_youtube") is toeic
+    assert registry.get("unknown_type") is registry.get("default")
+    assert "lesson_01" in toeic.template.format(video_name="lesson_01", additional_context="")
+
+
+def test_reload_on_mtime_change_keeps_last_good_prompts(tmp_path):
+    """File đổi thì load lại cả bộ; file lỗi (biến lạ) thì giữ bộ cũ"""
+    path = tmp_path / "prompts.yaml"
+    write_prompts(path, "Hướng dẫn kỹ thuật.", mtime=1_000_000)
+    registry = PromptRegistry(ECHO_LLM, path, check_interval=0)
+    first = registry.get("tech_tutorial")
+    
+    write_prompts(path, "Hướng dẫn lập trình.", mtime=1_000_100)
+    second = registry.get("tech_tutorial")
+    assert second is not first
+    # Phiên bản prompt đổi theo nội dung (mô tả đã lưu theo bản cũ bị bỏ)
+    assert second.version != first.version
+    assert "lập trình" in second.chain.invoke({"video_name": "x", "additional_context": ""})
+    
+    write_prompts(path, "Dùng {channel_name}.", mtime=1_000_200)
+    assert registry.get("tech_tutorial") is second
+    
+    with pytest.raises(ValueError, match="channel_name"):
+        PromptRegistry(ECHO_LLM, path)
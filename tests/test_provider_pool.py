@@ -0,0 +1,124 @@
+"""
+Tests for hedged multi-provider LLM requests (HedgedLLM)
+"""
+import asyncio
+from pathlib import Path
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from src.agents import description_agent
+from src.agents.description_agent import DescriptionAgent
+from src.agents.llm_cache import LLMCache
+from src.agents.provider_pool import HedgedLLM, LatencyHistogram
+
+
+def fake_llm(name, delay, calls, fail=False):
+    """LLM giả chậm `delay` giây; ghi lại lời gọi bị hủy"""
+    async def invoke(prompt_value):
+        calls.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            calls.append(f"{name}:cancelled")
+            raise
+        if fail:
+            raise ConnectionError(f"{name} down")
+        return AIMessage(content=f"from {name}")
+    return RunnableLambda(invoke)
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    calls = []
+    llm = HedgedLLM(
+        [("gemini:slow", fake_llm("primary", 1.0, calls)), ("openai:fast", fake_llm("fallback", 0.01, calls))],
+        initial_delay=0.05
+    )
+    chain = ChatPromptTemplate.from_template("{video_name}") | llm | StrOutputParser()
+    
+    assert asyncio.run(chain.ainvoke({"video_name": "lesson"})) == "from fallback"
+    assert calls == ["primary", "fallback", "primary:cancelled"]
+    assert llm.hedges == 1 and llm.hedge_wins == 1 and llm.failovers == 0
+    # Request thua vẫn để lại mẫu latency (bị chặn) cho provider chậm
+    assert llm.members[0].latency.as_dict()["censored"] == 1
+
+
+def test_failed_primary_falls_over_immediately_and_threshold_adapts():
+    calls = []
+    llm = HedgedLLM(
+        [("gemini:down", fake_llm("primary", 0, calls, fail=True)), ("openai:ok", fake_llm("fallback", 0, calls))],
+        initial_delay=10
+    )
+    message = asyncio.run(llm.ainvoke("prompt"))
+    assert message.content == "from fallback" and llm.hedges == 0
+    assert llm.failovers == 1 and llm.hedge_wins == 0
+    
+    # Đủ mẫu thì ngưỡng = p95 latency gần đây (trong [min_delay, max_delay])
+    llm = HedgedLLM([("a", fake_llm("a", 0, calls))], min_samples=5, min_delay=0.5, max_delay=30)
+    for seconds in (1, 1, 2, 2, 9):
+        llm.members[0].latency.observe(seconds)
+    assert llm.hedge_delay(llm.members[0]) == 9
+    
+    histogram = LatencyHistogram(window=3)
+    for seconds in (20, 1, 1, 1):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.95) == 1
+
+
+def test_censored_samples_keep_threshold_from_drifting_low():
+    """Request bị hủy (latency > thời gian đã chờ) kéo quantile lên thay vì bị bỏ qua"""
+    histogram = LatencyHistogram()
+    for seconds in (1, 1, 1, 1):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 1
+    
+    for _ in range(6):
+        histogram.observe(8, censored=True)
+    # 6/10 request chưa xong sau 8s: p50 >= 8 (cận dưới), không phải 1
+    assert histogram.quantile(0.5) == 8
+    # Mẫu bị chặn ngắn hơn mẫu đầy đủ không kéo quantile xuống
+    short = LatencyHistogram()
+    for seconds in (4, 4):
+        short.observe(seconds)
+    short.observe(0.1, censored=True)
+    assert short.quantile(0.5) == 4
+
+
+def test_threshold_is_capped_when_most_samples_are_censored():
+    """Phần lớn request bị hủy: ngưỡng không leo theo thời gian chờ lớn nhất"""
+    llm = HedgedLLM([("a", fake_llm("a", 0, []))], min_samples=5, initial_delay=8, max_delay=30)
+    member = llm.members[0]
+    for seconds in (1, 2):
+        member.latency.observe(seconds)
+    for _ in range(4):
+        member.latency.observe(25, censored=True)
+    assert member.latency.quantile(0.95) == 25
+    assert llm.hedge_delay(member) == 8
+
+
+def test_cache_is_keyed_on_the_model_that_answered(tmp_path, monkeypatch):
+    """Output của model dự phòng được cache theo model đó, không theo provider chính"""
+    calls = []
+    models = {"slow": fake_llm("primary", 1.0, calls), "fast": fake_llm("fallback", 0.01, calls)}
+    monkeypatch.setattr(
+        description_agent, "create_chat_model",
+        lambda provider, api_key, model, temperature, **options: models[model]
+    )
+    cache = LLMCache(tmp_path / "llm.db")
+    agent = DescriptionAgent(
+        provider="gemini", model="slow", cache=cache,
+        fallbacks=[{"provider": "openai", "model": "fast"}],
+        hedge_options={"initial_delay": 0.05}
+    )
+    prompt = agent.prompts.get("default")
+    inputs = {"video_name": "lesson", "additional_context": ""}
+    
+    result = asyncio.run(agent.generate_description(Path("lesson.mp4")))
+    assert result["description"] == "from fallback"
+    assert cache.get(agent._cache_key(prompt, inputs)) is None
+    assert cache.get(agent._cache_key(prompt, inputs, "openai:fast")) == "from fallback"
+    
+    # Lần sau vẫn dùng được output đã cache của model dự phòng
+    calls.clear()
+    assert asyncio.run(agent.generate_description(Path("lesson.mp4")))["description"] == "from fallback"
+    assert calls == []
@@ -0,0 +1,71 @@
+"""
+Tests for QuotaLedger
+"""
+import asyncio
+from datetime import datetime, timezone
+from src.tools.quota import QUOTA_COSTS, QuotaLedger, UPLOAD_COST, quota_day
+
+
+def test_quota_day_uses_pacific_time():
+    """Ngày quota tính theo giờ Pacific (UTC-8 vào mùa đông)"""
+    assert quota_day(datetime(2024, 1, 2, 7, 59, tzinfo=timezone.utc)).isoformat() == "2024-01-01"
+    assert quota_day(datetime(2024, 1, 2, 8, 0, tzinfo=timezone.utc)).isoformat() == "2024-01-02"
+
+
+def test_charge_and_capacity_persist(tmp_path):
+    """Unit được trừ theo method và các process khác (instance khác) cùng thấy"""
+    ledger = QuotaLedger(tmp_path / "quota.db", daily_limit=5000)
+    ledger.charge("videos.insert")
+    ledger.charge("thumbnails.set")
+    ledger.charge("videos.list", calls=3)
+    
+    other = QuotaLedger(tmp_path / "quota.db", daily_limit=5000)
+    assert other.used() == 1600 + 50 + 3
+    assert other.usage_by_method()["videos.list"] == {"units": 3, "calls": 3}
+    capacity = other.capacity()
+    assert capacity["remaining"] == 5000 - 1653
+    assert capacity["uploads_remaining"] == 2
+
+
+def test_reserve_defers_when_budget_is_short(tmp_path):
+    """Giữ chỗ quota cho job song song; không đủ thì job bị hoãn"""
+    ledger = QuotaLedger(tmp_path / "quota.db", daily_limit=2 * UPLOAD_COST)
+    
+    assert ledger.reserve()
+    assert ledger.reserve()
+    assert not ledger.reserve()
+    
+    ledger.release()
+    assert ledger.remaining() == UPLOAD_COST
+    # Job còn lại charge vào chính phần nó đang giữ
+    ledger.charge("videos.insert")
+    assert ledger.remaining() == UPLOAD_COST
+    ledger.release()
+    ledger.charge("videos.insert")
+    assert not ledger.reserve()
+
+
+def test_charge_draws_down_reservation(tmp_path):
+    """Unit đã charge trong job không bị tính thêm lần nữa qua phần giữ chỗ"""
+    ledger = QuotaLedger(tmp_path / "quota.db", daily_limit=2 * UPLOAD_COST)
+    
+    async def job(charged, finish):
+        assert ledger.reserve()
+        ledger.charge("videos.insert")
+        charged.set()
+        await finish.wait()
+        ledger.release()
+    
+    async def main():
+        charged, finish = asyncio.Event(), asyncio.Event()
+        running = asyncio.create_task(job(charged, finish))
+        await charged.wait()
+        # Upload đang chạy chỉ còn giữ phần thumbnail chưa dùng
+        assert ledger.remaining() == 2 * UPLOAD_COST - UPLOAD_COST
+        assert ledger.reserve()
+        ledger.release()
+        finish.set()
+        await running
+    
+    asyncio.run(main())
+    assert ledger.remaining() == 2 * UPLOAD_COST - QUOTA_COSTS["videos.insert"]
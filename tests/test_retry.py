@@ -0,0 +1,117 @@
+"""
+Tests for Retrier (phân loại lỗi, Retry-After, retry budget) và retry trong upload async
+"""
+import asyncio
+import httpx
+import pytest
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.upload_sessions import UploadSessionStore
+from src.utils.retry import Retrier, classify_error
+
+
+def http_error(status: int, body: bytes = b"", headers=None) -> HttpError:
+    return HttpError(Response({"status": status, **(headers or {})}), body)
+
+
+def httpx_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://example.com")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_classify_error():
+    """5xx/429/mất kết nối thử lại được; 4xx auth/quota thì không"""
+    assert classify_error(http_error(503)) == (True, None)
+    assert classify_error(http_error(429, headers={"retry-after": "7"})) == (True, 7.0)
+    assert classify_error(http_error(403, b'{"error": {"errors": [{"reason": "rateLimitExceeded"}]}}'))[0]
+    assert not classify_error(http_error(403, b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}'))[0]
+    assert not classify_error(http_error(401))[0]
+    assert classify_error(httpx_error(502, {"retry-after": "3"})) == (True, 3.0)
+    assert not classify_error(httpx_error(400))[0]
+    assert classify_error(ConnectionResetError())[0]
+    assert classify_error(httpx.ConnectError("reset"))[0]
+    assert not classify_error(ValueError("bad"))[0]
+
+
+def test_retry_then_success_and_fatal_error():
+    """Lỗi tạm thời được thử lại, lỗi fatal raise ngay"""
+    retrier = Retrier(max_attempts=3, base_delay=0)
+    calls = []
+    
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(500)
+        return "ok"
+    
+    assert retrier.call("youtube.upload", flaky) == "ok"
+    assert retrier.stats()["youtube.upload"]["retries"] == 2
+    
+    def forbidden():
+        calls.append(1)
+        raise http_error(401)
+    
+    calls.clear()
+    with pytest.raises(HttpError):
+        retrier.call("youtube.upload", forbidden)
+    assert len(calls) == 1
+
+
+def test_retry_after_above_max_delay_gives_up():
+    """Retry-After lớn hơn max_delay thì không chờ"""
+    retrier = Retrier(max_attempts=5, base_delay=0, max_delay=1)
+    
+    async def throttled():
+        raise httpx_error(429, {"retry-after": "120"})
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(retrier.acall("llm.gemini", throttled))
+    assert retrier.stats()["llm.gemini"]["retries"] == 0
+
+
+def test_retry_budget_limits_retries():
+    """Budget hết thì ngừng retry dù còn lượt thử"""
+    retrier = Retrier(max_attempts=10, base_delay=0, budget_ratio=0, budget_min_retries=2)
+    
+    def broken():
+        raise http_error(503)
+    
+    with pytest.raises(HttpError):
+        retrier.call("youtube.thumbnail", broken)
+    stats = retrier.stats()["youtube.thumbnail"]
+    assert stats["retries"] == 2
+    assert stats["budget_exhausted"] == 1
+
+
+def test_async_upload_retries_failed_chunk(tmp_path):
+    """Chunk lỗi 503 được gửi lại từ byte server đã xác nhận, không mất lượt upload"""
+    chunk = 256 * 1024
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x" * (2 * chunk))
+    state = {"received": 0, "failed": False}
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, headers={"location": "https://upload.example/session/1"})
+        if request.headers["content-range"].startswith("bytes */"):
+            return httpx.Response(308, headers={"range": f"bytes=0-{state['received'] - 1}"})
+        if state["received"] == chunk and not state["failed"]:
+            state["failed"] = True
+            return httpx.Response(503, headers={"retry-after": "0"})
+        state["received"] += len(request.read())
+        if state["received"] >= video.stat().st_size:
+            return httpx.Response(200, json={"id": "retried"})
+        return httpx.Response(308, headers={"range": f"bytes=0-{state['received'] - 1}"})
+    
+    uploader = AsyncYouTubeUploader(
+        chunk_size=chunk,
+        sessions=UploadSessionStore(tmp_path / "sessions"),
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retrier=Retrier(max_attempts=3, base_delay=0)
+    )
+    result = asyncio.run(uploader.upload_video(video, "Title", "Desc", []))
+    
+    assert result["video_id"] == "retried"
+    assert uploader.retrier.stats()["youtube.upload"]["retries"] == 1
@@ -0,0 +1,52 @@
+"""
+Tests for streamed description parsing (title sớm, làm sạch từng dòng, bỏ output lệch format)
+"""
+import asyncio
+from pathlib import Path
+from langchain_core.runnables import RunnableGenerator
+from src.agents.description_agent import DescriptionAgent
+from src.agents.stream_parser import TitleStreamParser
+
+TITLE = "🔥 [TOEIC PART 3] Luyện Nghe Tiếng Anh Song Ngữ - Banking 🔥"
+OUTPUT = f"BƯỚC 1 - Tạo TIÊU ĐỀ:\n{TITLE}\n\nBƯỚC 2 - Tạo MÔ TẢ:\n\nBạn đang ôn luyện TOEIC?\n📚 Nội dung video"
+
+
+def test_title_is_available_before_stream_ends():
+    titles = []
+    parser = TitleStreamParser(on_title=titles.append)
+    chunks = [OUTPUT[i:i + 7] for i in range(0, len(OUTPUT), 7)]
+    fed = 0
+    while not titles:
+        parser.feed(chunks[fed])
+        fed += 1
+    assert titles == [TITLE] and fed < len(chunks)
+    
+    for chunk in chunks[fed:]:
+        parser.feed(chunk)
+    assert parser.finish() == (TITLE, "Bạn đang ôn luyện TOEIC?\n📚 Nội dung video")
+
+
+def test_off_format_stream_is_aborted_and_retried():
+    """Output không có title bị bỏ giữa chừng, lần gọi sau dùng được"""
+    attempts = []
+    
+    async def fake_llm(prompt_values):
+        async for _ in prompt_values:
+            pass
+        attempts.append(0)
+        text = "Đây là một đoạn văn không theo format. " * 50 if len(attempts) == 1 else OUTPUT
+        for i in range(0, len(text), 10):
+            attempts[-1] += 1
+            yield text[i:i + 10]
+    
+    agent = DescriptionAgent(provider="gemini", llm=RunnableGenerator(fake_llm), stream=True, title_within_tokens=40)
+    titles = []
+    result = asyncio.run(agent.generate_description(
+        Path("banking.mp4"), prompt_type="toeic_part_youtube", on_title=titles.append
+    ))
+    
+    assert result["title"] == TITLE and titles == [TITLE]
+    assert "BƯỚC" not in result["description"]
+    # Lần đầu dừng sau ~40 token thay vì đọc hết 200 chunk
+    assert attempts[0] < 20
+    assert agent.stream_stats["aborted"] == 1 and agent.stream_stats["streams"] == 2
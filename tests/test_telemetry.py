@@ -0,0 +1,106 @@
+"""
+Tests for UploadTelemetry (throughput / ETA từng chunk, metrics Prometheus, log JSONL)
+"""
+import asyncio
+import json
+import socket
+import urllib.request
+import pytest
+from src.tools.async_uploader import AsyncYouTubeUploader
+from src.tools.mock_youtube import MockAuth, MockYouTubeServer
+from src.tools.telemetry import UploadTelemetry, UploadTrace
+from src.tools.upload_sessions import UploadSessionStore
+from src.tools.youtube_uploader import YouTubeUploader
+from src.utils.retry import Retrier
+
+
+CHUNK = 256 * 1024
+
+
+def test_trace_splits_time_and_estimates_eta(tmp_path):
+    """Thời gian mạng = tổng - đĩa - rate limiter; ETA theo throughput đo được"""
+    telemetry = UploadTelemetry(metrics_file=tmp_path / "upload.prom", uploads_log=tmp_path / "uploads.jsonl")
+    trace = telemetry.start_upload("a.mp4", size=4000, offset=1000)
+    trace.record_chunk(2000, 1000, 2.0, disk_seconds=0.5, limiter_seconds=0.5)
+    
+    assert trace.chunks[0]["network_seconds"] == 1.0
+    assert trace.eta() == 4.0
+    assert "50%" in trace.progress_message()
+    assert 'youtube_upload_progress_ratio{video="a.mp4"} 0.5000' in telemetry.render()
+    
+    trace.record_retry()
+    trace.finish("success", video_id="vid")
+    record = json.loads((tmp_path / "uploads.jsonl").read_text().strip())
+    assert record["bytes_sent"] == 1000 and record["retries"] == 1
+    metrics = (tmp_path / "upload.prom").read_text()
+    assert 'youtube_uploads_total{status="success"} 1' in metrics
+    assert "youtube_upload_retries_total 1" in metrics
+    assert 'youtube_upload_chunk_seconds_bucket{le="2"} 1' in metrics
+    assert "youtube_uploads_active 0" in metrics
+
+
+def test_async_upload_records_chunks_and_serves_metrics(tmp_path):
+    """Upload qua mock server ghi số liệu từng chunk, /metrics trả về counters"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"v" * (2 * CHUNK + 10))
+    telemetry = UploadTelemetry(uploads_log=tmp_path / "uploads.jsonl", metrics_port=_free_port())
+    telemetry.start_server()
+    
+    with MockYouTubeServer(seed=1) as server:
+        server.fail_next("ok", "error")
+        uploader = AsyncYouTubeUploader(
+            auth=MockAuth(),
+            chunk_size=CHUNK,
+            sessions=UploadSessionStore(tmp_path / "sessions"),
+            retrier=Retrier(max_attempts=3, base_delay=0),
+            adaptive_chunks=False,
+            base_url=server.url,
+            telemetry=telemetry
+        )
+        
+        async def run():
+            result = await uploader.upload_video(video, "Title", "Desc", [])
+            await uploader.aclose()
+            return result
+        
+        assert asyncio.run(run())["status"] == "success"
+    
+    record = json.loads((tmp_path / "uploads.jsonl").read_text().strip())
+    assert [chunk["offset"] for chunk in record["chunks"]] == [CHUNK, 2 * CHUNK, 2 * CHUNK + 10]
+    assert record["retries"] == 1
+    assert all(chunk["bytes_per_second"] for chunk in record["chunks"])
+    
+    with urllib.request.urlopen(f"http://127.0.0.1:{telemetry.metrics_port}/metrics") as response:
+        body = response.read().decode()
+    telemetry.close()
+    assert f"youtube_upload_bytes_total {video.stat().st_size}" in body
+    assert "youtube_upload_chunks_total 3" in body
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_sync_upload_records_disk_time(tmp_path, monkeypatch, use_mmap):
+    """Upload đồng bộ (mmap hoặc MediaFileUpload) tính thời gian đọc file vào disk_seconds"""
+    # Giá trị chưa làm tròn của từng chunk (file nhỏ trong page cache đọc rất nhanh)
+    disk = []
+    take_pending_disk = UploadTrace.take_pending_disk
+    monkeypatch.setattr(UploadTrace, "take_pending_disk", lambda self: disk.append(take_pending_disk(self)) or disk[-1])
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"v" * (2 * CHUNK + 10))
+    telemetry = UploadTelemetry(uploads_log=tmp_path / "uploads.jsonl")
+    
+    with MockYouTubeServer(seed=1) as server:
+        uploader = YouTubeUploader(
+            "id", "secret", chunk_size_mb=0.25, session_dir=tmp_path / "sessions",
+            auth=MockAuth(), base_url=server.url, telemetry=telemetry, use_mmap=use_mmap
+        )
+        assert uploader.upload_video(video, "Title", "Desc", [])["status"] == "success"
+    
+    record = json.loads((tmp_path / "uploads.jsonl").read_text().strip())
+    assert len(record["chunks"]) == 3
+    assert len(disk) == 3 and all(seconds > 0 for seconds in disk)
@@ -0,0 +1,26 @@
+"""
+Tests for ThumbnailGenerator cache (không vẽ lại thumbnail cho cùng title)
+"""
+from src.utils.thumbnail_generator import ThumbnailGenerator
+
+
+def test_cached_thumbnail_renders_once_per_title(tmp_path, monkeypatch):
+    """Cùng title dùng lại file đã vẽ, title khác vẽ file mới"""
+    generator = ThumbnailGenerator(output_dir=str(tmp_path))
+    renders = []
+    create_thumbnail = generator.create_thumbnail
+    
+    def counting_create(*args, **kwargs):
+        renders.append(args[0])
+        return create_thumbnail(*args, **kwargs)
+    
+    monkeypatch.setattr(generator, "create_thumbnail", counting_create)
+    
+    first = generator.cached_thumbnail("TOEIC Part 3 - Health", "a.mp4")
+    again = generator.cached_thumbnail("TOEIC Part 3 - Health", "b.mp4")
+    other = generator.cached_thumbnail("TOEIC Part 3 - Travel", "a.mp4")
+    
+    assert first == again and first.exists()
+    assert other != first
+    assert renders == ["TOEIC Part 3 - Health", "TOEIC Part 3 - Travel"]
+    assert not list(tmp_path.glob("*.tmp.jpg"))
@@ -0,0 +1,53 @@
+"""
+Tests for adaptive chunk sizing and time-of-day bandwidth profiles
+"""
+from datetime import datetime
+from src.tools.chunk_sizer import CHUNK_ALIGNMENT, AdaptiveChunkSizer
+from src.tools.rate_limiter import BandwidthLimiter, parse_profiles
+
+
+MB = 1024 * 1024
+
+
+def test_chunk_size_grows_on_fast_link_and_stays_aligned():
+    """Link nhanh: chunk tăng dần (tối đa gấp đôi mỗi bước) tới max_size"""
+    sizer = AdaptiveChunkSizer(8 * MB, max_size=64 * MB, target_seconds=5)
+    sizer.observe_rtt(0.05)
+    
+    sizes = [sizer.observe_chunk(sizer.chunk_size, 0.5) for _ in range(5)]
+    
+    assert sizes[:3] == [16 * MB, 32 * MB, 64 * MB]
+    assert sizes[-1] == 64 * MB
+    assert all(size % CHUNK_ALIGNMENT == 0 for size in sizes)
+
+
+def test_chunk_size_shrinks_on_slow_link():
+    """Link chậm (vd. bị rate limit): chunk nhỏ lại theo throughput * target_seconds"""
+    sizer = AdaptiveChunkSizer(8 * MB, target_seconds=2)
+    # 8 MB trong 16 giây = 0.5 MB/s -> chunk ~1 MB
+    assert sizer.observe_chunk(8 * MB, 16.0) == 1 * MB
+    # EWMA: một mẫu rất chậm kéo chunk xuống dần chứ không rơi thẳng về tối thiểu
+    assert CHUNK_ALIGNMENT < sizer.observe_chunk(10, 100.0) < 1 * MB
+
+
+def test_high_rtt_raises_target_duration():
+    """RTT lớn: chunk phải đủ dài để RTT không chiếm phần lớn thời gian"""
+    sizer = AdaptiveChunkSizer(4 * MB, target_seconds=1, rtt_factor=10)
+    sizer.observe_rtt(0.4)
+    # 4 MB truyền trong 1 giây (bỏ RTT) -> target 4 giây -> 16 MB nhưng chỉ tăng gấp đôi
+    assert sizer.observe_chunk(4 * MB, 1.4) == 8 * MB
+
+
+def test_bandwidth_profiles_by_time_of_day():
+    """Profile theo giờ, kể cả khung giờ qua nửa đêm; ngoài profile dùng rate mặc định"""
+    profiles = parse_profiles([
+        {"start": "09:00", "end": "18:00", "mbps": 20},
+        {"start": "22:00", "end": "06:00", "mbps": 0},
+    ])
+    limiter = BandwidthLimiter(rate_mbps=50, profiles=profiles)
+    
+    assert limiter.rate_for(datetime(2024, 1, 1, 10, 30)) == 20
+    assert limiter.rate_for(datetime(2024, 1, 1, 23, 0)) == 0
+    assert limiter.rate_for(datetime(2024, 1, 1, 3, 0)) == 0
+    assert limiter.rate_for(datetime(2024, 1, 1, 19, 0)) == 50
+    assert limiter.enabled
@@ -0,0 +1,80 @@
+"""
+Tests for VideoDirectoryIndex
+"""
+import os
+from types import SimpleNamespace
+from src.utils.video_index import VideoDirectoryIndex
+from src.utils.file_manager import VideoFileManager
+
+
+def test_index_honours_supported_formats(tmp_path):
+    """Test chỉ lấy các định dạng trong supported_formats"""
+    (tmp_path / "a.mp4").touch()
+    (tmp_path / "b.MKV").touch()
+    (tmp_path / "c.avi").touch()
+    (tmp_path / "notes.txt").touch()
+    
+    manager = VideoFileManager(tmp_path, supported_formats=["mp4", ".mkv"])
+    names = [v.name for v in manager.get_all_videos()]
+    
+    assert names == ["a.mp4", "b.MKV"]
+
+
+def test_index_detects_changes(tmp_path):
+    """Test index cập nhật khi thêm/xóa file"""
+    (tmp_path / "a.mp4").touch()
+    for use_inotify in (True, False):
+        index = VideoDirectoryIndex(tmp_path, use_inotify=use_inotify)
+        assert [v.name for v in index.videos()] == ["a.mp4"]
+        
+        (tmp_path / "b.mp4").write_bytes(b"x" * 10)
+        # Đẩy mtime của folder ra khỏi khoảng "racy" để không phụ thuộc độ phân giải mtime
+        os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 10**10))
+        assert [v.name for v in index.videos()] == ["a.mp4", "b.mp4"]
+        assert index.stat("b.mp4")[0] == 10
+        
+        (tmp_path / "b.mp4").unlink()
+        os.utime(tmp_path, ns=(0, os.stat(tmp_path).st_mtime_ns + 10**10))
+        assert [v.name for v in index.videos()] == ["a.mp4"]
+        index.close()
+
+
+def test_index_reuses_snapshot(tmp_path, monkeypatch):
+    """Test lần chạy sau dùng lại snapshot nếu folder không đổi"""
+    (tmp_path / "a.mp4").touch()
+    index = VideoDirectoryIndex(tmp_path, use_inotify=False)
+    index.videos()
+    # Lần đầu tạo file snapshot làm đổi mtime folder, lần refresh thứ hai ổn định lại
+    index.refresh(force=True)
+    index.close()
+    
+    # Giả lập lần quét trước đã cũ hơn mtime của folder ngoài khoảng racy
+    reloaded = VideoDirectoryIndex(tmp_path, use_inotify=False)
+    reloaded._scanned_at_ns = reloaded._dir_mtime_ns + 10**10
+    
+    def fail_scan(*args, **kwargs):
+        raise AssertionError("folder should not be rescanned")
+    
+    monkeypatch.setattr(reloaded, "_full_scan", fail_scan)
+    assert [v.name for v in reloaded.videos()] == ["a.mp4"]
+
+
+def test_index_rescans_periodically_and_restats_recent_files(tmp_path):
+    """inotify im lặng (NFS/SMB) vẫn thấy file mới sau rescan_interval; file đang ghi được stat lại"""
+    (tmp_path / "a.mp4").write_bytes(b"x")
+    index = VideoDirectoryIndex(tmp_path, use_inotify=False, rescan_interval=3600)
+    assert [v.name for v in index.videos()] == ["a.mp4"]
+    
+    # File vẫn đang được ghi, mtime của folder không đổi
+    index._scanned_at_ns = index._dir_mtime_ns + 10**10
+    (tmp_path / "a.mp4").write_bytes(b"x" * 10)
+    index.refresh()
+    assert index.stat("a.mp4")[0] == 10
+    
+    # Watcher không báo gì (thay đổi từ máy khác): chỉ lần quét định kỳ thấy file mới
+    index._watcher = SimpleNamespace(read_changes=lambda: set(), close=lambda: None)
+    (tmp_path / "b.mp4").touch()
+    assert [v.name for v in index.videos()] == ["a.mp4"]
+    index.rescan_interval = 0
+    assert [v.name for v in index.videos()] == ["a.mp4", "b.mp4"]
+    index.close()
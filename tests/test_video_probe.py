@@ -0,0 +1,113 @@
+"""
+Tests for container header probing
+"""
+import struct
+import pytest
+from src.utils.video_probe import ProbeError, probe_video, describe_metadata
+from src.utils.file_manager import VideoFileManager
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def build_mp4(faststart: bool = True, mdat_size: int = 1000) -> bytes:
+    """Tạo file MP4 tối thiểu: 1 video track avc1 1920x1080, 1 audio track mp4a, dài 120s"""
+    mvhd = box(b'mvhd', b'\x00' * 4 + struct.pack('>IIII', 0, 0, 1000, 120000) + b'\x00' * 80)
+    tkhd = box(b'tkhd', b'\x00' * 76 + struct.pack('>II', 1920 << 16, 1080 << 16))
+    
+    def trak(handler: bytes, codec: bytes, tk: bytes = b'') -> bytes:
+        hdlr = box(b'hdlr', b'\x00' * 8 + handler + b'\x00' * 12)
+        stsd = box(b'stsd', b'\x00' * 4 + struct.pack('>I', 1) + box(codec, b'\x00' * 8))
+        minf = box(b'minf', box(b'stbl', stsd))
+        return box(b'trak', tk + box(b'mdia', hdlr + minf))
+    
+    moov = box(b'moov', mvhd + trak(b'vide', b'avc1', tkhd) + trak(b'soun', b'mp4a'))
+    ftyp = box(b'ftyp', b'isom' + b'\x00' * 4)
+    mdat = box(b'mdat', b'\x00' * mdat_size)
+    return ftyp + (moov + mdat if faststart else mdat + moov)
+
+
+def ebml(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    size = len(payload) | (1 << 56)
+    return id_bytes + size.to_bytes(8, 'big') + payload
+
+
+def build_mkv(duration: bool = True) -> bytes:
+    """Tạo file MKV tối thiểu: video V_VP9 1280x720, dài 90s (duration=False: không có element Duration)"""
+    header = ebml(0x1A45DFA3, ebml(0x4282, b'matroska'))
+    info_payload = ebml(0x2AD7B1, (1_000_000).to_bytes(3, 'big'))
+    if duration:
+        info_payload += ebml(0x4489, struct.pack('>d', 90000.0))
+    info = ebml(0x1549A966, info_payload)
+    video = ebml(0xE0, ebml(0xB0, (1280).to_bytes(2, 'big')) + ebml(0xBA, (720).to_bytes(2, 'big')))
+    track = ebml(0xAE, ebml(0x83, b'\x01') + ebml(0x86, b'V_VP9') + video)
+    tracks = ebml(0x1654AE6B, track)
+    cluster = ebml(0x1F43B675, b'\x00' * 100)
+    return header + ebml(0x18538067, info + tracks + cluster)
+
+
+def test_probe_mp4(tmp_path):
+    """Test đọc metadata MP4 và nhận diện faststart"""
+    video = tmp_path / "a.mp4"
+    video.write_bytes(build_mp4())
+    meta = probe_video(video)
+    
+    assert meta['duration'] == 120
+    assert (meta['width'], meta['height']) == (1920, 1080)
+    assert meta['video_codec'] == 'avc1'
+    assert meta['audio_codec'] == 'mp4a'
+    assert meta['faststart'] is True
+    assert meta['bitrate'] == int(video.stat().st_size * 8 / 120)
+    
+    video.write_bytes(build_mp4(faststart=False))
+    assert probe_video(video)['faststart'] is False
+
+
+def test_probe_mkv(tmp_path):
+    """Test đọc metadata MKV"""
+    video = tmp_path / "a.mkv"
+    video.write_bytes(build_mkv())
+    meta = probe_video(video)
+    
+    assert meta['container'] == 'mkv'
+    assert meta['duration'] == 90
+    assert (meta['width'], meta['height']) == (1280, 720)
+    assert meta['video_codec'] == 'V_VP9'
+    assert meta['faststart'] is True
+    assert describe_metadata(meta) == "Thông tin video: thời lượng 1:30, độ phân giải 1280x720, codec V_VP9"
+
+
+def test_mkv_without_duration_is_valid(tmp_path):
+    """Duration là tùy chọn trong Matroska: không biết thời lượng vẫn upload được"""
+    video = tmp_path / "live.mkv"
+    video.write_bytes(build_mkv(duration=False))
+    meta = probe_video(video)
+    
+    assert meta['duration'] is None and meta['video_codec'] == 'V_VP9'
+    assert VideoFileManager(tmp_path).validate_video(video) is None
+
+
+def test_probe_corrupt(tmp_path):
+    """Test file hỏng báo ProbeError"""
+    video = tmp_path / "bad.mp4"
+    video.write_bytes(build_mp4()[:40])
+    with pytest.raises(ProbeError):
+        probe_video(video)
+
+
+def test_validate_video(tmp_path):
+    """Test validate size và header trước khi upload"""
+    (tmp_path / "good.mp4").write_bytes(build_mp4())
+    (tmp_path / "bad.mp4").write_bytes(b'\x00\x00\x00\x08junk' * 10)
+    (tmp_path / "big.mp4").write_bytes(build_mp4(mdat_size=2 * 1024 * 1024))
+    
+    manager = VideoFileManager(tmp_path, max_file_size_mb=1)
+    assert manager.validate_video(tmp_path / "good.mp4") is None
+    assert "header" in manager.validate_video(tmp_path / "bad.mp4")
+    assert "exceeds" in manager.validate_video(tmp_path / "big.mp4")
+    
+    # Metadata được cache theo fingerprint
+    fingerprint = manager.get_fingerprint(tmp_path / "good.mp4")
+    assert manager.metadata_index.get(fingerprint)['video_codec'] == 'avc1'
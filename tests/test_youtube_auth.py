@@ -0,0 +1,59 @@
+"""
+Tests for YouTubeAuth (JSON token, migrate token.pickle) và khởi tạo uploader lazy
+"""
+import json
+import pickle
+from datetime import datetime, timedelta
+from google.oauth2.credentials import Credentials
+from src.tools.youtube_auth import YouTubeAuth, build_youtube_service, load_discovery_document
+from src.tools.youtube_uploader import YouTubeUploader
+
+
+def make_credentials() -> Credentials:
+    return Credentials(
+        token="access",
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="id",
+        client_secret="secret",
+        expiry=datetime.utcnow() + timedelta(hours=1)
+    )
+
+
+def test_legacy_pickle_token_is_migrated_to_json(tmp_path):
+    """token.pickle cũ được chuyển sang token.json rồi xóa"""
+    legacy = tmp_path / "token.pickle"
+    with open(legacy, "wb") as f:
+        pickle.dump(make_credentials(), f)
+    
+    auth = YouTubeAuth(token_file=tmp_path / "token.json", legacy_token_file=legacy)
+    credentials = auth.get_credentials()
+    auth.close()
+    
+    assert credentials.token == "access"
+    assert not legacy.exists()
+    saved = json.loads((tmp_path / "token.json").read_text())
+    assert saved["refresh_token"] == "refresh"
+    
+    # Lần sau đọc thẳng từ JSON
+    again = YouTubeAuth(token_file=tmp_path / "token.json", legacy_token_file=legacy)
+    assert again.get_credentials().refresh_token == "refresh"
+    again.close()
+
+
+def test_discovery_document_is_parsed_once():
+    """Discovery document được parse một lần, build service không cần mạng"""
+    assert load_discovery_document() is load_discovery_document()
+    service = build_youtube_service(make_credentials())
+    assert hasattr(service, "videos")
+
+
+def test_uploader_does_not_authenticate_on_init(tmp_path):
+    """Tạo uploader không đọc token / không mở OAuth flow"""
+    class ExplodingAuth:
+        def get_credentials(self):
+            raise AssertionError("should not authenticate eagerly")
+    
+    uploader = YouTubeUploader("id", "secret", session_dir=tmp_path / "sessions", auth=ExplodingAuth())
+    assert uploader.credentials is None
+    assert uploader._http() is None
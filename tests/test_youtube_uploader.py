@@ -0,0 +1,183 @@
+"""
+Tests for YouTubeUploader (offline, dùng HttpMockSequence thay cho Google API)
+"""
+import json
+import re
+from urllib.parse import parse_qs, urlparse
+import pytest
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.http import HttpMockSequence
+from httplib2 import Response
+from src.tools.youtube_auth import load_discovery_document
+from src.tools.youtube_uploader import YouTubeUploader
+
+
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def make_uploader(tmp_path, monkeypatch):
+    """Tạo uploader không cần OAuth, dùng chuỗi response giả lập"""
+    monkeypatch.setattr(YouTubeUploader, "_authenticate", lambda self: None)
+    
+    def factory(responses):
+        uploader = YouTubeUploader("id", "secret", chunk_size_mb=0.25, session_dir=tmp_path / "sessions")
+        uploader.youtube = build("youtube", "v3", http=HttpMockSequence(responses), static_discovery=True)
+        return uploader
+    
+    return factory
+
+
+def test_chunk_size_alignment():
+    """Test chunk size luôn là bội số của 256 KiB"""
+    assert YouTubeUploader._align_chunk_size(1) == 4 * CHUNK
+    assert YouTubeUploader._align_chunk_size(0.3) == CHUNK
+    assert YouTubeUploader._align_chunk_size(0) == CHUNK
+
+
+def test_resume_after_restart(tmp_path, make_uploader):
+    """Test upload bị ngắt giữa chừng được tiếp tục từ byte đã xác nhận"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x" * (3 * CHUNK))
+    session_uri = "https://upload.example/session/1"
+    
+    # Lần chạy đầu: khởi tạo session, gửi 1 chunk rồi mất kết nối
+    first = make_uploader([
+        ({"status": "200", "location": session_uri}, b""),
+        ({"status": "308", "range": f"bytes=0-{CHUNK - 1}"}, b""),
+        ({"status": "503"}, b"unavailable"),
+    ])
+    assert first.upload_video(video, "Title", "Desc", ["tag"]) is None
+    assert first.sessions.load(video)["progress"] == CHUNK
+    
+    # Process mới: hỏi server vị trí đã nhận rồi upload tiếp, không khởi tạo session mới
+    second = make_uploader([
+        ({"status": "308", "range": f"bytes=0-{2 * CHUNK - 1}"}, b""),
+        ({"status": "200"}, json.dumps({"id": "abc123"}).encode()),
+    ])
+    result = second.upload_video(video, "Title", "Desc", ["tag"])
+    
+    assert result["video_id"] == "abc123"
+    assert second.sessions.load(video) is None
+
+
+def test_expired_session_starts_over(tmp_path, make_uploader):
+    """Test session hết hạn phía server thì tạo session mới"""
+    video = tmp_path / "video.mp4"
+    video.write_bytes(b"x" * CHUNK)
+    
+    uploader = make_uploader([
+        ({"status": "404"}, b""),
+        ({"status": "200", "location": "https://upload.example/session/2"}, b""),
+        ({"status": "200"}, json.dumps({"id": "new"}).encode()),
+    ])
+    uploader.sessions.save(video, "https://upload.example/session/old", 0)
+    
+    assert uploader.upload_video(video, "Title", "Desc", [])["video_id"] == "new"
+
+
+class FakeApiHttp:
+    """HTTP giả lập cho videos.list / batch videos.update / playlistItems.list"""
+    
+    def __init__(self, videos):
+        self.videos = videos
+        self.requests = []
+        self.batch_body = ""
+    
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.requests.append(uri)
+        if "/batch" in uri:
+            body = body.decode() if isinstance(body, bytes) else body
+            self.batch_body = body
+            boundary = "batch_response"
+            parts = []
+            for content_id in re.findall(r"Content-ID: <([^>]+)>", body):
+                video_id = content_id.split("+", 1)[1]
+                payload = json.dumps({"id": video_id})
+                parts.append(
+                    f"--{boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{content_id}>\r\n\r\n"
+                    f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{payload}\r\n"
+                )
+            content = "".join(parts) + f"--{boundary}--"
+            return Response({"status": "200", "content-type": f"multipart/mixed; boundary={boundary}"}), content.encode()
+        query = parse_qs(urlparse(uri).query)
+        if "/channels" in uri:
+            items = [{"contentDetails": {"relatedPlaylists": {"uploads": "UU1"}}}]
+            return Response({"status": "200"}), json.dumps({"items": items}).encode()
+        if "/playlistItems" in uri:
+            page = int(query.get("pageToken", ["0"])[0])
+            response = {"items": [{"contentDetails": {"videoId": f"v{page}"}}]}
+            if page < 2:
+                response["nextPageToken"] = str(page + 1)
+            return Response({"status": "200"}), json.dumps(response).encode()
+        ids = query["id"][0].split(",")
+        items = [{"id": i, "snippet": self.videos[i], "processingDetails": {"processingStatus": "succeeded"}}
+                 for i in ids if i in self.videos]
+        return Response({"status": "200"}), json.dumps({"items": items}).encode()
+
+
+class DownHttp:
+    """Http không tới được server (lỗi kết nối)"""
+    
+    def request(self, *args, **kwargs):
+        raise ConnectionError("network down")
+
+
+def test_thumbnail_quota_is_charged_only_when_server_got_the_request(tmp_path, make_uploader):
+    """thumbnails.set: thành công hoặc server trả lỗi thì tính quota, lỗi kết nối thì không"""
+    thumbnail = tmp_path / "thumb.jpg"
+    thumbnail.write_bytes(b"jpeg")
+    uploader = make_uploader([
+        ({"status": "200"}, b"{}"),
+        ({"status": "400"}, b"bad request"),
+    ])
+    assert uploader.upload_thumbnail("abc123", thumbnail)
+    assert uploader.quota.used() == 50
+    assert not uploader.upload_thumbnail("abc123", thumbnail)
+    assert uploader.quota.used() == 100
+    
+    uploader.youtube = build("youtube", "v3", http=DownHttp(), static_discovery=True)
+    assert not uploader.upload_thumbnail("abc123", thumbnail)
+    assert uploader.quota.used() == 100
+
+
+@pytest.fixture
+def api_uploader(tmp_path, monkeypatch):
+    monkeypatch.setattr(YouTubeUploader, "_authenticate", lambda self: None)
+    videos = {f"v{i}": {"title": f"Old {i}", "categoryId": "22", "channelId": "UC1"} for i in range(60)}
+    http = FakeApiHttp(videos)
+    uploader = YouTubeUploader("id", "secret", session_dir=tmp_path / "sessions")
+    uploader.youtube = build_from_document(load_discovery_document(), http=http)
+    return uploader, http
+
+
+def test_get_videos_batches_50_ids_per_call(api_uploader):
+    """60 id -> 2 lần videos.list"""
+    uploader, http = api_uploader
+    videos = uploader.get_videos([f"v{i}" for i in range(60)] + ["missing"])
+    
+    assert len(videos) == 60
+    assert len(http.requests) == 2
+    assert uploader.quota.usage_by_method()["videos.list"]["calls"] == 2
+
+
+def test_update_videos_uses_http_batch(api_uploader):
+    """Update nhiều video: 1 videos.list + 1 HTTP batch, giữ nguyên field không đổi"""
+    uploader, http = api_uploader
+    results = uploader.update_videos({"v1": {"title": "New 1"}, "v2": {"description": "Desc"}, "nope": {"title": "x"}})
+    
+    assert results["v1"] == {"status": "success"}
+    assert results["v2"] == {"status": "success"}
+    assert results["nope"]["status"] == "error"
+    assert len(http.requests) == 2
+    assert '"title": "Old 2"' in http.batch_body and "channelId" not in http.batch_body
+    assert uploader.quota.usage_by_method()["videos.update"] == {"units": 100, "calls": 2}
+
+
+def test_iter_uploads_follows_pages(api_uploader):
+    """Duyệt hết các trang của playlist uploads"""
+    uploader, _ = api_uploader
+    video_ids = [item["contentDetails"]["videoId"] for item in uploader.iter_uploads()]
+    assert video_ids == ["v0", "v1", "v2"]
+    assert uploader.wait_for_processing(["v1", "gone"], interval=0) == {"v1": "succeeded", "gone": "not_found"}
@@ -1,6 +1,13 @@
 """
 Upload 1 video ngay lập tức - Simple script
+    
+    python upload_now.py                 # 1 video
+    python upload_now.py --count 5       # 5 video, upload song song
+    python upload_now.py --drain         # upload hết hàng đợi (theo batch.max_per_run / daily_cap)
+    python upload_now.py --channel NAME  # upload cho kênh NAME trong channels: của settings.yaml
+    python upload_now.py --mock          # thử với mock server (youtube.api_base_url), kênh chưa có OAuth dùng token giả
 """
+import argparse
 import asyncio
 from pathlib import Path
 import sys
@@ -8,32 +15,82 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.workflows.upload_workflow import YouTubeUploadWorkflow
+from src.workflows.batch_upload import BatchUploadEngine
+from src.workflows.channels import ChannelRegistry, UploaderPool
 from src.utils.config import Settings
 from loguru import logger
 
 
-async def upload_now():
+async def upload_now(
+    count: int = None,
+    drain: bool = False,
+    concurrency: int = None,
+    channel: str = None,
+    no_llm_cache: bool = False,
+    mock: bool = False
+):
     """Upload video ngay"""
+    workflow = None
     try:
         logger.info("🚀 Starting immediate upload...")
         
         settings = Settings()
-        workflow = YouTubeUploadWorkflow(settings)
+        registry = ChannelRegistry.from_settings(settings)
+        selected = registry.get(channel or registry.names()[0])
+        auth_factory = None
+        if mock:
+            # Chỉ khi chạy với --mock: kênh chưa có OAuth client dùng token giả của mock server
+            if not settings.YOUTUBE_API_BASE_URL:
+                raise ValueError("--mock requires youtube.api_base_url pointing at the mock server")
+            from src.tools.mock_youtube import mock_auth_factory
+            auth_factory = mock_auth_factory(UploaderPool.youtube_auth)
+        uploaders = UploaderPool(settings, ChannelRegistry([selected]), auth_factory=auth_factory)
+        workflow = YouTubeUploadWorkflow(settings, channel=selected, uploaders=uploaders)
+        if no_llm_cache:
+            workflow.reuse_descriptions = False
+            if workflow.description_agent.cache:
+                workflow.description_agent.cache.bypass = True
+        
+        if drain or (count and count > 1):
+            engine = BatchUploadEngine.from_settings(workflow, settings)
+            if concurrency:
+                engine.concurrency = concurrency
+            results = await engine.run(count=None if drain else count)
+            uploaded = sum(1 for r in results if r["status"] == "uploaded")
+            if uploaded:
+                logger.success(f"✅ Upload thành công {uploaded}/{len(results)} video!")
+            else:
+                logger.error("❌ Upload thất bại!")
+            return
         
         # Run upload
         result = await workflow.upload_daily_video()
         
-        if result:
+        if result and result.get("status") == "uploaded":
             logger.success("✅ Upload thành công!")
-            logger.info(f"Video ID: {result.get('video_id', 'N/A')}")
+            logger.info(f"Video ID: {result['upload_result'].get('video_id', 'N/A')}")
         else:
             logger.error("❌ Upload thất bại!")
-            
+    
     except Exception as e:
         logger.error(f"❌ Lỗi: {e}")
         import traceback
         logger.error(traceback.format_exc())
+    finally:
+        if workflow:
+            await workflow.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(upload_now())
+    parser = argparse.ArgumentParser(description="Upload video ngay lập tức")
+    parser.add_argument("--count", type=int, help="Số video cần upload")
+    parser.add_argument("--drain", action="store_true", help="Upload hết hàng đợi")
+    parser.add_argument("--concurrency", type=int, help="Số video upload song song")
+    parser.add_argument("--channel", help="Tên kênh (mặc định: kênh đầu tiên)")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Gọi lại LLM, không dùng mô tả đã cache")
+    parser.add_argument("--mock", action="store_true", help="Upload lên mock server (youtube.api_base_url), token giả")
+    args = parser.parse_args()
+    asyncio.run(upload_now(
+        count=args.count, drain=args.drain, concurrency=args.concurrency, channel=args.channel,
+        no_llm_cache=args.no_llm_cache, mock=args.mock
+    ))